@@ -1,26 +1,50 @@
 import os
 import logging
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from motor.motor_asyncio import AsyncIOMotorClient
+import time
 from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+from fastjson import dumps, loads
+from i18n import LANGUAGE_NAMES
+from metrics import upstream_timer
+from prompt_builder import PromptBuilder, compact_table, technicals_table
 
 logger = logging.getLogger(__name__)
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Older turns are trimmed so a chat_history document cannot grow without bound
+CHAT_HISTORY_MAX_MESSAGES = 200
+# Weight of the newest request in the running chat latency average
+CHAT_LATENCY_SMOOTHING = 0.1
+
+
+def llm_client():
+    """Import the LLM SDK on first use; its dependency tree dominates startup time"""
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    return LlmChat, UserMessage
 
 
 class AIService:
     """Service for AI-powered analysis and chat using OpenAI GPT-5"""
     
-    def __init__(self):
+    def __init__(self, writes, answers=None):
+        self.writes = writes
+        self.answers = answers
+        self.chat_latency = 0.0
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
         self.model_provider = "openai"
         self.model_name = "gpt-5"
+        self.prompts = PromptBuilder()
+    
+    def preload(self):
+        """Import the LLM SDK ahead of the first request (run in a worker thread)"""
+        try:
+            llm_client()
+        except Exception as e:
+            logger.error(f"Could not load LLM client: {e}")
     
     def get_chat_instance(self, session_id, system_message):
         """Get LlmChat instance"""
+        LlmChat, _ = llm_client()
         chat = LlmChat(
             api_key=self.api_key,
             session_id=session_id,
@@ -29,47 +53,41 @@ class AIService:
         chat.with_model(self.model_provider, self.model_name)
         return chat
     
-    async def analyze_asset(self, symbol, crypto_data):
-        """Analyze a crypto asset with AI"""
+    async def analyze_asset(self, symbol, crypto_data, brief=False):
+        """Analyze a crypto asset with AI; brief asks for a short answer while the bot is overloaded"""
         try:
             # Create analysis prompt
-            price = crypto_data['price']
-            market_cap = crypto_data['market_cap']
-            volume = crypto_data['volume_24h']
-            change_24h = crypto_data['price_change_24h']
-            change_7d = crypto_data['price_change_7d']
-            change_30d = crypto_data['price_change_30d']
-            ath = crypto_data['ath']
-            ath_change = crypto_data['ath_change']
+            price = crypto_data.price
+            market_cap = crypto_data.market_cap
+            volume = crypto_data.volume_24h
+            change_24h = crypto_data.price_change_24h
+            change_7d = crypto_data.price_change_7d
+            change_30d = crypto_data.price_change_30d
+            ath = crypto_data.ath
+            ath_change = crypto_data.ath_change
             
-            prompt = f"""Analyze the cryptocurrency {symbol} ({crypto_data['name']}) with the following data:
-
-Current Price: ${price:,.8f}
-Market Cap: ${market_cap:,.0f}
-24h Volume: ${volume:,.0f}
-24h Change: {change_24h:.2f}%
-7d Change: {change_7d:.2f}%
-30d Change: {change_30d:.2f}%
-All-Time High: ${ath:,.2f} (Currently {ath_change:.2f}% from ATH)
-
-Provide a comprehensive analysis including:
-1. Current market sentiment and trend
-2. Key factors affecting the price
-3. Short-term outlook (1-7 days)
-4. Medium-term outlook (1-4 weeks)
-5. Important support and resistance levels
-6. Risk factors to watch
-
-Keep the analysis concise (under 400 words) and actionable."""
+            market_table = compact_table(
+                ("price", "mcap", "vol24h", "chg24h%", "chg7d%", "chg30d%", "ath", "ath%"),
+                [(price, market_cap, volume, change_24h, change_7d, change_30d, ath, ath_change)]
+            )
+            feature = 'analysis_brief' if brief else 'analysis'
+            prompt = self.prompts.build(feature, [
+                (f"Analyze {symbol} ({crypto_data.name}). Market data (USD):\n{market_table}", True),
+                ("" if brief else
+                 "Cover: 1) sentiment and trend, 2) key price drivers, 3) outlook 1-7 days, "
+                 "4) outlook 1-4 weeks, 5) support/resistance from the technicals, 6) risks.", True),
+                (technicals_table(crypto_data.technicals), False),
+            ])
             
-            system_message = "You are an expert cryptocurrency analyst with deep knowledge of blockchain technology, market dynamics, and technical analysis. Provide clear, data-driven insights."
-            
-            chat = self.get_chat_instance(f"analysis_{symbol}", system_message)
+            chat = self.get_chat_instance(f"{feature}_{symbol}", self.prompts.system_message(feature))
+            _, UserMessage = llm_client()
             user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            with upstream_timer('llm'):
+                response = await chat.send_message(user_message)
+            self.prompts.record(feature, prompt, response)
             
             # Format response
-            result = f"""🔍 **Detailed Analysis: {crypto_data['name']} ({symbol})**
+            result = f"""🔍 **Detailed Analysis: {crypto_data.name} ({symbol})**
 
 💵 **Current Price:** ${price:,.8f}
 📊 **Market Cap:** ${market_cap:,.0f}
@@ -86,48 +104,87 @@ Keep the analysis concise (under 400 words) and actionable."""
             logger.error(f"Error in AI analysis: {e}")
             raise
     
+    async def summarize_digest(self, headlines, movers):
+        """Short market summary over the digest headlines and the day's top movers"""
+        movers_table = compact_table(
+            ("coin", "price", "chg24h%"),
+            [(coin.symbol, coin.price, coin.change_24h) for coin in movers]
+        )
+        prompt = self.prompts.build('summary', [
+            ("Headlines:\n" + "\n".join(f"- {headline}" for headline in headlines), True),
+            (f"Top movers (USD, 24h):\n{movers_table}" if movers else "", False),
+        ])
+        chat = self.get_chat_instance("digest_summary", self.prompts.system_message('summary'))
+        _, UserMessage = llm_client()
+        with upstream_timer('llm'):
+            response = await chat.send_message(UserMessage(text=prompt))
+        self.prompts.record('summary', prompt, response)
+        return (response or "").strip()
+    
+    async def translate(self, texts, language):
+        """Translate a batch of short texts in one LLM request; raises if the reply doesn't line up"""
+        prompt = self.prompts.build('translation', [
+            (f"Target language: {LANGUAGE_NAMES.get(language, language)}", True),
+            (dumps(list(texts)).decode(), True),
+        ])
+        chat = self.get_chat_instance(f"translation_{language}", self.prompts.system_message('translation'))
+        _, UserMessage = llm_client()
+        with upstream_timer('llm'):
+            response = await chat.send_message(UserMessage(text=prompt))
+        self.prompts.record('translation', prompt, response)
+        
+        reply = (response or "").strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        translated = loads(reply)
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise ValueError(f"Translation reply has {len(translated) if isinstance(translated, list) else 'no'} "
+                             f"items for {len(texts)} texts")
+        return [str(item) for item in translated]
+    
+    async def _ask(self, user_id, message):
+        """Send a chat message to the LLM, tracking the average latency a cache hit saves"""
+        prompt = self.prompts.build('chat', [(message, True)])
+        
+        chat = self.get_chat_instance(f"user_{user_id}", self.prompts.system_message('chat'))
+        _, UserMessage = llm_client()
+        user_message = UserMessage(text=prompt)
+        start = time.perf_counter()
+        with upstream_timer('llm'):
+            response = await chat.send_message(user_message)
+        elapsed = time.perf_counter() - start
+        self.chat_latency = elapsed if not self.chat_latency else (
+            CHAT_LATENCY_SMOOTHING * elapsed + (1 - CHAT_LATENCY_SMOOTHING) * self.chat_latency
+        )
+        self.prompts.record('chat', prompt, response)
+        return response
+    
     async def chat(self, user_id, message):
         """Handle conversational chat with AI"""
         try:
-            # Load chat history from database
-            chat_history = await db.chat_history.find_one({"user_id": user_id})
-            
-            system_message = """You are a helpful AI assistant specializing in cryptocurrency and blockchain technology. 
-You can answer questions about crypto markets, provide analysis, explain concepts, and discuss trading strategies. 
-Be conversational, helpful, and informative. Keep responses concise (under 300 words)."""
+            response = self.answers.lookup(message, self.chat_latency) if self.answers else None
+            if response is None:
+                response = await self._ask(user_id, message)
+                if self.answers:
+                    self.answers.add(message, response)
             
-            chat = self.get_chat_instance(f"user_{user_id}", system_message)
-            user_message = UserMessage(text=message)
-            response = await chat.send_message(user_message)
-            
-            # Save chat history
+            # Save chat history (write-behind, one upsert per turn)
             timestamp = datetime.now(timezone.utc).isoformat()
-            
-            if chat_history:
-                await db.chat_history.update_one(
-                    {"user_id": user_id},
-                    {
-                        "$push": {
-                            "messages": {
-                                "$each": [
-                                    {"role": "user", "content": message, "timestamp": timestamp},
-                                    {"role": "assistant", "content": response, "timestamp": timestamp}
-                                ]
-                            }
-                        },
-                        "$set": {"updated_at": timestamp}
-                    }
-                )
-            else:
-                await db.chat_history.insert_one({
-                    "user_id": user_id,
-                    "messages": [
-                        {"role": "user", "content": message, "timestamp": timestamp},
-                        {"role": "assistant", "content": response, "timestamp": timestamp}
-                    ],
-                    "created_at": timestamp,
-                    "updated_at": timestamp
-                })
+            self.writes.add('chat_history', UpdateOne(
+                {"user_id": user_id},
+                {
+                    "$push": {
+                        "messages": {
+                            "$each": [
+                                {"role": "user", "content": message, "timestamp": timestamp},
+                                {"role": "assistant", "content": response, "timestamp": timestamp}
+                            ],
+                            "$slice": -CHAT_HISTORY_MAX_MESSAGES
+                        }
+                    },
+                    "$set": {"updated_at": timestamp},
+                    "$setOnInsert": {"created_at": timestamp}
+                },
+                upsert=True
+            ))
             
             return response
             
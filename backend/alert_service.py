@@ -0,0 +1,265 @@
+import bisect
+import logging
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+ALERT_KINDS = ('above', 'below', 'move')
+
+
+def _remove_entry(keys, ids, key, alert_id):
+    start = bisect.bisect_left(keys, key)
+    end = bisect.bisect_right(keys, key, start)
+    for i in range(start, end):
+        if ids[i] == alert_id:
+            del keys[i]
+            del ids[i]
+            return
+
+
+class CoinAlertBook:
+    """Trigger prices of one coin's active alerts, kept sorted for bisection.
+
+    Both arrays are ordered so that triggered entries sit at the tail:
+    ``above_keys`` holds negated thresholds (price >= t  <=>  -t >= -price)
+    and ``below_keys`` holds plain thresholds (price <= t). Popping the
+    triggered alerts is therefore one bisect plus a tail slice deletion.
+    """
+
+    __slots__ = ('above_keys', 'above_ids', 'below_keys', 'below_ids')
+
+    def __init__(self):
+        self.above_keys = []
+        self.above_ids = []
+        self.below_keys = []
+        self.below_ids = []
+
+    def add(self, alert_id, above=None, below=None):
+        if above is not None:
+            i = bisect.bisect_right(self.above_keys, -above)
+            self.above_keys.insert(i, -above)
+            self.above_ids.insert(i, alert_id)
+        if below is not None:
+            i = bisect.bisect_right(self.below_keys, below)
+            self.below_keys.insert(i, below)
+            self.below_ids.insert(i, alert_id)
+
+    def extend(self, entries):
+        """Bulk add (alert_id, above, below) entries and re-sort once"""
+        above = list(zip(self.above_keys, self.above_ids))
+        below = list(zip(self.below_keys, self.below_ids))
+        for alert_id, above_price, below_price in entries:
+            if above_price is not None:
+                above.append((-above_price, alert_id))
+            if below_price is not None:
+                below.append((below_price, alert_id))
+        above.sort(key=lambda entry: entry[0])
+        below.sort(key=lambda entry: entry[0])
+        self.above_keys = [key for key, _ in above]
+        self.above_ids = [alert_id for _, alert_id in above]
+        self.below_keys = [key for key, _ in below]
+        self.below_ids = [alert_id for _, alert_id in below]
+
+    def remove(self, alert_id, above=None, below=None):
+        """Remove an alert's entries, found by bisecting to its thresholds; missing ones are ignored"""
+        if above is not None:
+            _remove_entry(self.above_keys, self.above_ids, -above, alert_id)
+        if below is not None:
+            _remove_entry(self.below_keys, self.below_ids, below, alert_id)
+
+    def pop_triggered(self, price):
+        """Remove and return ids of all alerts crossed by price"""
+        triggered = []
+
+        i = bisect.bisect_left(self.above_keys, -price)
+        if i < len(self.above_keys):
+            triggered.extend(self.above_ids[i:])
+            del self.above_keys[i:]
+            del self.above_ids[i:]
+
+        i = bisect.bisect_left(self.below_keys, price)
+        if i < len(self.below_keys):
+            triggered.extend(self.below_ids[i:])
+            del self.below_keys[i:]
+            del self.below_ids[i:]
+
+        return triggered
+
+    def __len__(self):
+        return len(self.above_ids) + len(self.below_ids)
+
+
+class AlertEngine:
+    """In-memory index of active alerts, evaluated against market snapshots"""
+
+    def __init__(self):
+        self._books = {}
+        self._alerts = {}
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def add(self, alert):
+        self._alerts[alert['alert_id']] = alert
+        book = self._books.setdefault(alert['coin_id'], CoinAlertBook())
+        book.add(alert['alert_id'], alert.get('above'), alert.get('below'))
+
+    def load(self, alerts):
+        """Replace the index with the given alerts"""
+        self._books = {}
+        self._alerts = {}
+        grouped = {}
+        for alert in alerts:
+            self._alerts[alert['alert_id']] = alert
+            grouped.setdefault(alert['coin_id'], []).append(
+                (alert['alert_id'], alert.get('above'), alert.get('below'))
+            )
+        for coin_id, entries in grouped.items():
+            book = CoinAlertBook()
+            book.extend(entries)
+            self._books[coin_id] = book
+
+    def discard(self, alert_id):
+        """Drop an alert and its book entries"""
+        alert = self._alerts.pop(alert_id, None)
+        if alert is not None:
+            self._unbook(alert)
+        return alert
+
+    def _unbook(self, alert):
+        """Remove whatever entries of the alert are still in its coin's book"""
+        book = self._books.get(alert['coin_id'])
+        if book is None:
+            return
+        book.remove(alert['alert_id'], alert.get('above'), alert.get('below'))
+        if not book:
+            del self._books[alert['coin_id']]
+
+    def evaluate(self, prices):
+        """Pop alerts triggered by a {coin_id: price} tick.
+
+        Returns a list of (alert, price) tuples. Each alert fires at most
+        once, even when a move alert crosses both of its bounds; the bound
+        that did not fire is removed from the book with it.
+        """
+        fired = []
+        for coin_id, price in prices.items():
+            book = self._books.get(coin_id)
+            if not book or price is None:
+                continue
+            for alert_id in book.pop_triggered(price):
+                alert = self._alerts.pop(alert_id, None)
+                if alert is not None:
+                    self._unbook(alert)
+                    fired.append((alert, price))
+        return fired
+
+
+class AlertService:
+    """Service for user price alerts stored in MongoDB"""
+
+    def __init__(self, db):
+        self.db = db
+        self.engine = AlertEngine()
+
+    async def ensure_indexes(self):
+        await self.db.alerts.create_index([("coin_id", 1), ("active", 1)])
+        await self.db.alerts.create_index([("telegram_id", 1), ("active", 1)])
+        await self.db.alerts.create_index("alert_id", unique=True)
+
+    async def load_active(self):
+        """Load all active alerts into the in-memory engine"""
+        try:
+            alerts = await self.db.alerts.find({"active": True}, {"_id": 0}).to_list(None)
+            self.engine.load(alerts)
+            logger.info(f"Loaded {len(alerts)} active alerts")
+        except Exception as e:
+            logger.error(f"Error loading alerts: {e}")
+
+    async def count_active(self, telegram_id):
+        return await self.db.alerts.count_documents({"telegram_id": telegram_id, "active": True})
+
+    async def create_alert(self, telegram_id, coin, kind, value):
+        """Register an alert for a snapshot coin.
+
+        ``above``/``below`` alerts fire when the price crosses ``value``;
+        ``move`` alerts fire when the price moves ``value`` percent away
+        from the price at registration, in either direction.
+        """
+        if kind not in ALERT_KINDS:
+            raise ValueError(f"Unknown alert type: {kind}")
+        if value <= 0:
+            raise ValueError("Alert value must be positive")
+
+        price = coin.price
+        alert = {
+            "alert_id": uuid.uuid4().hex[:8],
+            "telegram_id": telegram_id,
+            "coin_id": coin.id,
+            "symbol": coin.symbol,
+            "kind": kind,
+            "value": value,
+            "reference_price": price,
+            "above": None,
+            "below": None,
+            "active": True,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        if kind == 'above':
+            alert['above'] = value
+        elif kind == 'below':
+            alert['below'] = value
+        else:
+            alert['above'] = price * (1 + value / 100)
+            alert['below'] = price * (1 - value / 100)
+
+        await self.db.alerts.insert_one(dict(alert))
+        self.engine.add(alert)
+        return alert
+
+    async def list_alerts(self, telegram_id):
+        return await self.db.alerts.find(
+            {"telegram_id": telegram_id, "active": True}, {"_id": 0}
+        ).to_list(100)
+
+    async def delete_alert(self, telegram_id, alert_id):
+        result = await self.db.alerts.update_one(
+            {"telegram_id": telegram_id, "alert_id": alert_id, "active": True},
+            {"$set": {"active": False, "deleted_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        if result.modified_count:
+            self.engine.discard(alert_id)
+            return True
+        return False
+
+    async def check_snapshot(self, coins):
+        """Evaluate a market snapshot and deactivate the alerts it triggers"""
+        prices = {coin.id: coin.price for coin in coins}
+        fired = self.engine.evaluate(prices)
+
+        if fired:
+            try:
+                await self.db.alerts.update_many(
+                    {"alert_id": {"$in": [alert['alert_id'] for alert, _ in fired]}},
+                    {"$set": {"active": False, "triggered_at": datetime.now(timezone.utc).isoformat()}}
+                )
+            except Exception as e:
+                logger.error(f"Error deactivating triggered alerts: {e}")
+
+        return fired
+
+    @staticmethod
+    def describe(alert):
+        if alert['kind'] == 'above':
+            return f"{alert['symbol']} above ${alert['value']:,.8g}"
+        if alert['kind'] == 'below':
+            return f"{alert['symbol']} below ${alert['value']:,.8g}"
+        return f"{alert['symbol']} moves ±{alert['value']:g}% from ${alert['reference_price']:,.8g}"
+
+    def format_triggered(self, alert, price):
+        return f"""🔔 **Price Alert Triggered**
+
+🎯 {self.describe(alert)}
+💵 Current price: ${price:,.8g}"""
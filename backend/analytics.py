@@ -0,0 +1,200 @@
+import functools
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+from pymongo import InsertOne, UpdateOne
+
+from models import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('minute', 'hour', 'day')
+
+# Outcome cell of the handler running in the current task
+_current = ContextVar('analytics_outcome', default=None)
+
+
+def bucket_start(ts, granularity):
+    """Start of the minute/hour/day bucket containing ts"""
+    ts = ts.replace(second=0, microsecond=0)
+    if granularity in ('hour', 'day'):
+        ts = ts.replace(minute=0)
+    if granularity == 'day':
+        ts = ts.replace(hour=0)
+    return ts
+
+
+class _FailureCapture(logging.Handler):
+    """Marks the running handler's event as failed when it logs an error.
+
+    Handlers catch their own exceptions and reply with an error message, so
+    an error log line is the signal that the user saw a failure.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        state = _current.get()
+        if state is not None:
+            state['outcome'] = 'error'
+
+
+class Analytics:
+    """Append-only usage event log with incremental minute/hour/day rollups.
+
+    Events go through the write-behind buffer into ``analytics_events``.
+    ``rollup()`` folds events older than ``rollup_lag`` seconds into
+    ``analytics_rollups`` bucket documents with ``$inc`` upserts and
+    remembers how far it got, so each event is aggregated once and
+    dashboard reads touch one document per bucket.
+    """
+
+    def __init__(self, db, writes, tier_lookup, rollup_lag=60, versions=None):
+        self.db = db
+        self.versions = versions
+        self.writes = writes
+        self.tier_lookup = tier_lookup
+        self.rollup_lag = rollup_lag
+
+    async def ensure_indexes(self, event_retention_days, minute_retention_days):
+        await self.db.analytics_events.create_index("minute")
+        await self.db.analytics_events.create_index("ts", expireAfterSeconds=event_retention_days * 86400)
+        await self.db.analytics_rollups.create_index([("granularity", 1), ("start", 1)], unique=True)
+        await self.db.analytics_rollups.create_index(
+            "start",
+            name="minute_buckets_ttl",
+            expireAfterSeconds=minute_retention_days * 86400,
+            partialFilterExpression={"granularity": "minute"}
+        )
+
+    def capture_failures(self, handler_logger):
+        """Count error logs from handler_logger as failed handler outcomes"""
+        handler_logger.addHandler(_FailureCapture())
+
+    def track(self, name, callback):
+        """Wrap a python-telegram-bot callback so every call is recorded as an event"""
+
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            state = {'outcome': 'ok'}
+            token = _current.set(state)
+            start = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except Exception:
+                state['outcome'] = 'error'
+                raise
+            finally:
+                _current.reset(token)
+                latency_ms = (time.perf_counter() - start) * 1000
+                user = getattr(update, 'effective_user', None)
+                await self.record(name, latency_ms, user.id if user else None, state['outcome'])
+
+        return wrapper
+
+    async def record(self, command, latency_ms, telegram_id, outcome):
+        try:
+            tier = await self.tier_lookup(telegram_id) if telegram_id else 'unknown'
+        except Exception as e:
+            logger.warning(f"Analytics tier lookup failed for {telegram_id}: {e}")
+            tier = 'unknown'
+        now = datetime.now(timezone.utc)
+        self.writes.add('analytics_events', InsertOne({
+            "ts": now,
+            "minute": bucket_start(now, 'minute'),
+            "command": command,
+            "telegram_id": telegram_id,
+            "tier": tier,
+            "outcome": outcome,
+            "latency_ms": round(latency_ms, 2),
+        }))
+
+    async def rollup(self, now=None):
+        """Fold new events into rollup buckets; returns the number of event groups"""
+        now = now or datetime.now(timezone.utc)
+        end = bucket_start(now - timedelta(seconds=self.rollup_lag), 'minute')
+        state = await self.db.analytics_state.find_one({"_id": "rollup"})
+        start = parse_datetime(state['until']) if state else None
+        if start is not None and end <= start:
+            return 0
+
+        window = {"$lt": end}
+        if start is not None:
+            window["$gte"] = start
+        groups = await self.db.analytics_events.aggregate([
+            {"$match": {"minute": window}},
+            {"$group": {
+                "_id": {"minute": "$minute", "command": "$command", "tier": "$tier", "outcome": "$outcome"},
+                "count": {"$sum": 1},
+                "latency_ms": {"$sum": "$latency_ms"},
+                "latency_ms_max": {"$max": "$latency_ms"},
+            }},
+        ]).to_list(None)
+
+        buckets = {}
+        for group in groups:
+            key = group['_id']
+            minute = parse_datetime(key['minute'])
+            command, count = key['command'], group['count']
+            for granularity in GRANULARITIES:
+                bucket = buckets.setdefault(
+                    (granularity, bucket_start(minute, granularity)),
+                    {'inc': defaultdict(int), 'max': 0}
+                )
+                inc = bucket['inc']
+                inc['count'] += count
+                inc['latency_ms_sum'] += group['latency_ms']
+                inc[f"commands.{command}.count"] += count
+                inc[f"commands.{command}.latency_ms_sum"] += group['latency_ms']
+                inc[f"tiers.{key['tier']}"] += count
+                inc[f"outcomes.{key['outcome']}"] += count
+                if key['outcome'] != 'ok':
+                    inc['errors'] += count
+                    inc[f"commands.{command}.errors"] += count
+                bucket['max'] = max(bucket['max'], group['latency_ms_max'])
+
+        if buckets:
+            await self.db.analytics_rollups.bulk_write([
+                UpdateOne(
+                    {"granularity": granularity, "start": start_ts},
+                    {"$inc": dict(bucket['inc']), "$max": {"latency_ms_max": bucket['max']}},
+                    upsert=True
+                )
+                for (granularity, start_ts), bucket in buckets.items()
+            ], ordered=False)
+            if self.versions is not None:
+                await self.versions.bump('analytics_rollups')
+        await self.db.analytics_state.update_one({"_id": "rollup"}, {"$set": {"until": end}}, upsert=True)
+        return len(groups)
+
+
+def summarize_buckets(buckets):
+    """Totals per command and tier over rollup bucket documents"""
+    commands = defaultdict(lambda: {'count': 0, 'errors': 0, 'latency_ms_sum': 0.0})
+    tiers = defaultdict(int)
+    total = {'count': 0, 'errors': 0}
+    for bucket in buckets:
+        total['count'] += bucket.get('count', 0)
+        total['errors'] += bucket.get('errors', 0)
+        for tier, count in bucket.get('tiers', {}).items():
+            tiers[tier] += count
+        for command, stats in bucket.get('commands', {}).items():
+            summary = commands[command]
+            summary['count'] += stats.get('count', 0)
+            summary['errors'] += stats.get('errors', 0)
+            summary['latency_ms_sum'] += stats.get('latency_ms_sum', 0)
+
+    result = []
+    for command, summary in sorted(commands.items(), key=lambda item: -item[1]['count']):
+        count = summary['count']
+        result.append({
+            'command': command,
+            'count': count,
+            'errors': summary['errors'],
+            'avg_latency_ms': round(summary['latency_ms_sum'] / count, 1) if count else None,
+        })
+    return {'total': total, 'tiers': dict(tiers), 'commands': result}
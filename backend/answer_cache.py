@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import re
+import time
+import zlib
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+from pymongo import UpdateOne
+
+from metrics import FAQ_SAVED_SECONDS, FAQ_SIMILARITY, cache_hit, cache_miss
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Function words carry no topic; dropping them lets paraphrases line up
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did can could should would will what whats which who how
+why when where s to of for in on at by with about and or it its this that there explain tell please
+що як це чи та і й в у на до про з із який яка яке які поясни розкажи будь ласка
+""".split())
+# Questions about the asker or the current market are answered fresh every time
+PERSONAL_WORDS = frozenset("""
+i me my mine myself we our ours us im ive
+я мене мені мій моя моє мої ми нас нам наш наша наші
+""".split())
+MARKET_WORDS = frozenset("""
+today tonight now currently current right latest yesterday tomorrow price prices week buy sell hold invest
+сьогодні зараз поточна поточний ціна ціни вчора завтра тиждень купити продати тримати інвестувати
+""".split())
+
+
+def tokens(text):
+    return [word for word in _WORD.findall(text.casefold()) if word not in STOPWORDS]
+
+
+def cacheable(question):
+    """Whether a question is general enough to share its answer between users"""
+    words = set(_WORD.findall(question.casefold()))
+    if not words or len(words) > 40:
+        return False
+    if words & PERSONAL_WORDS or words & MARKET_WORDS:
+        return False
+    return not any(char.isdigit() for char in question)
+
+
+def embed(text, dim):
+    """Signed hashing-vectorizer embedding (words, word pairs, character trigrams), L2-normalized"""
+    words = tokens(text)
+    features = [(word, 1.0) for word in words]
+    features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features:
+        # crc32 is stable across processes, unlike hash(), so stored answers stay addressable
+        code = zlib.crc32(feature.encode())
+        vector[code % dim] += weight if code & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Answers to general chat questions, matched by embedding similarity.
+
+    Questions are embedded with a hashing vectorizer and compared by cosine
+    similarity against every cached question at once: a brute-force NumPy
+    matrix-vector product over a max_entries x dim float32 matrix (8 MB by
+    default), under a millisecond for a full index. A match at or above
+    ``threshold`` returns the stored answer instead of calling the LLM.
+    Only questions passing ``cacheable`` are stored, in the ``faq_answers``
+    collection with a TTL, so the index survives restarts and answers age out.
+    """
+
+    def __init__(self, db, writes, threshold=0.9, max_entries=2000, ttl_hours=24, dim=1024):
+        self.collection = db.faq_answers
+        self.writes = writes
+        self.threshold = threshold
+        self.ttl = ttl_hours * 3600
+        self.dim = dim
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.created = np.full(max_entries, -np.inf)
+        self.ids = [None] * max_entries
+        self.answers = [None] * max_entries
+        self.count = 0
+
+    @staticmethod
+    def answer_id(question):
+        return hashlib.sha256(" ".join(tokens(question)).encode()).hexdigest()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    async def load(self):
+        """Fill the index with the newest unexpired answers"""
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        try:
+            docs = await self.collection.find(
+                {"created_at": {"$gte": since}}, {"question": 1, "answer": 1, "created_at": 1}
+            ).sort("created_at", -1).to_list(len(self.ids))
+        except Exception as e:
+            logger.error(f"Error loading cached answers: {e}")
+            return
+        for doc in reversed(docs):
+            created = doc["created_at"]
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+            self._insert(doc["_id"], embed(doc["question"], self.dim), doc["answer"], created.timestamp())
+        logger.info(f"Loaded {len(docs)} cached chat answers")
+
+    def _insert(self, answer_id, vector, answer, created):
+        # Ring buffer: once full, the oldest answer's row is reused
+        row = self.count % len(self.ids)
+        self.vectors[row] = vector
+        self.created[row] = created
+        self.ids[row] = answer_id
+        self.answers[row] = answer
+        self.count += 1
+
+    def _best(self, vector):
+        rows = min(self.count, len(self.ids))
+        if not rows:
+            return None, 0.0
+        scores = self.vectors[:rows] @ vector
+        scores[self.created[:rows] < time.time() - self.ttl] = -1.0
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def lookup(self, question, expected_latency=0.0):
+        """Cached answer for a question similar enough to one already answered, else None"""
+        if not cacheable(question):
+            return None
+        row, score = self._best(embed(question, self.dim))
+        FAQ_SIMILARITY.observe(max(score, 0.0))
+        if row is None or score < self.threshold:
+            cache_miss('faq')
+            return None
+        cache_hit('faq')
+        FAQ_SAVED_SECONDS.inc(expected_latency)
+        self.writes.add('faq_answers', UpdateOne({"_id": self.ids[row]}, {"$inc": {"hits": 1}}))
+        return self.answers[row]
+
+    def add(self, question, answer):
+        """Store a fresh LLM answer if the question is general and not already covered"""
+        if not answer or not cacheable(question):
+            return
+        vector = embed(question, self.dim)
+        _, score = self._best(vector)
+        if score >= self.threshold:
+            return
+        answer_id = self.answer_id(question)
+        now = datetime.now(timezone.utc)
+        self._insert(answer_id, vector, answer, now.timestamp())
+        self.writes.add('faq_answers', UpdateOne(
+            {"_id": answer_id},
+            {"$set": {"question": question, "answer": answer, "created_at": now}, "$setOnInsert": {"hits": 0}},
+            upsert=True
+        ), key=answer_id)
@@ -1,24 +1,57 @@
+import time
+STARTED_AT = time.monotonic()  # before the imports below, which dominate startup
+
 import os
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
     filters,
     ContextTypes,
     PreCheckoutQueryHandler,
+    TypeHandler,
 )
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from prometheus_client import start_http_server
+from pymongo import UpdateOne
 from datetime import datetime, timezone, timedelta
 import asyncio
 
+from analytics import Analytics
+from answer_cache import SemanticAnswerCache
 from crypto_service import CryptoService
+from fx_service import BASE_CURRENCY, FxService
 from news_service import NewsService
 from ai_service import AIService
 from payment_service import PaymentService
+from alert_service import AlertService, ALERT_KINDS
+from notification_service import NotificationQueue
+from portfolio_service import PortfolioService
+from chart_service import ChartService, CHART_RANGES
+from history_store import HistoryStore
+from lifecycle import STOP, Lifecycle
+from overload import OverloadController
+from profiling import profiler
+from i18n import SUPPORTED_LANGUAGES, resolve_language, t
+from models import DigestSnapshot, User
+from request_budget import background_priority
+from resilience import CacheOnlyMiss, cache_only
+from write_buffer import WriteBuffer
+from collection_versions import CollectionVersions
+from translation_service import TranslationCache
+from config import config
+from metrics import BROADCAST_MESSAGES, DIGEST_SUMMARIES, STARTUP_SECONDS, MongoCommandMetrics, timed_handler
 
 load_dotenv()
 
@@ -28,188 +61,482 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Offered as /currency buttons
+CURRENCY_CHOICES = [code.strip().upper() for code in config.CURRENCY_CHOICES.split(',') if code.strip()]
+
+# A user who chatted this recently keeps their conversation when new chat is being shed
+CHAT_SESSION_SECONDS = 300
+
+# Digest broadcasts record progress this often, and resume after a restart within this window
+DIGEST_CHECKPOINT_EVERY = 100
+DIGEST_RESUME_HOURS = 12
+
 # MongoDB setup
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Initialize services
-crypto_service = CryptoService()
-news_service = NewsService()
-ai_service = AIService()
-payment_service = PaymentService(db)
+collection_versions = CollectionVersions(db)
+write_buffer = WriteBuffer(
+    db,
+    max_ops=config.WRITE_BUFFER_MAX_OPS,
+    flush_interval=config.WRITE_BUFFER_FLUSH_SECONDS,
+    versions=collection_versions,
+    ordered=('chat_history',)
+)
+history_store = HistoryStore(db)
+fx_service = FxService()
+crypto_service = CryptoService(history_store, fx_service)
+answer_cache = SemanticAnswerCache(
+    db, write_buffer,
+    threshold=config.FAQ_CACHE_THRESHOLD,
+    max_entries=config.FAQ_CACHE_SIZE,
+    ttl_hours=config.FAQ_CACHE_TTL_HOURS
+) if config.FAQ_CACHE_ENABLED else None
+ai_service = AIService(write_buffer, answer_cache)
+translations = TranslationCache(db, ai_service.translate)
+news_service = NewsService(translations)
+payment_service = PaymentService(db, collection_versions)
+alert_service = AlertService(db)
+portfolio_service = PortfolioService(db, crypto_service)
+chart_service = ChartService(crypto_service)
+notification_queue = NotificationQueue(rate_per_sec=config.NOTIFY_RATE_PER_SEC)
+overload = OverloadController()
+# Rollups wait for the write buffer to flush before folding a minute
+analytics = Analytics(
+    db, write_buffer, payment_service.get_tier,
+    rollup_lag=max(60, 2 * config.WRITE_BUFFER_FLUSH_SECONDS),
+    versions=collection_versions
+)
+analytics.capture_failures(logger)
 
 
 class TelegramBot:
     def __init__(self):
         self.token = os.environ.get('TELEGRAM_BOT_TOKEN')
         self.application = None
+        self.lifecycle = Lifecycle(config.SHUTDOWN_TIMEOUT)
+        # (headlines and movers key, summary) of the last digest, reused if a rerun sees the same inputs
+        self.digest_summary_cache = (None, None)
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         user = update.effective_user
         telegram_id = user.id
         
-        # Register user in database
-        existing_user = await db.users.find_one({"telegram_id": telegram_id})
-        if not existing_user:
-            await db.users.insert_one({
+        # Register user in database (single upsert, safe against concurrent /start)
+        result = await db.users.update_one(
+            {"telegram_id": telegram_id},
+            {"$setOnInsert": {
                 "telegram_id": telegram_id,
                 "username": user.username,
                 "first_name": user.first_name,
                 "subscription_tier": "free",
                 "created_at": datetime.now(timezone.utc).isoformat()
-            })
+            }},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            await collection_versions.bump('users')
         
+        language = await self.user_language(update, context)
         keyboard = [
-            [InlineKeyboardButton("📊 Market Overview", callback_data="market_overview")],
-            [InlineKeyboardButton("📰 Latest News", callback_data="latest_news")],
-            [InlineKeyboardButton("💎 Analyze Asset", callback_data="analyze_asset")],
-            [InlineKeyboardButton("🤖 AI Assistant", callback_data="ai_chat")],
-            [InlineKeyboardButton("⭐ Premium Subscription", callback_data="subscribe")],
+            [InlineKeyboardButton(t(language, 'button.market'), callback_data="market_overview")],
+            [InlineKeyboardButton(t(language, 'button.news'), callback_data="latest_news")],
+            [InlineKeyboardButton(t(language, 'button.analyze'), callback_data="analyze_asset")],
+            [InlineKeyboardButton(t(language, 'button.ai_chat'), callback_data="ai_chat")],
+            [InlineKeyboardButton(t(language, 'button.subscribe'), callback_data="subscribe")],
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        welcome_text = f"""👋 Welcome to Crypto Analysis Bot, {user.first_name}!
-
-🆓 **Free Features:**
-• Daily news digest
-• General market overview
-• Basic price checks
-
-⭐ **Premium Features ($5/month):**
-• Detailed AI-powered asset analysis
-• Price predictions with reasoning
-• Unlimited AI conversations
-• Personalized alerts
-• In-depth market reports
-
-What would you like to do?"""
+        welcome_text = t(language, 'welcome', name=user.first_name)
         
         await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='Markdown')
     
+    async def load_preferences(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Language and currency for the user, looked up once per process and kept in user_data"""
+        preferences = context.user_data
+        if 'language' not in preferences or 'currency' not in preferences:
+            user = update.effective_user
+            doc = await db.users.find_one({"telegram_id": user.id}, {"_id": 0, "language": 1, "currency": 1}) or {}
+            preferences.setdefault('language', resolve_language(doc.get('language'), user.language_code))
+            preferences.setdefault('currency', doc.get('currency') or config.DEFAULT_CURRENCY)
+        return preferences
+    
+    async def user_language(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Reply language for the user"""
+        return (await self.load_preferences(update, context))['language']
+    
+    async def user_currency(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Currency the user sees prices in"""
+        return (await self.load_preferences(update, context))['currency']
+    
+    async def language_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /language command"""
+        if context.args:
+            await self.set_language(update, context, context.args[0].lower())
+            return
+        
+        language = await self.user_language(update, context)
+        keyboard = [[
+            InlineKeyboardButton(t(code, 'language.name'), callback_data=f"language:{code}")
+            for code in SUPPORTED_LANGUAGES
+        ]]
+        await update.message.reply_text(t(language, 'language.prompt'), reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def set_language(self, update: Update, context: ContextTypes.DEFAULT_TYPE, language):
+        """Store the user's language choice and confirm it in that language"""
+        message = update.message or update.callback_query.message
+        if language not in SUPPORTED_LANGUAGES:
+            current = await self.user_language(update, context)
+            await message.reply_text(t(current, 'language.usage', languages='|'.join(SUPPORTED_LANGUAGES)))
+            return
+        
+        await db.users.update_one({"telegram_id": update.effective_user.id}, {"$set": {"language": language}})
+        context.user_data['language'] = language
+        await message.reply_text(t(language, 'language.set'))
+    
+    async def currency_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /currency command"""
+        if context.args:
+            await self.set_currency(update, context, context.args[0])
+            return
+        
+        language = await self.user_language(update, context)
+        keyboard = [[InlineKeyboardButton(code, callback_data=f"currency:{code}") for code in CURRENCY_CHOICES]]
+        await update.message.reply_text(t(language, 'currency.prompt'), reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def set_currency(self, update: Update, context: ContextTypes.DEFAULT_TYPE, currency):
+        """Store the user's currency if the exchange-rate table knows it"""
+        message = update.message or update.callback_query.message
+        language = await self.user_language(update, context)
+        currency = currency.upper()
+        try:
+            known = currency == BASE_CURRENCY or (await fx_service.get_table()).supports(currency)
+        except Exception as e:
+            logger.warning(f"Exchange rates unavailable, accepting only the listed currencies: {e}")
+            known = currency in CURRENCY_CHOICES
+        if not known:
+            await message.reply_text(t(language, 'currency.usage', currencies='|'.join(CURRENCY_CHOICES)))
+            return
+        
+        await db.users.update_one({"telegram_id": update.effective_user.id}, {"$set": {"currency": currency}})
+        context.user_data['currency'] = currency
+        await message.reply_text(t(language, 'currency.set', currency=currency))
+    
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
-        help_text = """🔰 **Available Commands:**
-
-/start - Start the bot
-/help - Show this help message
-/market - Get market overview
-/news - Get latest crypto news
-/price [symbol] - Get price of a crypto (e.g., /price BTC)
-/analyze [symbol] - Detailed analysis (Premium)
-/subscribe - Subscribe to premium
-/status - Check your subscription status
-
-You can also chat directly with me for AI assistance (Premium feature)!"""
+        help_text = t(await self.user_language(update, context), 'help')
         
         await update.message.reply_text(help_text, parse_mode='Markdown')
     
     async def market_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /market command - Free feature"""
-        await update.message.reply_text("📊 Fetching market data...")
+        language = await self.user_language(update, context)
+        await update.message.reply_text(t(language, 'market.loading'))
         
         try:
-            market_data = await crypto_service.get_market_overview()
+            market_data = await self.market_overview(await self.user_currency(update, context))
             await update.message.reply_text(market_data, parse_mode='Markdown')
+        except CacheOnlyMiss:
+            await update.message.reply_text(t(language, 'overload.busy'))
         except Exception as e:
             logger.error(f"Error fetching market data: {e}")
-            await update.message.reply_text("❌ Error fetching market data. Please try again later.")
+            await update.message.reply_text(t(language, 'market.error'))
+    
+    async def market_overview(self, currency):
+        """Market overview, served from cache only while the bot is overloaded"""
+        if not overload.degraded:
+            return await crypto_service.get_market_overview(currency)
+        overload.degrade('market')
+        with cache_only():
+            return await crypto_service.get_market_overview(currency)
     
     async def news_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /news command - Free feature"""
-        await update.message.reply_text("📰 Fetching latest news...")
+        language = await self.user_language(update, context)
+        await update.message.reply_text(t(language, 'news.loading'))
         
         try:
-            news = await news_service.get_latest_news()
+            news = await news_service.get_latest_news(language)
             await update.message.reply_text(news, parse_mode='Markdown', disable_web_page_preview=True)
         except Exception as e:
             logger.error(f"Error fetching news: {e}")
-            await update.message.reply_text("❌ Error fetching news. Please try again later.")
+            await update.message.reply_text(t(language, 'news.error'))
     
     async def price_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /price command - Free feature"""
+        language = await self.user_language(update, context)
         if not context.args:
-            await update.message.reply_text("Please provide a crypto symbol. Example: /price BTC")
+            await update.message.reply_text(t(language, 'price.usage'))
             return
         
         symbol = context.args[0].upper()
         
         try:
-            price_data = await crypto_service.get_price(symbol)
+            if overload.degraded:
+                overload.degrade('price')
+            with cache_only(overload.degraded):
+                price_data = await crypto_service.get_price(symbol, await self.user_currency(update, context))
             await update.message.reply_text(price_data, parse_mode='Markdown')
+        except CacheOnlyMiss:
+            await update.message.reply_text(t(language, 'overload.busy'))
         except Exception as e:
             logger.error(f"Error fetching price: {e}")
-            await update.message.reply_text(f"❌ Error fetching price for {symbol}. Please check the symbol and try again.")
+            await update.message.reply_text(t(language, 'price.error', symbol=symbol))
+    
+    async def ta_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /ta command - Free feature"""
+        language = await self.user_language(update, context)
+        if not context.args:
+            await update.message.reply_text(t(language, 'ta.usage'))
+            return
+        
+        symbols = [arg.upper() for arg in context.args[:5]]
+        
+        try:
+            ta_text = await crypto_service.get_technical_analysis(symbols)
+            await update.message.reply_text(ta_text, parse_mode='Markdown')
+        except Exception as e:
+            logger.error(f"Error computing technical analysis: {e}")
+            await update.message.reply_text(t(language, 'ta.error'))
     
     async def analyze_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /analyze command - Premium feature"""
         user_id = update.effective_user.id
+        language = await self.user_language(update, context)
         
         # Check subscription
         is_premium = await payment_service.check_subscription(user_id)
         if not is_premium:
-            await update.message.reply_text(
-                "⭐ This is a premium feature. Please subscribe using /subscribe to access detailed analysis."
-            )
+            await update.message.reply_text(t(language, 'analyze.premium'))
             return
         
         if not context.args:
-            await update.message.reply_text("Please provide a crypto symbol. Example: /analyze BTC")
+            await update.message.reply_text(t(language, 'analyze.usage'))
             return
         
         symbol = context.args[0].upper()
-        await update.message.reply_text(f"🔍 Analyzing {symbol}... This may take a moment.")
+        await update.message.reply_text(t(language, 'analyze.loading', symbol=symbol))
         
         try:
             # Get crypto data
             crypto_data = await crypto_service.get_detailed_data(symbol)
             
-            # Get AI analysis
-            analysis = await ai_service.analyze_asset(symbol, crypto_data)
+            # Get AI analysis, in short form while the bot is overloaded
+            brief = overload.degraded
+            if brief:
+                overload.degrade('analysis')
+            analysis = await ai_service.analyze_asset(symbol, crypto_data, brief=brief)
             
             await update.message.reply_text(analysis, parse_mode='Markdown')
         except Exception as e:
             logger.error(f"Error analyzing {symbol}: {e}")
-            await update.message.reply_text(f"❌ Error analyzing {symbol}. Please try again later.")
+            await update.message.reply_text(t(language, 'analyze.error', symbol=symbol))
+    
+    async def alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /alert command - Premium feature"""
+        user_id = update.effective_user.id
+        language = await self.user_language(update, context)
+        
+        is_premium = await payment_service.check_subscription(user_id)
+        if not is_premium:
+            await update.message.reply_text(t(language, 'alert.premium'))
+            return
+        
+        usage = t(language, 'alert.usage')
+        if len(context.args) != 3 or context.args[1].lower() not in ALERT_KINDS:
+            await update.message.reply_text(usage)
+            return
+        
+        symbol = context.args[0].upper()
+        kind = context.args[1].lower()
+        try:
+            value = float(context.args[2].replace(',', '').rstrip('%'))
+        except ValueError:
+            await update.message.reply_text(usage)
+            return
+        
+        try:
+            if await alert_service.count_active(user_id) >= config.ALERTS_PER_USER_LIMIT:
+                await update.message.reply_text(t(language, 'alert.limit', limit=config.ALERTS_PER_USER_LIMIT))
+                return
+            
+            await crypto_service.get_market_snapshot()
+            coin = crypto_service.find_snapshot_coin(symbol)
+            if not coin:
+                await update.message.reply_text(
+                    t(language, 'alert.untracked', limit=config.MARKET_SNAPSHOT_SIZE, symbol=symbol)
+                )
+                return
+            
+            alert = await alert_service.create_alert(user_id, coin, kind, value)
+            await update.message.reply_text(
+                t(language, 'alert.created', alert_id=alert['alert_id'], description=alert_service.describe(alert)),
+                parse_mode='Markdown'
+            )
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+        except Exception as e:
+            logger.error(f"Error creating alert: {e}")
+            await update.message.reply_text(t(language, 'alert.error'))
+    
+    async def alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /alerts command"""
+        user_id = update.effective_user.id
+        language = await self.user_language(update, context)
+        
+        alerts = await alert_service.list_alerts(user_id)
+        if not alerts:
+            await update.message.reply_text(t(language, 'alerts.empty'))
+            return
+        
+        text = t(language, 'alerts.header') + "\n\n"
+        for alert in alerts:
+            text += f"`{alert['alert_id']}` - {alert_service.describe(alert)}\n"
+        text += "\n" + t(language, 'alerts.footer')
+        
+        await update.message.reply_text(text, parse_mode='Markdown')
+    
+    async def delalert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /delalert command"""
+        language = await self.user_language(update, context)
+        if not context.args:
+            await update.message.reply_text(t(language, 'delalert.usage'))
+            return
+        
+        alert_id = context.args[0].lower()
+        if await alert_service.delete_alert(update.effective_user.id, alert_id):
+            await update.message.reply_text(t(language, 'delalert.deleted', alert_id=alert_id))
+        else:
+            await update.message.reply_text(t(language, 'delalert.not_found', alert_id=alert_id))
+    
+    async def watch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /watch command"""
+        user_id = update.effective_user.id
+        language = await self.user_language(update, context)
+        action = context.args[0].lower() if context.args else None
+        symbols = [arg.upper() for arg in context.args[1:]]
+        
+        try:
+            if action == 'add' and symbols:
+                added = []
+                for symbol in symbols:
+                    coin = await crypto_service.resolve_coin(symbol)
+                    if coin and await portfolio_service.add_to_watchlist(user_id, coin):
+                        added.append(coin.symbol)
+                text = t(language, 'watch.added', symbols=', '.join(added)) if added else t(language, 'watch.nothing_added')
+            elif action == 'remove' and symbols:
+                removed = [s for s in symbols if await portfolio_service.remove_from_watchlist(user_id, s)]
+                text = t(language, 'watch.removed', symbols=', '.join(removed)) if removed else t(language, 'nothing_to_remove')
+            elif action is None:
+                text = await portfolio_service.get_watchlist_text(user_id)
+            else:
+                text = t(language, 'watch.usage')
+            await update.message.reply_text(text, parse_mode='Markdown')
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+        except Exception as e:
+            logger.error(f"Error handling watchlist: {e}")
+            await update.message.reply_text(t(language, 'watch.error'))
+    
+    async def portfolio_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /portfolio command"""
+        user_id = update.effective_user.id
+        args = context.args or []
+        action = args[0].lower() if args else None
+        language = await self.user_language(update, context)
+        usage = t(language, 'portfolio.usage')
+        
+        try:
+            if action == 'add' and len(args) == 3:
+                try:
+                    amount = float(args[2].replace(',', ''))
+                except ValueError:
+                    await update.message.reply_text(usage)
+                    return
+                coin = await crypto_service.resolve_coin(args[1].upper())
+                if not coin:
+                    await update.message.reply_text(t(language, 'coin.not_found', symbol=args[1].upper()))
+                    return
+                await portfolio_service.set_holding(user_id, coin, amount)
+                text = t(language, 'portfolio.set', symbol=coin.symbol, amount=f"{amount:,.8g}")
+            elif action == 'remove' and len(args) == 2:
+                removed = await portfolio_service.remove_holding(user_id, args[1])
+                text = t(language, 'portfolio.removed', symbol=args[1].upper()) if removed else t(language, 'nothing_to_remove')
+            elif action is None:
+                text = await portfolio_service.get_portfolio_text(user_id)
+            else:
+                text = usage
+            await update.message.reply_text(text, parse_mode='Markdown')
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+        except Exception as e:
+            logger.error(f"Error handling portfolio: {e}")
+            await update.message.reply_text(t(language, 'portfolio.error'))
+    
+    async def chart_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /chart command - Free feature"""
+        language = await self.user_language(update, context)
+        usage = t(language, 'chart.usage', ranges='|'.join(CHART_RANGES))
+        if not context.args:
+            await update.message.reply_text(usage)
+            return
+        
+        symbol = context.args[0].upper()
+        chart_range = context.args[1].lower() if len(context.args) > 1 else '7d'
+        if chart_range not in CHART_RANGES:
+            await update.message.reply_text(usage)
+            return
+        
+        try:
+            coin = await crypto_service.resolve_coin(symbol)
+            if not coin:
+                await update.message.reply_text(t(language, 'coin.not_found', symbol=symbol))
+                return
+            
+            chart = await chart_service.get_chart(coin, chart_range)
+            message = await update.message.reply_photo(
+                photo=chart['file_id'] or chart['png'],
+                caption=f"📈 {coin.name} ({coin.symbol}) · {chart_range}"
+            )
+            if not chart['file_id'] and message.photo:
+                chart_service.remember_file_id(chart['key'], message.photo[-1].file_id)
+        except Exception as e:
+            logger.error(f"Error rendering chart for {symbol}: {e}")
+            await update.message.reply_text(t(language, 'chart.error', symbol=symbol))
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /status command"""
         user_id = update.effective_user.id
         
-        user_data = await db.users.find_one({"telegram_id": user_id})
-        subscription = await db.subscriptions.find_one({"telegram_id": user_id})
+        language = await self.user_language(update, context)
+        subscription = await payment_service.get_subscription(user_id)
         
-        if subscription and subscription.get('expires_at'):
-            expires_at = subscription['expires_at']
-            if isinstance(expires_at, str):
-                expires_at = datetime.fromisoformat(expires_at)
-            
-            if expires_at > datetime.now(timezone.utc):
-                status_text = f"""✅ **Subscription Status**
-
-🎯 Tier: Premium ⭐
-📅 Expires: {expires_at.strftime('%Y-%m-%d %H:%M UTC')}
-💡 Enjoy unlimited access to all features!"""
+        if subscription and subscription.expires_at:
+            if subscription.is_active():
+                expires = subscription.expires_at.strftime('%Y-%m-%d %H:%M UTC')
+                status_text = t(language, 'status.premium', expires=expires)
             else:
-                status_text = """❌ **Subscription Status**
-
-🎯 Tier: Free
-💡 Your premium subscription has expired. Renew with /subscribe"""
+                status_text = t(language, 'status.expired')
         else:
-            status_text = """📊 **Subscription Status**
-
-🎯 Tier: Free
-💡 Upgrade to Premium for $5/month to unlock:
-• AI-powered asset analysis
-• Price predictions
-• Unlimited AI chat
-• Personalized alerts
-
-Use /subscribe to upgrade!"""
+            status_text = t(language, 'status.free')
         
         await update.message.reply_text(status_text, parse_mode='Markdown')
     
+    async def track_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Record last-seen time for registered users via the write-behind buffer.
+
+        These writes leave the users collection version alone, so activity
+        alone does not invalidate the dashboard's ETags."""
+        user = update.effective_user
+        if user:
+            write_buffer.add('users', UpdateOne(
+                {"telegram_id": user.id},
+                {"$set": {"last_seen": datetime.now(timezone.utc).isoformat(), "language_code": user.language_code}}
+            ), key=user.id, bump=False)
+    
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages - AI chat (Premium)"""
         user_id = update.effective_user.id
@@ -218,10 +545,17 @@ Use /subscribe to upgrade!"""
         # Check subscription
         is_premium = await payment_service.check_subscription(user_id)
         if not is_premium:
-            await update.message.reply_text(
-                "🤖 AI Assistant is a premium feature. Subscribe with /subscribe to chat with AI!"
-            )
+            await update.message.reply_text(t(await self.user_language(update, context), 'chat.premium'))
+            return
+        
+        # Under heavy load, only paying users and ongoing conversations reach the LLM
+        now = time.monotonic()
+        ongoing = now - context.user_data.get('chat_at', float('-inf')) < CHAT_SESSION_SECONDS
+        if overload.shedding and not ongoing and not await payment_service.has_paid_subscription(user_id):
+            overload.degrade('chat')
+            await update.message.reply_text(t(await self.user_language(update, context), 'overload.chat_busy'))
             return
+        context.user_data['chat_at'] = now
         
         # AI Chat
         try:
@@ -229,7 +563,7 @@ Use /subscribe to upgrade!"""
             await update.message.reply_text(response, parse_mode='Markdown')
         except Exception as e:
             logger.error(f"Error in AI chat: {e}")
-            await update.message.reply_text("❌ Sorry, I encountered an error. Please try again.")
+            await update.message.reply_text(t(await self.user_language(update, context), 'chat.error'))
     
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
@@ -238,44 +572,45 @@ Use /subscribe to upgrade!"""
         
         user_id = update.effective_user.id
         callback_data = query.data
+        language = await self.user_language(update, context)
         
         if callback_data == "market_overview":
-            await query.message.reply_text("📊 Fetching market data...")
+            await query.message.reply_text(t(language, 'market.loading'))
             try:
-                market_data = await crypto_service.get_market_overview()
+                market_data = await self.market_overview(await self.user_currency(update, context))
                 await query.message.reply_text(market_data, parse_mode='Markdown')
+            except CacheOnlyMiss:
+                await query.message.reply_text(t(language, 'overload.busy'))
             except Exception as e:
-                await query.message.reply_text("❌ Error fetching market data.")
+                await query.message.reply_text(t(language, 'callback.market_error'))
         
         elif callback_data == "latest_news":
-            await query.message.reply_text("📰 Fetching latest news...")
+            await query.message.reply_text(t(language, 'news.loading'))
             try:
-                news = await news_service.get_latest_news()
+                news = await news_service.get_latest_news(language)
                 await query.message.reply_text(news, parse_mode='Markdown', disable_web_page_preview=True)
             except Exception as e:
-                await query.message.reply_text("❌ Error fetching news.")
+                await query.message.reply_text(t(language, 'callback.news_error'))
         
         elif callback_data == "analyze_asset":
             is_premium = await payment_service.check_subscription(user_id)
             if not is_premium:
-                await query.message.reply_text(
-                    "⭐ Asset analysis is a premium feature. Use /subscribe to upgrade!"
-                )
+                await query.message.reply_text(t(language, 'callback.analyze_premium'))
             else:
-                await query.message.reply_text(
-                    "Please send the crypto symbol you want to analyze (e.g., BTC, ETH, SOL)"
-                )
+                await query.message.reply_text(t(language, 'callback.analyze_prompt'))
         
         elif callback_data == "ai_chat":
             is_premium = await payment_service.check_subscription(user_id)
             if not is_premium:
-                await query.message.reply_text(
-                    "⭐ AI Assistant is a premium feature. Use /subscribe to upgrade!"
-                )
+                await query.message.reply_text(t(language, 'callback.chat_premium'))
             else:
-                await query.message.reply_text(
-                    "🤖 AI Assistant activated! Just send me your questions about crypto markets, analysis, or anything else."
-                )
+                await query.message.reply_text(t(language, 'callback.chat_ready'))
+        
+        elif callback_data.startswith("language:"):
+            await self.set_language(update, context, callback_data.split(":", 1)[1])
+        
+        elif callback_data.startswith("currency:"):
+            await self.set_currency(update, context, callback_data.split(":", 1)[1])
         
         elif callback_data == "subscribe":
             await self.subscribe_command(update, context)
@@ -290,10 +625,12 @@ Use /subscribe to upgrade!"""
             chat_id = update.callback_query.message.chat_id
             user_id = update.effective_user.id
         
+        language = await self.user_language(update, context)
+        
         # Check if already subscribed
         is_premium = await payment_service.check_subscription(user_id)
         if is_premium:
-            text = "✅ You already have an active premium subscription!"
+            text = t(language, 'subscribe.already')
             if update.message:
                 await update.message.reply_text(text)
             else:
@@ -301,8 +638,8 @@ Use /subscribe to upgrade!"""
             return
         
         # Create payment invoice
-        title = "Premium Subscription"
-        description = "Get unlimited access to AI analysis, detailed reports, and AI assistant for 30 days"
+        title = t(language, 'subscribe.title')
+        description = t(language, 'subscribe.description')
         payload = f"premium_sub_{user_id}"
         currency = "XTR"  # Telegram Stars
         price = 50  # 50 stars (~$5)
@@ -315,16 +652,41 @@ Use /subscribe to upgrade!"""
                 payload=payload,
                 provider_token="",  # Empty for Telegram Stars
                 currency=currency,
-                prices=[{"label": "Premium", "amount": price}]
+                prices=[{"label": t(language, 'subscribe.label'), "amount": price}]
             )
         except Exception as e:
             logger.error(f"Error sending invoice: {e}")
-            text = "❌ Error creating payment. Please try again later."
+            text = t(language, 'subscribe.error')
             if update.message:
                 await update.message.reply_text(text)
             else:
                 await update.callback_query.message.reply_text(text)
     
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Answer inline price queries from the cached market snapshot"""
+        query = update.inline_query
+        
+        results = []
+        for coin in crypto_service.coin_index.search(query.query, limit=10):
+            if coin.price is None:
+                # Listed on CoinGecko but without a current price
+                continue
+            symbol = coin.symbol
+            price = coin.price
+            change_24h = coin.change_24h
+            change_icon = "🟢" if change_24h > 0 else "🔴"
+            results.append(InlineQueryResultArticle(
+                id=coin.id,
+                title=f"{coin.name} ({symbol})",
+                description=f"${price:,.8g} | {change_24h:+.2f}% (24h)",
+                input_message_content=InputTextMessageContent(
+                    f"💎 **{coin.name} ({symbol})**\n💵 ${price:,.8g} | {change_icon} {change_24h:+.2f}% (24h)",
+                    parse_mode='Markdown'
+                )
+            ))
+        
+        await query.answer(results, cache_time=config.INLINE_CACHE_TIME)
+    
     async def precheckout_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle pre-checkout query"""
         query = update.pre_checkout_query
@@ -338,89 +700,355 @@ Use /subscribe to upgrade!"""
         # Activate premium subscription
         await payment_service.activate_subscription(user_id, payment_info)
         
-        await update.message.reply_text(
-            """🎉 **Payment Successful!**
-
-✅ Your premium subscription is now active!
-
-🎯 You now have access to:
-• Detailed AI-powered asset analysis
-• Price predictions with reasoning
-• Unlimited AI conversations
-• Personalized alerts
-
-Try /analyze BTC or just chat with me!""",
-            parse_mode='Markdown'
-        )
+        language = await self.user_language(update, context)
+        await update.message.reply_text(t(language, 'payment.success'), parse_mode='Markdown')
     
-    async def send_daily_digest(self):
-        """Send daily news digest to all users"""
+    async def send_daily_digest(self, run=None):
+        """Send daily news digest to all users, built once per language and currency.
+        
+        Users are sent in telegram_id order and progress is checkpointed in
+        digest_runs. On shutdown the broadcast stops after the current
+        message; ``resume_digest`` picks it up after the last user reached.
+        """
+        now = datetime.now(timezone.utc)
+        if run is None:
+            run = {"_id": now.strftime('%Y-%m-%d'), "last_telegram_id": None, "sent": 0}
+            await db.digest_runs.update_one(
+                {"_id": run["_id"]},
+                {"$set": {"status": "running", "started_at": now, "last_telegram_id": None, "sent": 0}},
+                upsert=True
+            )
+        last_id, sent, status = run.get("last_telegram_id"), run.get("sent", 0), "done"
         try:
-            news_digest = await news_service.get_daily_digest()
-            market_summary = await crypto_service.get_market_overview()
-            
-            digest_text = f"""🌅 **Daily Crypto Digest**
-
-{market_summary}
-
----
-
-{news_digest}
-
-💡 For detailed analysis and AI insights, upgrade to Premium with /subscribe"""
+            snapshot = await self.build_digest_snapshot()
+            digests = {}
             
-            # Get all users
-            users = await db.users.find({}).to_list(1000)
-            
-            for user in users:
+            # Stream users after the checkpoint; only the id, language and currency are needed
+            projection = {"_id": 0, "telegram_id": 1, "language": 1, "language_code": 1, "currency": 1}
+            query = {} if last_id is None else {"telegram_id": {"$gt": last_id}}
+            async for doc in db.users.find(query, projection).sort("telegram_id", 1):
+                if not self.application.running:
+                    status = "interrupted"
+                    break
+                user = User.from_doc(doc)
+                edition = (resolve_language(user.language, user.language_code), user.currency or config.DEFAULT_CURRENCY)
+                if edition not in digests:
+                    digests[edition] = await self.build_digest(snapshot, *edition)
                 try:
                     await self.application.bot.send_message(
-                        chat_id=user['telegram_id'],
-                        text=digest_text,
+                        chat_id=user.telegram_id,
+                        text=digests[edition],
                         parse_mode='Markdown',
                         disable_web_page_preview=True
                     )
+                    BROADCAST_MESSAGES.labels('sent').inc()
                     await asyncio.sleep(0.1)  # Rate limiting
                 except Exception as e:
-                    logger.error(f"Error sending digest to {user['telegram_id']}: {e}")
+                    BROADCAST_MESSAGES.labels('failed').inc()
+                    logger.error(f"Error sending digest to {user.telegram_id}: {e}")
+                last_id, sent = user.telegram_id, sent + 1
+                if sent % DIGEST_CHECKPOINT_EVERY == 0:
+                    await self.checkpoint_digest(run["_id"], last_id, sent, "running")
         
         except Exception as e:
+            status = "failed"
             logger.error(f"Error creating daily digest: {e}")
+        
+        await self.checkpoint_digest(run["_id"], last_id, sent, status)
+        logger.info(f"Digest {run['_id']} {status} after {sent} users")
+    
+    async def checkpoint_digest(self, run_id, last_id, sent, status):
+        try:
+            await db.digest_runs.update_one(
+                {"_id": run_id},
+                {"$set": {"last_telegram_id": last_id, "sent": sent, "status": status,
+                          "updated_at": datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            logger.warning(f"Could not checkpoint digest {run_id}: {e}")
+    
+    async def resume_digest(self, context: ContextTypes.DEFAULT_TYPE):
+        """Finish a recent digest broadcast cut short by a restart"""
+        since = datetime.now(timezone.utc) - timedelta(hours=DIGEST_RESUME_HOURS)
+        run = await db.digest_runs.find_one(
+            {"status": {"$in": ["running", "interrupted"]}, "started_at": {"$gte": since}},
+            sort=[("started_at", -1)]
+        )
+        if run:
+            logger.info(f"Resuming digest {run['_id']} after {run.get('sent', 0)} users")
+            await self.send_daily_digest(run)
+    
+    async def build_digest_snapshot(self):
+        """Fetch the digest content once per broadcast, with the AI summary if it arrives in time"""
+        # Every currency users chose, converted from one market fetch
+        currencies = [config.DEFAULT_CURRENCY, BASE_CURRENCY]
+        try:
+            currencies += [code for code in await db.users.distinct("currency") if code]
+        except Exception as e:
+            logger.warning(f"Could not list user currencies for the digest: {e}")
+        with background_priority():
+            market_summaries = await crypto_service.get_market_overviews(list(dict.fromkeys(currencies)))
+            try:
+                movers = await crypto_service.get_top_movers()
+            except Exception as e:
+                logger.warning(f"No market movers for the digest summary: {e}")
+                movers = []
+        news = await news_service.get_digest_news()
+        return DigestSnapshot(market_summaries, news, await self.digest_summary(news, movers))
+    
+    async def digest_summary(self, news, movers):
+        """One AI summary per digest cycle; None (plain headline list) when disabled, failing or slow"""
+        if not config.DIGEST_SUMMARY_ENABLED or not news:
+            return None
+        headlines = [item.title for item in news]
+        key = (tuple(headlines), tuple(coin.symbol for coin in movers))
+        cached_key, cached_summary = self.digest_summary_cache
+        if key == cached_key:
+            DIGEST_SUMMARIES.labels('cached').inc()
+            return cached_summary
+        try:
+            summary = await asyncio.wait_for(
+                ai_service.summarize_digest(headlines, movers), config.DIGEST_SUMMARY_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            DIGEST_SUMMARIES.labels('timeout').inc()
+            logger.warning(f"Digest summary timed out after {config.DIGEST_SUMMARY_TIMEOUT}s, sending headlines only")
+            return None
+        except Exception as e:
+            DIGEST_SUMMARIES.labels('failed').inc()
+            logger.warning(f"Digest summary failed, sending headlines only: {e}")
+            return None
+        if not summary:
+            DIGEST_SUMMARIES.labels('failed').inc()
+            return None
+        DIGEST_SUMMARIES.labels('generated').inc()
+        self.digest_summary_cache = (key, summary)
+        return summary
+    
+    async def build_digest(self, snapshot, language, currency=BASE_CURRENCY):
+        """Digest text for one language and currency; headlines and summary go through the translation cache"""
+        news_digest = await news_service.get_daily_digest(
+            language, snapshot.news, snapshot.summary, summary_timeout=config.DIGEST_SUMMARY_TIMEOUT
+        )
+        market_summary = snapshot.market_summaries.get(currency) or snapshot.market_summaries[BASE_CURRENCY]
+        return f"""{t(language, 'digest.header')}
+
+{market_summary}
+
+---
+
+{news_digest}
+
+{t(language, 'digest.footer')}"""
     
     async def schedule_daily_tasks(self, context: ContextTypes.DEFAULT_TYPE):
         """Schedule daily tasks"""
         await self.send_daily_digest()
     
-    def run(self):
-        """Start the bot"""
-        if not self.token:
-            logger.error("TELEGRAM_BOT_TOKEN not found in environment variables")
+    async def poll_market(self, context: ContextTypes.DEFAULT_TYPE):
+        """Refresh the market snapshot and dispatch triggered alerts"""
+        try:
+            with background_priority():
+                coins = await crypto_service.get_market_snapshot()
+        except Exception as e:
+            logger.error(f"Market poll failed: {e}")
+            return
+        
+        if crypto_service.snapshot_age:
+            # CoinGecko is down and the snapshot is a cached copy already recorded and checked
             return
         
-        self.application = Application.builder().token(self.token).build()
+        await history_store.record_snapshot(coins)
+        
+        fired = await alert_service.check_snapshot(coins)
+        for alert, price in fired:
+            notification_queue.enqueue(
+                alert['telegram_id'],
+                alert_service.format_triggered(alert, price),
+                parse_mode='Markdown'
+            )
+        if fired:
+            logger.info(f"Dispatched {len(fired)} price alerts")
+    
+    async def rollup_analytics(self, context: ContextTypes.DEFAULT_TYPE):
+        """Fold recent usage events into the minute/hour/day rollups"""
+        try:
+            groups = await analytics.rollup()
+            if groups:
+                logger.info(f"Rolled up {groups} usage event groups")
+        except Exception as e:
+            logger.warning(f"Analytics rollup failed: {e}")
+    
+    async def post_init(self, application: Application):
+        """Load alerts and start background workers once the loop is running"""
+        if config.METRICS_PORT:
+            start_http_server(config.METRICS_PORT)
+            logger.info(f"Metrics available on :{config.METRICS_PORT}/metrics")
+        # The LLM SDK is only needed by the first AI request; import it off the loop meanwhile
+        asyncio.get_running_loop().run_in_executor(None, ai_service.preload)
+        # Independent setup round-trips run concurrently
+        await asyncio.gather(
+            self.ensure_user_index(),
+            payment_service.ensure_indexes(),
+            alert_service.ensure_indexes(),
+            alert_service.load_active(),
+            portfolio_service.ensure_indexes(),
+            history_store.ensure_collection(),
+            analytics.ensure_indexes(config.ANALYTICS_EVENT_RETENTION_DAYS, config.ANALYTICS_MINUTE_RETENTION_DAYS),
+            self.load_answer_cache(),
+        )
+        self.register_components(application)
+        await self.lifecycle.startup()
+    
+    def register_components(self, application: Application):
+        """Background workers and pools, in start order; shutdown runs in reverse"""
+        lifecycle = self.lifecycle
+        lifecycle.add("profiler", start=lambda: profiler.start('bot'), stop=profiler.stop)
+        lifecycle.add("chart renderer", start=chart_service.start, stop=chart_service.close)
+        lifecycle.add("CoinGecko session", stop=crypto_service.close)
+        lifecycle.add("news sessions", stop=news_service.close)
+        lifecycle.add("exchange-rate session", stop=fx_service.close)
+        lifecycle.add("MongoDB client", stop=client.close)
+        lifecycle.add("write buffer", start=write_buffer.start, stop=write_buffer.stop)
+        lifecycle.add(
+            "notification queue",
+            start=lambda: self.start_notifications(application),
+            stop=self.stop_notifications,
+            phase=STOP
+        )
+        lifecycle.add("overload controller", start=overload.start, stop=overload.stop)
+        lifecycle.add(
+            "readiness file",
+            start=lambda: self.mark_ready(True),
+            stop=lambda: self.mark_ready(False),
+            phase=STOP
+        )
+    
+    async def load_answer_cache(self):
+        if answer_cache is None:
+            return
+        try:
+            await answer_cache.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create faq_answers TTL index: {e}")
+        await answer_cache.load()
+    
+    async def ensure_user_index(self):
+        try:
+            await db.users.create_index("telegram_id", unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create unique users index (duplicate registrations?): {e}")
+    
+    def mark_ready(self, ready):
+        """Create or remove the readiness file checked by the container healthcheck"""
+        if not config.BOT_READY_FILE:
+            return
+        try:
+            if ready:
+                with open(config.BOT_READY_FILE, 'w') as f:
+                    f.write(str(os.getpid()))
+                STARTUP_SECONDS.labels('bot').set(time.monotonic() - STARTED_AT)
+                logger.info(f"Bot ready after {time.monotonic() - STARTED_AT:.2f}s")
+            elif os.path.exists(config.BOT_READY_FILE):
+                os.remove(config.BOT_READY_FILE)
+        except OSError as e:
+            logger.warning(f"Could not update readiness file {config.BOT_READY_FILE}: {e}")
+    
+    async def start_notifications(self, application: Application):
+        """Start delivery and requeue messages the previous process could not send in time"""
+        notification_queue.start(application.bot)
+        try:
+            docs = await db.pending_notifications.find().sort("_id", 1).to_list(None)
+        except Exception as e:
+            logger.error(f"Could not load pending notifications: {e}")
+            return
+        for doc in docs:
+            notification_queue.enqueue(doc["chat_id"], doc["text"], **doc.get("kwargs", {}))
+        if docs:
+            await db.pending_notifications.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            logger.info(f"Requeued {len(docs)} notifications from the last shutdown")
+    
+    async def stop_notifications(self):
+        """Drain the queue within the shutdown budget and keep the rest for the next start"""
+        # Leave a second of the budget for the writes and connections closed after it
+        undelivered = await notification_queue.stop(timeout=max(self.lifecycle.remaining() - 1, 0))
+        if undelivered:
+            now = datetime.now(timezone.utc)
+            await db.pending_notifications.insert_many([
+                {"chat_id": chat_id, "text": text, "kwargs": kwargs, "queued_at": now}
+                for chat_id, text, kwargs in undelivered
+            ])
+            logger.info(f"Saved {len(undelivered)} undelivered notifications for the next start")
+    
+    async def post_stop(self, application: Application):
+        """Leave readiness and deliver pending notifications while the bot can still send"""
+        await self.lifecycle.shutdown(STOP)
+    
+    async def post_shutdown(self, application: Application):
+        """Flush buffered writes, then close pools, within what is left of SHUTDOWN_TIMEOUT"""
+        await self.lifecycle.shutdown()
+    
+    def instrument(self, name, callback):
+        """Wrap a handler with Prometheus metrics and the usage event log"""
+        return timed_handler(name, analytics.track(name, callback))
+    
+    def build_application(self):
+        """Build the Application with all handlers and scheduled jobs"""
+        builder = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self.post_init)
+            .post_stop(self.post_stop)
+            .post_shutdown(self.post_shutdown)
+        )
+        if config.TELEGRAM_API_BASE:
+            # e.g. a local Bot API server or the benchmark stub
+            builder = (
+                builder.base_url(f"{config.TELEGRAM_API_BASE}/bot")
+                .base_file_url(f"{config.TELEGRAM_API_BASE}/file/bot")
+            )
+        self.application = builder.build()
+        
+        # Last-seen tracking runs before every other handler group
+        self.application.add_handler(TypeHandler(Update, self.track_user), group=-1)
         
         # Command handlers
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("market", self.market_command))
-        self.application.add_handler(CommandHandler("news", self.news_command))
-        self.application.add_handler(CommandHandler("price", self.price_command))
-        self.application.add_handler(CommandHandler("analyze", self.analyze_command))
-        self.application.add_handler(CommandHandler("subscribe", self.subscribe_command))
-        self.application.add_handler(CommandHandler("status", self.status_command))
+        self.application.add_handler(CommandHandler("start", self.instrument("start", self.start_command)))
+        self.application.add_handler(CommandHandler("help", self.instrument("help", self.help_command)))
+        self.application.add_handler(CommandHandler("market", self.instrument("market", self.market_command)))
+        self.application.add_handler(CommandHandler("news", self.instrument("news", self.news_command)))
+        self.application.add_handler(CommandHandler("price", self.instrument("price", self.price_command)))
+        self.application.add_handler(CommandHandler("analyze", self.instrument("analyze", self.analyze_command)))
+        self.application.add_handler(CommandHandler("ta", self.instrument("ta", self.ta_command)))
+        self.application.add_handler(CommandHandler("subscribe", self.instrument("subscribe", self.subscribe_command)))
+        self.application.add_handler(CommandHandler("status", self.instrument("status", self.status_command)))
+        self.application.add_handler(CommandHandler("language", self.instrument("language", self.language_command)))
+        self.application.add_handler(CommandHandler("currency", self.instrument("currency", self.currency_command)))
+        self.application.add_handler(CommandHandler("alert", self.instrument("alert", self.alert_command)))
+        self.application.add_handler(CommandHandler("alerts", self.instrument("alerts", self.alerts_command)))
+        self.application.add_handler(CommandHandler("delalert", self.instrument("delalert", self.delalert_command)))
+        if config.ENABLE_WATCHLISTS:
+            self.application.add_handler(CommandHandler("watch", self.instrument("watch", self.watch_command)))
+        if config.ENABLE_PORTFOLIO:
+            self.application.add_handler(CommandHandler("portfolio", self.instrument("portfolio", self.portfolio_command)))
+        
+        if config.ENABLE_CHARTS:
+            self.application.add_handler(CommandHandler("chart", self.instrument("chart", self.chart_command)))
+        if config.ENABLE_INLINE_MODE:
+            self.application.add_handler(InlineQueryHandler(self.instrument("inline", self.inline_query)))
         
         # Callback query handler
-        self.application.add_handler(CallbackQueryHandler(self.button_callback))
+        self.application.add_handler(CallbackQueryHandler(self.instrument("callback", self.button_callback)))
         
         # Payment handlers
-        self.application.add_handler(PreCheckoutQueryHandler(self.precheckout_callback))
+        self.application.add_handler(PreCheckoutQueryHandler(self.instrument("precheckout", self.precheckout_callback)))
         self.application.add_handler(
-            MessageHandler(filters.SUCCESSFUL_PAYMENT, self.successful_payment_callback)
+            MessageHandler(filters.SUCCESSFUL_PAYMENT, self.instrument("payment", self.successful_payment_callback))
         )
         
         # Message handler for AI chat
         self.application.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.instrument("chat", self.handle_message))
         )
         
         # Schedule daily digest (runs at 9 AM UTC)
@@ -431,9 +1059,27 @@ Try /analyze BTC or just chat with me!""",
                 time=datetime.strptime("09:00", "%H:%M").time()
             )
             logger.info("Daily digest scheduled for 9 AM UTC")
+            job_queue.run_repeating(self.poll_market, interval=config.COINGECKO_CACHE_TTL, first=5)
+            logger.info(f"Market poller scheduled every {config.COINGECKO_CACHE_TTL}s")
+            job_queue.run_repeating(self.rollup_analytics, interval=config.ANALYTICS_ROLLUP_SECONDS, first=30)
+            job_queue.run_once(self.resume_digest, when=30)
         else:
             logger.warning("JobQueue not available - daily digest will not be scheduled")
         
+        return self.application
+    
+    def run(self):
+        """Start the bot"""
+        # A crash or SIGKILL leaves the last run's file behind; not ready until post_init finishes
+        self.mark_ready(False)
+        for warning in config.validate():
+            logger.warning(f"Configuration warning: {warning}")
+        if not self.token:
+            logger.error("TELEGRAM_BOT_TOKEN not found in environment variables")
+            return
+        
+        self.build_application()
+        
         logger.info("Bot started successfully")
         logger.info("Version 1.0.0")
         self.application.run_polling(allowed_updates=Update.ALL_TYPES)
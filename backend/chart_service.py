@@ -0,0 +1,180 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import config
+from metrics import cache_hit, cache_miss
+
+logger = logging.getLogger(__name__)
+
+# Chart range -> (CoinGecko days parameter, cache bucket in seconds)
+CHART_RANGES = {
+    '1d': ('1', 300),
+    '7d': ('7', 1800),
+    '30d': ('30', 3600),
+    '90d': ('90', 4 * 3600),
+    '1y': ('365', 24 * 3600),
+}
+CHART_MAX_POINTS = 500
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of a line series"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Averages of each following bucket, used as the third triangle vertex
+    avg_x = np.empty(threshold - 2)
+    avg_y = np.empty(threshold - 2)
+    for b in range(threshold - 2):
+        start = edges[b + 1]
+        end = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x[b] = x[start:end].mean()
+        avg_y[b] = y[start:end].mean()
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for b in range(threshold - 2):
+        start, end = edges[b], edges[b + 1]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - avg_x[b]) * (by - y[a]) - (x[a] - bx) * (avg_y[b] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[b + 1] = a
+
+    return x[selected], y[selected]
+
+
+def warm_renderer():
+    """Import matplotlib in a worker process so the first chart does not pay for it"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+
+
+def render_chart_png(title, timestamps_ms, prices):
+    """Render a price line chart to PNG bytes. Runs in a worker process."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+
+    dates = np.asarray(timestamps_ms, dtype='datetime64[ms]')
+    prices = np.asarray(prices, dtype=np.float64)
+    color = '#16a34a' if prices[-1] >= prices[0] else '#dc2626'
+
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    try:
+        ax.plot(dates, prices, color=color, linewidth=1.5)
+        ax.fill_between(dates, prices, prices.min(), color=color, alpha=0.1)
+        ax.set_title(title)
+        ax.grid(alpha=0.3)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+        ax.yaxis.set_major_formatter(matplotlib.ticker.StrMethodFormatter('${x:,.6g}'))
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartService:
+    """Service for server-side price chart rendering with PNG and file_id caches"""
+
+    def __init__(self, crypto_service, cache_size=128):
+        self.crypto_service = crypto_service
+        self.cache_size = cache_size
+        self.executor = None
+        self._png_cache = OrderedDict()
+        self._file_ids = OrderedDict()
+
+    def get_executor(self):
+        if self.executor is None:
+            # Forking would copy a process already running Motor's and aiohttp's threads, which can deadlock the child
+            self.executor = ProcessPoolExecutor(
+                max_workers=config.CHART_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+        return self.executor
+
+    def start(self):
+        """Start the worker processes and load matplotlib in them, without waiting for it"""
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        for _ in range(config.CHART_WORKERS):
+            loop.run_in_executor(executor, warm_renderer).add_done_callback(self._warmed)
+
+    @staticmethod
+    def _warmed(future):
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Chart worker warm-up failed: {future.exception()}")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    @staticmethod
+    def cache_key(coin_id, chart_range):
+        bucket = CHART_RANGES[chart_range][1]
+        return (coin_id, chart_range, int(time.time() // bucket))
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def remember_file_id(self, key, file_id):
+        """Store the Telegram file_id of an uploaded chart for resending"""
+        self._remember(self._file_ids, key, file_id)
+        self._png_cache.pop(key, None)
+
+    async def get_chart(self, coin, chart_range):
+        """Get a chart as {'key', 'file_id', 'png'}; only one of file_id/png is set"""
+        key = self.cache_key(coin.id, chart_range)
+
+        file_id = self._file_ids.get(key)
+        if file_id:
+            cache_hit('chart')
+            return {'key': key, 'file_id': file_id, 'png': None}
+
+        png = self._png_cache.get(key)
+        if png is not None:
+            cache_hit('chart')
+        else:
+            cache_miss('chart')
+            days = CHART_RANGES[chart_range][0]
+            points = await self.crypto_service.get_market_chart(coin.id, days)
+            if not points:
+                raise ValueError(f"No chart data for {coin.symbol}")
+
+            series = np.asarray(points, dtype=np.float64)
+            timestamps, prices = lttb(series[:, 0], series[:, 1], CHART_MAX_POINTS)
+
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(
+                self.get_executor(),
+                render_chart_png,
+                f"{coin.name} ({coin.symbol}) · {chart_range}",
+                timestamps,
+                prices,
+            )
+            self._remember(self._png_cache, key, png)
+
+        return {'key': key, 'file_id': None, 'png': png}
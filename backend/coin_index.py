@@ -0,0 +1,44 @@
+import bisect
+
+
+class CoinPrefixIndex:
+    """Sorted prefix index over coin symbols and names of a market snapshot.
+
+    Built once per snapshot refresh; lookups are two bisects plus a slice,
+    so inline queries can be answered on every keystroke without I/O.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.positions = []
+        self.coins = []
+
+    def build(self, coins):
+        entries = []
+        for position, coin in enumerate(coins):
+            symbol = coin.symbol.lower()
+            entries.append((symbol, position))
+            for word in {coin.name.lower(), coin.id.lower(), *coin.name.lower().split()}:
+                if word != symbol:
+                    entries.append((word, position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+        self.coins = list(coins)
+
+    def search(self, query, limit=10):
+        """Return snapshot coins whose symbol or name starts with query,
+        exact symbol matches first, then by market cap rank"""
+        query = query.strip().lower()
+        if not query:
+            return self.coins[:limit]
+
+        lo = bisect.bisect_left(self.keys, query)
+        hi = bisect.bisect_left(self.keys, query + '\uffff', lo)
+        positions = sorted(set(self.positions[lo:hi]))
+        exact = [p for p in positions if self.coins[p].symbol.lower() == query]
+        ordered = exact + [p for p in positions if p not in exact]
+        return [self.coins[p] for p in ordered[:limit]]
+
+    def __len__(self):
+        return len(self.coins)
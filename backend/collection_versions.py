@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collections the admin API serves; writes to others don't need a version bump
+TRACKED_COLLECTIONS = ('users', 'subscriptions', 'analytics_rollups')
+
+
+class CollectionVersions:
+    """Per-collection change counters used as HTTP cache validators.
+
+    Writers call ``bump`` after changing a tracked collection; the admin API
+    reads the counters (one small query) to build weak ETags and answers
+    unchanged requests with 304 without touching the data itself. Manual
+    edits in the database should ``$inc`` the matching ``version`` too.
+    """
+
+    def __init__(self, db):
+        self.collection = db.collection_versions
+
+    async def bump(self, *names):
+        names = [name for name in names if name in TRACKED_COLLECTIONS]
+        try:
+            await asyncio.gather(*(
+                self.collection.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+                for name in names
+            ))
+        except Exception as e:
+            logger.warning(f"Could not bump collection versions {names}: {e}")
+
+    async def get(self, *names):
+        """Current version of each named collection (0 if never bumped)"""
+        docs = await self.collection.find({"_id": {"$in": list(names)}}).to_list(len(names))
+        versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+        return tuple(versions.get(name, 0) for name in names)
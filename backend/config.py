@@ -29,11 +29,17 @@ class Config:
     # External APIs
     NBU_API_ENABLED: bool = os.getenv('NBU_API_ENABLED', 'true').lower() == 'true'
     ECB_RSS_ENABLED: bool = os.getenv('ECB_RSS_ENABLED', 'true').lower() == 'true'
+    ECB_RATES_ENABLED: bool = os.getenv('ECB_RATES_ENABLED', 'true').lower() == 'true'
     IMF_RSS_ENABLED: bool = os.getenv('IMF_RSS_ENABLED', 'true').lower() == 'true'
     COINGECKO_API_KEY: str = os.getenv('COINGECKO_API_KEY', '')
+    # public (no key), demo or pro; a configured key defaults to the pro API
+    COINGECKO_API_PLAN: str = os.getenv('COINGECKO_API_PLAN', 'pro' if COINGECKO_API_KEY else 'public')
     
     # Bot Features
     DEFAULT_LANGUAGE: str = os.getenv('DEFAULT_LANGUAGE', 'en')
+    DEFAULT_CURRENCY: str = os.getenv('DEFAULT_CURRENCY', 'USD').upper()
+    # Offered as buttons by /currency; any code in the NBU/ECB tables can be typed
+    CURRENCY_CHOICES: str = os.getenv('CURRENCY_CHOICES', 'USD,EUR,UAH')
     DEFAULT_TIMEZONE: str = os.getenv('DEFAULT_TIMEZONE', 'Europe/Kiev')
     MORNING_DIGEST_TIME: str = os.getenv('MORNING_DIGEST_TIME', '08:00')
     EVENING_DIGEST_TIME: str = os.getenv('EVENING_DIGEST_TIME', '18:00')
@@ -54,15 +60,99 @@ class Config:
     
     # Rate Limiting & Caching
     COINGECKO_CACHE_TTL: int = int(os.getenv('COINGECKO_CACHE_TTL', '60'))
+    # Requests per minute allowed for the configured CoinGecko plan
+    COINGECKO_RATE_LIMIT: int = int(os.getenv(
+        'COINGECKO_RATE_LIMIT', {'pro': '500', 'demo': '30'}.get(COINGECKO_API_PLAN, '10')
+    ))
     NEWS_CACHE_TTL: int = int(os.getenv('NEWS_CACHE_TTL', '300'))
     NBU_CACHE_TTL: int = int(os.getenv('NBU_CACHE_TTL', '3600'))
     USER_RATE_LIMIT: int = int(os.getenv('USER_RATE_LIMIT', '30'))
+    MARKET_SNAPSHOT_SIZE: int = int(os.getenv('MARKET_SNAPSHOT_SIZE', '250'))
+    INLINE_CACHE_TIME: int = int(os.getenv('INLINE_CACHE_TIME', '30'))
+    CHART_WORKERS: int = int(os.getenv('CHART_WORKERS', '2'))
+    HISTORY_SAMPLE_SECONDS: int = int(os.getenv('HISTORY_SAMPLE_SECONDS', '300'))
+    HISTORY_RETENTION_DAYS: int = int(os.getenv('HISTORY_RETENTION_DAYS', '400'))
+    
+    # Upstream circuit breakers and stale-response fallback
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))
+    CIRCUIT_BASE_COOLDOWN: float = float(os.getenv('CIRCUIT_BASE_COOLDOWN', '5'))
+    CIRCUIT_MAX_COOLDOWN: float = float(os.getenv('CIRCUIT_MAX_COOLDOWN', '300'))
+    STALE_MAX_AGE: int = int(os.getenv('STALE_MAX_AGE', '3600'))
+    # Per-request limits for upstream HTTP calls; a timeout counts as a breaker failure
+    UPSTREAM_TIMEOUT: float = float(os.getenv('UPSTREAM_TIMEOUT', '10'))
+    UPSTREAM_CONNECT_TIMEOUT: float = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3'))
+    
+    # Prometheus metrics sidecar port for the bot process (0 disables)
+    METRICS_PORT: int = int(os.getenv('METRICS_PORT', '9464'))
+    # Written once the bot has finished startup, removed on shutdown ('' disables)
+    BOT_READY_FILE: str = os.getenv('BOT_READY_FILE', '/tmp/bot.ready')
+    # Budget for draining queues and closing connections after SIGTERM (keep below the stop grace period)
+    SHUTDOWN_TIMEOUT: float = float(os.getenv('SHUTDOWN_TIMEOUT', '15'))
+    
+    # Overload controller: degrade features when any signal crosses its threshold
+    OVERLOAD_ENABLED: bool = os.getenv('OVERLOAD_ENABLED', 'true').lower() == 'true'
+    OVERLOAD_LOOP_LAG: float = float(os.getenv('OVERLOAD_LOOP_LAG', '0.25'))
+    OVERLOAD_UPSTREAM_IN_FLIGHT: int = int(os.getenv('OVERLOAD_UPSTREAM_IN_FLIGHT', '50'))
+    OVERLOAD_LLM_IN_FLIGHT: int = int(os.getenv('OVERLOAD_LLM_IN_FLIGHT', '10'))
+    OVERLOAD_RECOVERY_SECONDS: float = float(os.getenv('OVERLOAD_RECOVERY_SECONDS', '30'))
+    OVERLOAD_SAMPLE_INTERVAL: float = float(os.getenv('OVERLOAD_SAMPLE_INTERVAL', '0.5'))
+    
+    # Opt-in profiling: handler/upstream spans, loop lag and stack samples of slow handlers,
+    # written as Chrome trace JSON to PROFILE_DIR/<process>-<pid>.trace.json
+    PROFILING_ENABLED: bool = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR: str = os.getenv('PROFILE_DIR', '/tmp/profiles')
+    PROFILE_SLOW_HANDLER_MS: float = float(os.getenv('PROFILE_SLOW_HANDLER_MS', '500'))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '10'))
+    PROFILE_LAG_INTERVAL_MS: float = float(os.getenv('PROFILE_LAG_INTERVAL_MS', '100'))
+    PROFILE_LAG_THRESHOLD_MS: float = float(os.getenv('PROFILE_LAG_THRESHOLD_MS', '50'))
+    PROFILE_MAX_EVENTS: int = int(os.getenv('PROFILE_MAX_EVENTS', '200000'))
+    PROFILE_FLUSH_SECONDS: float = float(os.getenv('PROFILE_FLUSH_SECONDS', '30'))
+    
+    # AI prompt token budgets (system message + prompt)
+    PROMPT_BUDGET_ANALYSIS: int = int(os.getenv('PROMPT_BUDGET_ANALYSIS', '700'))
+    PROMPT_BUDGET_CHAT: int = int(os.getenv('PROMPT_BUDGET_CHAT', '1000'))
+    PROMPT_BUDGET_TRANSLATION: int = int(os.getenv('PROMPT_BUDGET_TRANSLATION', '2000'))
+    PROMPT_BUDGET_SUMMARY: int = int(os.getenv('PROMPT_BUDGET_SUMMARY', '1200'))
+    
+    # Semantic cache of general AI chat answers (cosine similarity threshold, 0-1)
+    FAQ_CACHE_ENABLED: bool = os.getenv('FAQ_CACHE_ENABLED', 'true').lower() == 'true'
+    FAQ_CACHE_THRESHOLD: float = float(os.getenv('FAQ_CACHE_THRESHOLD', '0.9'))
+    FAQ_CACHE_SIZE: int = int(os.getenv('FAQ_CACHE_SIZE', '2000'))
+    FAQ_CACHE_TTL_HOURS: int = int(os.getenv('FAQ_CACHE_TTL_HOURS', '24'))
+    
+    # AI summary at the top of the daily digest; the broadcast waits at most this long for it
+    DIGEST_SUMMARY_ENABLED: bool = os.getenv('DIGEST_SUMMARY_ENABLED', 'true').lower() == 'true'
+    DIGEST_SUMMARY_TIMEOUT: float = float(os.getenv('DIGEST_SUMMARY_TIMEOUT', '20'))
+    
+    # Headlines and summaries are translated in batches and cached in Mongo
+    TRANSLATION_BATCH_SIZE: int = int(os.getenv('TRANSLATION_BATCH_SIZE', '20'))
+    TRANSLATION_TIMEOUT: float = float(os.getenv('TRANSLATION_TIMEOUT', '30'))
+    
+    # Write-behind buffer for non-critical Mongo writes
+    WRITE_BUFFER_MAX_OPS: int = int(os.getenv('WRITE_BUFFER_MAX_OPS', '500'))
+    WRITE_BUFFER_FLUSH_SECONDS: float = float(os.getenv('WRITE_BUFFER_FLUSH_SECONDS', '2'))
+    
+    # Usage analytics: raw events are kept for a month, rollups run every minute
+    ANALYTICS_ROLLUP_SECONDS: int = int(os.getenv('ANALYTICS_ROLLUP_SECONDS', '60'))
+    ANALYTICS_EVENT_RETENTION_DAYS: int = int(os.getenv('ANALYTICS_EVENT_RETENTION_DAYS', '30'))
+    ANALYTICS_MINUTE_RETENTION_DAYS: int = int(os.getenv('ANALYTICS_MINUTE_RETENTION_DAYS', '2'))
+    
+    # Alerts & Notifications
+    ALERTS_PER_USER_LIMIT: int = int(os.getenv('ALERTS_PER_USER_LIMIT', '20'))
+    NOTIFY_RATE_PER_SEC: int = int(os.getenv('NOTIFY_RATE_PER_SEC', '25'))
     
     # API Endpoints
-    NBU_API_BASE: str = 'https://bank.gov.ua/NBUStatService/v1/'
+    NBU_API_BASE: str = os.getenv('NBU_API_BASE', 'https://bank.gov.ua/NBUStatService/v1/')
+    ECB_RATES_URL: str = os.getenv('ECB_RATES_URL', 'https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml')
     ECB_RSS_URL: str = 'https://www.ecb.europa.eu/rss/press.html'
     IMF_RSS_URL: str = 'https://www.imf.org/en/News/RSS'
-    COINGECKO_API_BASE: str = 'https://api.coingecko.com/api/v3'
+    COINGECKO_API_BASE: str = os.getenv(
+        'COINGECKO_API_BASE',
+        'https://pro-api.coingecko.com/api/v3' if COINGECKO_API_PLAN == 'pro' else 'https://api.coingecko.com/api/v3'
+    )
+    CRYPTOPANIC_API_BASE: str = os.getenv('CRYPTOPANIC_API_BASE', 'https://cryptopanic.com/api/v1')
+    NEWSAPI_BASE: str = os.getenv('NEWSAPI_BASE', 'https://newsapi.org/v2')
+    TELEGRAM_API_BASE: str = os.getenv('TELEGRAM_API_BASE', '')
     
     @classmethod
     def validate(cls) -> List[str]:
@@ -90,13 +180,5 @@ class Config:
         return (cls.MORNING_DIGEST_TIME, cls.EVENING_DIGEST_TIME)
 
 
-# Create singleton instance
+# Create singleton instance (validated by the process entry point, not on import)
 config = Config()
-
-# Validate on import
-validation_errors = config.validate()
-if validation_errors:
-    import logging
-    logger = logging.getLogger(__name__)
-    for error in validation_errors:
-        logger.warning(f"Configuration warning: {error}")
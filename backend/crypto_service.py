@@ -1,34 +1,236 @@
 import aiohttp
+import asyncio
 import logging
+import time
 from datetime import datetime
 
+import numpy as np
+
+from coin_index import CoinPrefixIndex
+from fx_service import BASE_CURRENCY, format_money
+from indicators import summarize_series
+from fastjson import read_json
+from metrics import aiohttp_trace_config, cache_hit, cache_miss
+from profiling import profiler
+from models import Coin, CoinDetail
+from request_budget import RequestBudget
+from resilience import CacheOnlyMiss, stale_notice, upstream_cache, upstream_timeout
+from config import config
+
 logger = logging.getLogger(__name__)
 
+# Concurrent get_prices() calls arriving within this window share one request
+PRICE_BATCH_WINDOW = 0.05
+# Keep /simple/price URLs comfortably below common 2k URL limits
+SIMPLE_PRICE_MAX_IDS_CHARS = 1800
+# Symbol -> coin id lookups rarely change
+SEARCH_CACHE_TTL = 24 * 3600
+API_KEY_HEADERS = {'pro': 'x-cg-pro-api-key', 'demo': 'x-cg-demo-api-key'}
+
+
+def parse_market_rows(rows):
+    return [Coin.from_market_row(row) for row in rows]
+
 
 class CryptoService:
     """Service for crypto market data using CoinGecko API"""
     
-    def __init__(self):
-        self.base_url = "https://api.coingecko.com/api/v3"
+    def __init__(self, history=None, fx=None):
+        self.base_url = config.COINGECKO_API_BASE
         self.session = None
+        self.history = history
+        self.fx = fx
+        self.responses = upstream_cache('coingecko')
+        self.budget = RequestBudget('coingecko', config.COINGECKO_RATE_LIMIT)
+        self._snapshot = []
+        self._snapshot_at = 0.0
+        self.snapshot_age = 0.0
+        self.coin_index = CoinPrefixIndex()
+        self._pending_ids = set()
+        self._pending_batch = None
     
     async def get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            headers = {}
+            if config.COINGECKO_API_KEY and config.COINGECKO_API_PLAN in API_KEY_HEADERS:
+                headers[API_KEY_HEADERS[config.COINGECKO_API_PLAN]] = config.COINGECKO_API_KEY
+            self.session = aiohttp.ClientSession(
+                headers=headers, timeout=upstream_timeout(), trace_configs=[aiohttp_trace_config()]
+            )
         return self.session
     
     async def close(self):
         if self.session and not self.session.closed:
             await self.session.close()
     
-    async def get_market_overview(self):
-        """Get overview of top cryptocurrencies"""
-        try:
+    async def _get_json(self, path, params=None, ttl=None, parse=None):
+        """GET a CoinGecko endpoint through the circuit breaker and response cache.
+        
+        Returns (data, age_seconds); age is non-zero when CoinGecko is failing
+        and the last good response was served instead. ``parse`` converts the
+        decoded JSON once, before it is cached.
+        """
+        async def fetch():
             session = await self.get_session()
+            await self.budget.acquire()
+            async with session.get(f"{self.base_url}{path}", params=params) as response:
+                if response.status == 429:
+                    self.budget.pause(float(response.headers.get('Retry-After', 60)))
+                response.raise_for_status()
+                data = await read_json(response, 'coingecko')
+            return parse(data) if parse else data
+        
+        key = (path, tuple(sorted((params or {}).items())))
+        return await self.responses.get(key, fetch, config.COINGECKO_CACHE_TTL if ttl is None else ttl)
+    
+    async def get_market_snapshot(self):
+        """Get cached market snapshot of the top coins by market cap"""
+        try:
+            params = {
+                'vs_currency': 'usd',
+                'order': 'market_cap_desc',
+                'per_page': config.MARKET_SNAPSHOT_SIZE,
+                'page': 1,
+                'sparkline': 'false',
+                'price_change_percentage': '24h,7d'
+            }
+            
+            coins, age = await self._get_json('/coins/markets', params, parse=parse_market_rows)
+            self.snapshot_age = age
+            if coins is not self._snapshot:
+                self._snapshot = coins
+                self._snapshot_at = time.monotonic() - age
+                self.coin_index.build(coins)
+            return coins
+            
+        except Exception as e:
+            logger.error(f"Error fetching market snapshot: {e}")
+            raise
+    
+    async def get_top_movers(self, count=5):
+        """Biggest 24h gainers and losers in the market snapshot"""
+        coins = [coin for coin in await self.get_market_snapshot() if coin.price is not None]
+        ranked = sorted(coins, key=lambda coin: coin.change_24h, reverse=True)
+        return ranked[:count] + ranked[-count:][::-1] if len(ranked) > 2 * count else ranked
+    
+    def find_snapshot_coin(self, symbol):
+        """Find a coin in the current snapshot by symbol or CoinGecko id"""
+        upper, lower = symbol.upper(), symbol.lower()
+        for coin in self._snapshot:
+            if coin.symbol == upper or coin.id == lower:
+                return coin
+        return None
+    
+    async def resolve_coin(self, symbol):
+        """Resolve a symbol to a Coin, snapshot first; search results carry no price"""
+        coin = self.find_snapshot_coin(symbol)
+        if coin:
+            return coin
+        
+        search_data, _ = await self._get_json('/search', {'query': symbol}, ttl=SEARCH_CACHE_TTL)
+        if not search_data.get('coins'):
+            return None
+        
+        return Coin.from_search_result(search_data['coins'][0])
+    
+    @staticmethod
+    def _chunk_ids(coin_ids):
+        chunk, length = [], 0
+        for coin_id in coin_ids:
+            if chunk and length + len(coin_id) + 1 > SIMPLE_PRICE_MAX_IDS_CHARS:
+                yield chunk
+                chunk, length = [], 0
+            chunk.append(coin_id)
+            length += len(coin_id) + 1
+        if chunk:
+            yield chunk
+    
+    async def get_simple_prices(self, coin_ids):
+        """Price many coins with /simple/price, chunked to the URL limit"""
+        async def fetch(chunk):
+            params = {
+                'ids': ','.join(chunk),
+                'vs_currencies': 'usd',
+                'include_24hr_change': 'true'
+            }
+            data, _ = await self._get_json('/simple/price', params)
+            return data
+        
+        result = {}
+        for data in await asyncio.gather(*(fetch(chunk) for chunk in self._chunk_ids(coin_ids))):
+            for coin_id, quote in data.items():
+                result[coin_id] = {'price': quote.get('usd'), 'change_24h': quote.get('usd_24h_change') or 0}
+        return result
+    
+    async def get_prices(self, coin_ids):
+        """Get {coin_id: {'price', 'change_24h'}} for many coins.
+        
+        Coins in a fresh market snapshot are answered locally. The rest are
+        pooled with other callers arriving within PRICE_BATCH_WINDOW and
+        priced by one batched /simple/price request.
+        """
+        prices = {}
+        missing = []
+        fresh = time.monotonic() - self._snapshot_at < config.COINGECKO_CACHE_TTL
+        snapshot = {coin.id: coin for coin in self._snapshot} if fresh else {}
+        for coin_id in coin_ids:
+            coin = snapshot.get(coin_id)
+            if coin:
+                prices[coin_id] = {'price': coin.price, 'change_24h': coin.change_24h}
+            else:
+                missing.append(coin_id)
+        cache_hit('snapshot_prices', len(prices))
+        
+        if missing:
+            cache_miss('snapshot_prices', len(missing))
+            self._pending_ids.update(missing)
+            if self._pending_batch is None:
+                self._pending_batch = asyncio.get_running_loop().create_task(self._flush_price_batch())
+            batch = await asyncio.shield(self._pending_batch)
+            prices.update({coin_id: batch[coin_id] for coin_id in missing if coin_id in batch})
+        
+        return prices
+    
+    async def _flush_price_batch(self):
+        await asyncio.sleep(PRICE_BATCH_WINDOW)
+        coin_ids = sorted(self._pending_ids)
+        self._pending_ids = set()
+        self._pending_batch = None
+        try:
+            return await self.get_simple_prices(coin_ids)
+        except Exception as e:
+            logger.error(f"Error fetching batched prices for {len(coin_ids)} coins: {e}")
+            raise
+    
+    async def get_market_chart(self, coin_id, days):
+        """Get [timestamp_ms, price] points, from local history when it covers the range"""
+        try:
+            if self.history:
+                points = await self.history.get_series(coin_id, days)
+                if points:
+                    cache_hit('market_history')
+                    return points
+                cache_miss('market_history')
             
+            chart_data, _ = await self._get_json(f"/coins/{coin_id}/market_chart", {'vs_currency': 'usd', 'days': days})
+            points = chart_data.get('prices', [])
+            
+            if self.history:
+                await self.history.backfill(coin_id, points)
+            return points
+        except Exception as e:
+            logger.error(f"Error fetching market chart for {coin_id}: {e}")
+            raise
+    
+    async def get_market_overview(self, currency=BASE_CURRENCY):
+        """Get overview of top cryptocurrencies"""
+        return (await self.get_market_overviews([currency]))[currency]
+    
+    async def get_market_overviews(self, currencies):
+        """Market overview in several currencies from one fetch, {currency: text}"""
+        try:
             # Get global market data
-            async with session.get(f"{self.base_url}/global") as response:
-                global_data = await response.json()
+            global_data, global_age = await self._get_json('/global')
             
             # Get top 10 cryptocurrencies
             params = {
@@ -36,54 +238,85 @@ class CryptoService:
                 'order': 'market_cap_desc',
                 'per_page': 10,
                 'page': 1,
-                'sparkline': False,
+                'sparkline': 'false',
                 'price_change_percentage': '24h,7d'
             }
             
-            async with session.get(f"{self.base_url}/coins/markets", params=params) as response:
-                coins = await response.json()
+            coins, coins_age = await self._get_json('/coins/markets', params, parse=parse_market_rows)
             
-            # Format market overview
-            market_cap = global_data['data']['total_market_cap']['usd']
-            volume = global_data['data']['total_volume']['usd']
-            btc_dominance = global_data['data']['market_cap_percentage'].get('btc', 0)
+            data = global_data['data']
+            usd = [data['total_market_cap']['usd'], data['total_volume']['usd']] + [coin.price for coin in coins]
+            btc_dominance = data['market_cap_percentage'].get('btc', 0)
+            converted = await self.convert(usd, currencies)
+            notice = stale_notice('CoinGecko', max(global_age, coins_age))
             
-            result = f"""📊 **Market Overview**
+            with profiler.span('format market overview', currencies=len(currencies)):
+                return {
+                    currency: self._format_market_overview(shown, amounts, btc_dominance, coins) + note + notice
+                    for currency, (shown, amounts, note) in converted.items()
+                }
+            
+        except Exception as e:
+            logger.error(f"Error fetching market overview: {e}")
+            raise
+    
+    async def convert(self, usd, currencies):
+        """Convert USD amounts into each currency at once: {currency: (shown currency, amounts, rate note)}.
+        
+        Currencies without a known rate (or all of them, while no exchange
+        rates can be fetched) are shown in USD.
+        """
+        usd = np.asarray(usd, dtype=np.float64)
+        table = None
+        if self.fx and any(currency != BASE_CURRENCY for currency in currencies):
+            try:
+                table = await self.fx.get_table()
+            except Exception as e:
+                logger.warning(f"Showing USD amounts, no exchange rates: {e}")
+        
+        foreign = [c for c in dict.fromkeys(currencies) if c != BASE_CURRENCY and table and table.supports(c)]
+        rows = dict(zip(foreign, table.convert(usd, foreign))) if foreign else {}
+        result = {}
+        for currency in currencies:
+            if currency in rows:
+                rate = format_money(table.rate(currency), currency, 4 if table.rate(currency) < 10 else 2)
+                note = f"💱 1 USD = {rate} ({table.sources[currency]})\n"
+                result[currency] = (currency, rows[currency], note)
+            else:
+                result[currency] = (BASE_CURRENCY, usd, "")
+        return result
+    
+    @staticmethod
+    def _format_market_overview(currency, amounts, btc_dominance, coins):
+        """Markdown overview; amounts are the market cap, volume and coin prices in currency"""
+        market_cap, volume, prices = amounts[0], amounts[1], amounts[2:]
+        
+        result = f"""📊 **Market Overview**
 
-💰 Total Market Cap: ${market_cap:,.0f}
-📈 24h Volume: ${volume:,.0f}
+💰 Total Market Cap: {format_money(market_cap, currency, 0)}
+📈 24h Volume: {format_money(volume, currency, 0)}
 ₿ BTC Dominance: {btc_dominance:.1f}%
 
 🔝 **Top 10 Cryptocurrencies:**
 
 """
+        
+        for i, (coin, price) in enumerate(zip(coins, prices), 1):
+            change_24h = coin.change_24h
+            change_7d = coin.change_7d
             
-            for i, coin in enumerate(coins, 1):
-                name = coin['name']
-                symbol = coin['symbol'].upper()
-                price = coin['current_price']
-                change_24h = coin.get('price_change_percentage_24h', 0)
-                change_7d = coin.get('price_change_percentage_7d_in_currency', 0)
-                
-                change_icon = "🟢" if change_24h > 0 else "🔴"
-                
-                result += f"{i}. **{name}** ({symbol})\n"
-                result += f"   💵 ${price:,.2f} | {change_icon} {change_24h:+.2f}% (24h) | {change_7d:+.2f}% (7d)\n\n"
-            
-            return result
+            change_icon = "🟢" if change_24h > 0 else "🔴"
             
-        except Exception as e:
-            logger.error(f"Error fetching market overview: {e}")
-            raise
+            result += f"{i}. **{coin.name}** ({coin.symbol})\n"
+            result += f"   💵 {format_money(price, currency)} | {change_icon} {change_24h:+.2f}% (24h) | {change_7d:+.2f}% (7d)\n\n"
+        
+        return result
     
-    async def get_price(self, symbol):
+    async def get_price(self, symbol, currency=BASE_CURRENCY):
         """Get price for a specific cryptocurrency"""
         try:
-            session = await self.get_session()
-            
             # Search for coin
-            async with session.get(f"{self.base_url}/search", params={'query': symbol}) as response:
-                search_data = await response.json()
+            search_data, _ = await self._get_json('/search', {'query': symbol}, ttl=SEARCH_CACHE_TTL)
             
             if not search_data.get('coins'):
                 return f"❌ Could not find cryptocurrency: {symbol}"
@@ -100,81 +333,118 @@ class CryptoService:
                 'include_24hr_vol': 'true'
             }
             
-            async with session.get(f"{self.base_url}/simple/price", params=params) as response:
-                price_data = await response.json()
+            price_data, age = await self._get_json('/simple/price', params)
             
             coin_data = price_data[coin_id]
-            price = coin_data['usd']
-            change_24h = coin_data.get('usd_24h_change', 0)
-            market_cap = coin_data.get('usd_market_cap', 0)
-            volume = coin_data.get('usd_24h_vol', 0)
-            
-            change_icon = "🟢" if change_24h > 0 else "🔴"
+            return await self._price_text(
+                symbol,
+                currency,
+                [coin_data['usd'], coin_data.get('usd_market_cap', 0), coin_data.get('usd_24h_vol', 0)],
+                coin_data.get('usd_24h_change', 0),
+                age
+            )
             
-            result = f"""💎 **{symbol.upper()} Price**
+        except CacheOnlyMiss:
+            # Under overload, a coin in the market snapshot is still answered without calling CoinGecko
+            coin = self.find_snapshot_coin(symbol)
+            if coin is None or coin.price is None:
+                raise
+            age = time.monotonic() - self._snapshot_at
+            usd = [coin.price, coin.market_cap or 0, coin.volume_24h or 0]
+            return await self._price_text(symbol, currency, usd, coin.change_24h, age)
+        except Exception as e:
+            logger.error(f"Error fetching price for {symbol}: {e}")
+            raise
+    
+    async def _price_text(self, symbol, currency, usd, change_24h, age):
+        """Price card from USD price, market cap and volume, converted to currency"""
+        shown, (price, market_cap, volume), note = (await self.convert(usd, [currency]))[currency]
+        change_icon = "🟢" if change_24h > 0 else "🔴"
+        
+        result = f"""💎 **{symbol.upper()} Price**
 
-💵 Price: ${price:,.8f}
+💵 Price: {format_money(price, shown, 8)}
 {change_icon} 24h Change: {change_24h:+.2f}%
-📊 Market Cap: ${market_cap:,.0f}
-📈 24h Volume: ${volume:,.0f}
+📊 Market Cap: {format_money(market_cap, shown, 0)}
+📈 24h Volume: {format_money(volume, shown, 0)}
 """
+        
+        result += note
+        result += stale_notice('CoinGecko', age)
+        return result
+    
+    async def get_technical_analysis(self, symbols):
+        """Get indicator readouts for one or more coins, computed locally"""
+        try:
+            coins = []
+            for symbol in symbols:
+                coin = await self.resolve_coin(symbol)
+                if not coin:
+                    return f"❌ Could not find cryptocurrency: {symbol}"
+                coins.append(coin)
+            
+            series = await asyncio.gather(*(self.get_market_chart(coin.id, '30') for coin in coins))
+            if not all(series):
+                return "❌ Not enough price history for technical analysis."
             
+            result = "📐 **Technical Analysis** (1h bars, 30d)\n\n"
+            for coin, ta in zip(coins, summarize_series(series)):
+                result += self.format_technicals(coin.symbol, ta) + "\n"
             return result
             
         except Exception as e:
-            logger.error(f"Error fetching price for {symbol}: {e}")
+            logger.error(f"Error computing technical analysis for {symbols}: {e}")
             raise
     
+    @staticmethod
+    def format_technicals(symbol, ta):
+        """Format a technical_summary() dict as a Markdown block"""
+        def fmt(value):
+            return "n/a" if value is None else f"{value:,.6g}"
+        
+        rsi = ta['rsi_14']
+        rsi_note = "" if rsi is None else " (overbought)" if rsi >= 70 else " (oversold)" if rsi <= 30 else ""
+        trend = "n/a" if ta['sma_50'] is None else "above" if ta['price'] > ta['sma_50'] else "below"
+        
+        result = f"""**{symbol}** ${fmt(ta['price'])}
+• SMA20 {fmt(ta['sma_20'])} | SMA50 {fmt(ta['sma_50'])} (price {trend})
+• RSI14 {fmt(rsi)}{rsi_note}
+• MACD {fmt(ta['macd'])} / signal {fmt(ta['macd_signal'])} / hist {fmt(ta['macd_hist'])}
+• Bollinger {fmt(ta['bb_lower'])} – {fmt(ta['bb_upper'])}
+"""
+        if ta.get('atr_14d') is not None:
+            result += f"• ATR14 (daily) {fmt(ta['atr_14d'])}\n"
+        if ta.get('pivot') is not None:
+            result += f"• Pivot {fmt(ta['pivot'])} | R1 {fmt(ta['pivot_r1'])} | S1 {fmt(ta['pivot_s1'])}\n"
+        result += f"• Support: {', '.join(fmt(v) for v in ta['supports']) or 'n/a'}\n"
+        result += f"• Resistance: {', '.join(fmt(v) for v in ta['resistances']) or 'n/a'}\n"
+        return result
+    
     async def get_detailed_data(self, symbol):
-        """Get detailed data for AI analysis"""
+        """Get the market data AI analysis uses as a CoinDetail.
+        
+        One /coins/markets row carries every field the analysis needs, so the
+        heavy /coins/{id} document is not requested; technicals come from the
+        30d hourly series, served from local history once backfilled.
+        """
         try:
-            session = await self.get_session()
-            
-            # Search for coin
-            async with session.get(f"{self.base_url}/search", params={'query': symbol}) as response:
-                search_data = await response.json()
-            
-            if not search_data.get('coins'):
+            coin = await self.resolve_coin(symbol)
+            if not coin:
                 raise ValueError(f"Could not find cryptocurrency: {symbol}")
             
-            coin_id = search_data['coins'][0]['id']
-            
-            # Get detailed coin data
             params = {
-                'localization': 'false',
-                'tickers': 'false',
-                'community_data': 'true',
-                'developer_data': 'true',
-                'sparkline': 'false'
+                'vs_currency': 'usd',
+                'ids': coin.id,
+                'sparkline': 'false',
+                'price_change_percentage': '24h,7d,30d'
             }
+            rows, _ = await self._get_json('/coins/markets', params)
+            if not rows:
+                raise ValueError(f"No market data for {symbol}")
             
-            async with session.get(f"{self.base_url}/coins/{coin_id}", params=params) as response:
-                coin_data = await response.json()
-            
-            # Get market chart (7 days)
-            async with session.get(
-                f"{self.base_url}/coins/{coin_id}/market_chart",
-                params={'vs_currency': 'usd', 'days': '7'}
-            ) as response:
-                chart_data = await response.json()
-            
-            return {
-                'name': coin_data['name'],
-                'symbol': coin_data['symbol'].upper(),
-                'price': coin_data['market_data']['current_price']['usd'],
-                'market_cap': coin_data['market_data']['market_cap']['usd'],
-                'volume_24h': coin_data['market_data']['total_volume']['usd'],
-                'price_change_24h': coin_data['market_data'].get('price_change_percentage_24h', 0),
-                'price_change_7d': coin_data['market_data'].get('price_change_percentage_7d', 0),
-                'price_change_30d': coin_data['market_data'].get('price_change_percentage_30d', 0),
-                'ath': coin_data['market_data']['ath']['usd'],
-                'ath_change': coin_data['market_data']['ath_change_percentage']['usd'],
-                'atl': coin_data['market_data']['atl']['usd'],
-                'circulating_supply': coin_data['market_data'].get('circulating_supply', 0),
-                'max_supply': coin_data['market_data'].get('max_supply'),
-                'description': coin_data.get('description', {}).get('en', '')[:500],
-                'chart_data': chart_data['prices'][-7:],  # Last 7 data points
-            }
+            price_history = await self.get_market_chart(coin.id, '30')
+            technicals = summarize_series([price_history])[0] if price_history else None
+            return CoinDetail.from_market_row(rows[0], technicals)
             
         except Exception as e:
             logger.error(f"Error fetching detailed data for {symbol}: {e}")
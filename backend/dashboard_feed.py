@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure
+
+from models import SUBSCRIPTION_FIELDS, Subscription
+
+logger = logging.getLogger(__name__)
+
+# Each active subscription is $5 (same as /api/bot/stats)
+SUBSCRIPTION_PRICE = 5
+
+
+class DashboardFeed:
+    """Pushes admin dashboard deltas to connected live clients.
+
+    A single producer per process follows new users and subscription
+    changes with Mongo change streams, or polls ``created_at`` /
+    ``updated_at`` where change streams are unsupported (standalone
+    mongod). It loads the stats counters once and then keeps them current
+    from those changes, so connected dashboards never trigger rescans.
+    Events fan out to per-client queues; a client that falls behind gets a
+    ``resync`` event instead of an unbounded backlog. The producer only
+    runs while at least one client is connected.
+    """
+
+    def __init__(self, db, poll_interval=5.0, queue_size=256):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._clients = set()
+        self._producer = None
+        self._ready = asyncio.Event()
+        self.total_users = 0
+        self._active = {}
+
+    def stats(self):
+        premium = len(self._active)
+        return {
+            "total_users": self.total_users,
+            "premium_users": premium,
+            "free_users": self.total_users - premium,
+            "total_revenue": premium * SUBSCRIPTION_PRICE,
+        }
+
+    async def subscribe(self):
+        """Register a client queue; the first event on it is the current stats"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.add(queue)
+        if self._producer is None or self._producer.done():
+            self._ready.clear()
+            self._producer = asyncio.create_task(self._run())
+        await self._ready.wait()
+        queue.put_nowait({"type": "stats", "stats": self.stats()})
+        return queue
+
+    def unsubscribe(self, queue):
+        self._clients.discard(queue)
+        if not self._clients and self._producer is not None:
+            self._producer.cancel()
+            self._producer = None
+
+    async def close(self):
+        """Stop the producer and its change streams before the Mongo client closes"""
+        producer, self._producer = self._producer, None
+        if producer is not None:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    def _publish(self, event):
+        for queue in self._clients:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Drop the backlog; the client reloads its snapshot instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    async def _load(self):
+        now = datetime.now(timezone.utc)
+        self.total_users = await self.db.users.count_documents({})
+        self._active = {}
+        async for doc in self.db.subscriptions.find({}, SUBSCRIPTION_FIELDS):
+            subscription = Subscription.from_doc(doc)
+            if subscription.is_active(now):
+                self._active[subscription.telegram_id] = subscription.expires_at
+
+    async def _run(self):
+        try:
+            await self._load()
+        except Exception as e:
+            logger.error(f"Dashboard feed failed to load stats: {e}")
+        finally:
+            self._ready.set()
+        await asyncio.gather(
+            self._follow(self.db.users, ["insert"], "created_at", self._on_user),
+            self._follow(self.db.subscriptions, ["insert", "update", "replace"], "updated_at", self._on_subscription),
+            self._expire(),
+        )
+
+    async def _follow(self, collection, operations, poll_field, handle):
+        pipeline = [{"$match": {"operationType": {"$in": operations}}}]
+        while True:
+            try:
+                async with collection.watch(pipeline, full_document="updateLookup") as stream:
+                    async for change in stream:
+                        doc = change.get("fullDocument")
+                        if doc:
+                            doc.pop("_id", None)
+                            handle(doc)
+            except OperationFailure as e:
+                logger.info(f"Change streams unavailable for {collection.name} ({e.code}), polling instead")
+                await self._poll(collection, poll_field, handle)
+                return
+            except Exception as e:
+                logger.warning(f"Dashboard feed lost {collection.name} stream: {e}")
+                await asyncio.sleep(self.poll_interval)
+                # Changes may have been missed; recount and let clients reload
+                try:
+                    await self._load()
+                except Exception as e:
+                    logger.warning(f"Dashboard feed failed to reload stats: {e}")
+                self._publish({"type": "resync"})
+
+    async def _poll(self, collection, field, handle):
+        latest = await collection.find_one({}, {"_id": 0, field: 1}, sort=[(field, -1)])
+        cursor = latest.get(field) if latest else None
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            query = {field: {"$gt": cursor}} if cursor else {field: {"$exists": True}}
+            async for doc in collection.find(query, {"_id": 0}).sort(field, 1):
+                cursor = doc[field]
+                handle(doc)
+
+    async def _expire(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            now = datetime.now(timezone.utc)
+            expired = [tid for tid, expires_at in self._active.items() if expires_at <= now]
+            for telegram_id in expired:
+                del self._active[telegram_id]
+            if expired:
+                self._publish({"type": "stats", "stats": self.stats()})
+
+    def _on_user(self, doc):
+        self.total_users += 1
+        self._publish({"type": "user", "user": doc})
+        self._publish({"type": "stats", "stats": self.stats()})
+
+    def _on_subscription(self, doc):
+        subscription = Subscription.from_doc(doc)
+        was_active = subscription.telegram_id in self._active
+        if subscription.is_active():
+            self._active[subscription.telegram_id] = subscription.expires_at
+        else:
+            self._active.pop(subscription.telegram_id, None)
+        self._publish({"type": "subscription", "subscription": doc})
+        if was_active != (subscription.telegram_id in self._active):
+            self._publish({"type": "stats", "stats": self.stats()})
@@ -0,0 +1,33 @@
+import json
+import time
+
+from metrics import JSON_PARSE_SECONDS, UPSTREAM_BYTES
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib decoder
+    orjson = None
+
+
+def loads(data):
+    """Decode JSON bytes or str, with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Encode to JSON bytes, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+async def read_json(response, source):
+    """Read and decode an aiohttp response body, recording bytes and parse time"""
+    body = await response.read()
+    UPSTREAM_BYTES.labels(source).inc(len(body))
+    start = time.perf_counter()
+    data = loads(body)
+    JSON_PARSE_SECONDS.labels(source).observe(time.perf_counter() - start)
+    return data
@@ -0,0 +1,156 @@
+import aiohttp
+import asyncio
+import logging
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from config import config
+from fastjson import read_json
+from metrics import aiohttp_trace_config
+from resilience import upstream_cache, upstream_timeout
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCY = 'USD'
+CURRENCY_SYMBOLS = {'USD': '$', 'EUR': '€', 'UAH': '₴', 'GBP': '£', 'JPY': '¥', 'PLN': 'zł'}
+
+
+def format_money(value, currency, decimals=2):
+    """Amount with its currency symbol, or the ISO code for currencies without one"""
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol:
+        return f"{symbol}{value:,.{decimals}f}"
+    return f"{value:,.{decimals}f} {currency}"
+
+
+def parse_nbu(rows):
+    """UAH per unit of each currency from the NBU exchange directory"""
+    return {row['cc']: float(row['rate']) for row in rows if row.get('cc') and row.get('rate')}
+
+
+def parse_ecb(body):
+    """Units of each currency per EUR from the ECB daily reference rates XML"""
+    root = ElementTree.fromstring(body)
+    return {
+        cube.attrib['currency']: float(cube.attrib['rate'])
+        for cube in root.iter() if 'currency' in cube.attrib and 'rate' in cube.attrib
+    }
+
+
+class FxTable:
+    """Units of each currency per US dollar, as one NumPy vector"""
+
+    __slots__ = ('codes', 'index', 'rates', 'sources')
+
+    def __init__(self, rates, sources):
+        self.codes = sorted(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.rates = np.array([rates[code] for code in self.codes], dtype=np.float64)
+        self.sources = sources
+
+    @classmethod
+    def build(cls, nbu=None, ecb=None):
+        """Merge NBU (UAH and crosses) and ECB (majors) quotes into per-USD rates"""
+        rates, sources = {}, {}
+        if nbu and nbu.get(BASE_CURRENCY):
+            usd_in_uah = nbu[BASE_CURRENCY]
+            for code, uah in nbu.items():
+                rates[code], sources[code] = usd_in_uah / uah, 'NBU'
+            rates['UAH'], sources['UAH'] = usd_in_uah, 'NBU'
+        if ecb and ecb.get(BASE_CURRENCY):
+            # ECB reference rates are the usual cross for majors; NBU stays the source for UAH
+            usd_in_eur = 1 / ecb[BASE_CURRENCY]
+            for code, per_eur in ecb.items():
+                rates[code], sources[code] = per_eur * usd_in_eur, 'ECB'
+            rates['EUR'], sources['EUR'] = usd_in_eur, 'ECB'
+        rates[BASE_CURRENCY], sources[BASE_CURRENCY] = 1.0, None
+        return cls(rates, sources)
+
+    def supports(self, currency):
+        return currency in self.index
+
+    def rate(self, currency):
+        return float(self.rates[self.index[currency]])
+
+    def convert(self, usd, currencies):
+        """USD amounts in each currency: an array of shape (len(currencies), len(usd))"""
+        rates = self.rates[[self.index[currency] for currency in currencies]]
+        return np.outer(rates, np.asarray(usd, dtype=np.float64))
+
+
+class FxService:
+    """Exchange rates from the NBU and ECB, refreshed once per NBU_CACHE_TTL.
+
+    Both sources go through their own circuit breaker and response cache,
+    so a failing source serves its last good quotes. The merged ``FxTable``
+    is rebuilt only when either response changes, and prices are converted
+    from USD locally instead of asking CoinGecko for every currency.
+    Concurrent callers share one load.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.nbu = upstream_cache('nbu')
+        self.ecb = upstream_cache('ecb')
+        self._table = None
+        self._quotes = (None, None)
+        self._loading = None
+
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=upstream_timeout(), trace_configs=[aiohttp_trace_config()])
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def _nbu_rates(self):
+        async def fetch():
+            session = await self.get_session()
+            url = f"{config.NBU_API_BASE.rstrip('/')}/statdirectory/exchange"
+            async with session.get(url, params={'json': ''}) as response:
+                response.raise_for_status()
+                return parse_nbu(await read_json(response, 'nbu'))
+
+        return (await self.nbu.get('exchange', fetch, config.NBU_CACHE_TTL))[0]
+
+    async def _ecb_rates(self):
+        async def fetch():
+            session = await self.get_session()
+            async with session.get(config.ECB_RATES_URL) as response:
+                response.raise_for_status()
+                return parse_ecb(await response.read())
+
+        return (await self.ecb.get('daily', fetch, config.NBU_CACHE_TTL))[0]
+
+    async def get_table(self):
+        """Current FxTable; raises only if neither source has ever answered"""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load_table())
+            self._loading.add_done_callback(self._loaded)
+        return await asyncio.shield(self._loading)
+
+    def _loaded(self, future):
+        self._loading = None
+        if not future.cancelled():
+            future.exception()  # retrieved here so an unawaited failure is not logged as lost
+
+    async def _load_table(self):
+        sources = [
+            self._nbu_rates() if config.NBU_API_ENABLED else asyncio.sleep(0),
+            self._ecb_rates() if config.ECB_RATES_ENABLED else asyncio.sleep(0),
+        ]
+        nbu, ecb = await asyncio.gather(*sources, return_exceptions=True)
+        for name, result in (('NBU', nbu), ('ECB', ecb)):
+            if isinstance(result, Exception):
+                logger.warning(f"No {name} exchange rates: {result}")
+        nbu = None if isinstance(nbu, Exception) else nbu
+        ecb = None if isinstance(ecb, Exception) else ecb
+        if not nbu and not ecb:
+            raise RuntimeError("No exchange rates available")
+        if self._table is None or self._quotes[0] is not nbu or self._quotes[1] is not ecb:
+            self._table = FxTable.build(nbu, ecb)
+            self._quotes = (nbu, ecb)
+        return self._table
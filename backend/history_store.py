@@ -0,0 +1,186 @@
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+from pymongo.errors import CollectionInvalid
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'market_history'
+
+
+def resolution_for(days):
+    """Bucket size in seconds matching CoinGecko's market_chart granularity"""
+    days = float(days)
+    if days <= 1:
+        return 300
+    if days <= 90:
+        return 3600
+    return 86400
+
+
+def resample_ohlc(timestamps_ms, prices, bucket_seconds):
+    """Resample a price series into OHLC buckets.
+
+    Returns (bucket_start_ms, open, high, low, close) arrays for every
+    non-empty bucket. Input must be sorted by timestamp.
+    """
+    ts = np.asarray(timestamps_ms, dtype=np.int64)
+    px = np.asarray(prices, dtype=np.float64)
+    if len(ts) == 0:
+        empty = np.empty(0)
+        return ts, empty, empty, empty, empty
+
+    bucket_ms = bucket_seconds * 1000
+    buckets = ts // bucket_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+
+    return (
+        buckets[starts] * bucket_ms,
+        px[starts],
+        np.maximum.reduceat(px, starts),
+        np.minimum.reduceat(px, starts),
+        px[ends - 1],
+    )
+
+
+class HistoryStore:
+    """Local market history in a MongoDB time-series collection.
+
+    Fed by the market poller (one sample per coin every
+    HISTORY_SAMPLE_SECONDS) and by one-off upstream backfills, so range
+    queries for tracked coins never need CoinGecko.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[COLLECTION]
+        self._last_recorded = 0.0
+
+    async def ensure_collection(self):
+        try:
+            await self.db.create_collection(
+                COLLECTION,
+                timeseries={'timeField': 'ts', 'metaField': 'coin_id', 'granularity': 'minutes'},
+                expireAfterSeconds=config.HISTORY_RETENTION_DAYS * 86400,
+            )
+            logger.info(f"Created time-series collection {COLLECTION}")
+        except CollectionInvalid:
+            pass
+        await self.collection.create_index([('coin_id', 1), ('ts', 1)])
+
+    async def record_snapshot(self, coins):
+        """Append one sample per snapshot coin, at most every HISTORY_SAMPLE_SECONDS"""
+        now = time.monotonic()
+        if now - self._last_recorded < config.HISTORY_SAMPLE_SECONDS:
+            return 0
+        self._last_recorded = now
+
+        ts = datetime.now(timezone.utc)
+        docs = [
+            {
+                'ts': ts,
+                'coin_id': coin.id,
+                'price': coin.price,
+                'market_cap': coin.market_cap,
+                'volume': coin.volume_24h,
+            }
+            for coin in coins
+            if coin.price is not None
+        ]
+        if docs:
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except Exception as e:
+                logger.error(f"Error recording market history: {e}")
+                return 0
+        return len(docs)
+
+    async def backfill(self, coin_id, points):
+        """Store upstream [timestamp_ms, price] points wherever local history has no sample.
+
+        Time-series collections cannot upsert, so points are deduplicated by
+        timestamp instead: across the whole fetched range, a point is kept
+        when no stored sample lies within half a HISTORY_SAMPLE_SECONDS of it.
+        That fills holes anywhere in the range, not just before or after
+        the stored span, and repeating a backfill inserts nothing.
+        """
+        points = [(ts_ms, price) for ts_ms, price in points if price is not None]
+        if not points:
+            return
+        wanted = np.fromiter((ts_ms for ts_ms, _ in points), dtype=np.int64, count=len(points))
+        first = datetime.fromtimestamp(wanted.min() / 1000, tz=timezone.utc)
+        last = datetime.fromtimestamp(wanted.max() / 1000, tz=timezone.utc)
+        tolerance = timedelta(seconds=config.HISTORY_SAMPLE_SECONDS / 2)
+        stored, _ = await self.get_range(coin_id, first - tolerance, last + tolerance)
+
+        if len(stored):
+            # Distance from each upstream point to the nearest stored sample
+            right = np.clip(np.searchsorted(stored, wanted), 0, len(stored) - 1)
+            left = np.clip(right - 1, 0, len(stored) - 1)
+            nearest = np.minimum(np.abs(stored[right] - wanted), np.abs(stored[left] - wanted))
+            missing = nearest > tolerance.total_seconds() * 1000
+        else:
+            missing = np.ones(len(points), dtype=bool)
+        docs = [
+            {
+                'ts': datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc),
+                'coin_id': coin_id,
+                'price': price,
+            }
+            for (ts_ms, price), keep in zip(points, missing)
+            if keep
+        ]
+        if docs:
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except Exception as e:
+                logger.error(f"Error backfilling history for {coin_id}: {e}")
+
+    async def get_range(self, coin_id, start, end=None):
+        """Get (timestamps_ms, prices) arrays for a coin between two datetimes"""
+        query = {'coin_id': coin_id, 'ts': {'$gte': start}}
+        if end is not None:
+            query['ts']['$lte'] = end
+        docs = await self.collection.find(
+            query, {'_id': 0, 'ts': 1, 'price': 1}
+        ).sort('ts', 1).to_list(None)
+
+        timestamps = np.fromiter(
+            (doc['ts'].replace(tzinfo=timezone.utc).timestamp() * 1000 for doc in docs),
+            dtype=np.int64, count=len(docs)
+        )
+        prices = np.fromiter((doc['price'] for doc in docs), dtype=np.float64, count=len(docs))
+        return timestamps, prices
+
+    async def get_series(self, coin_id, days):
+        """Get [timestamp_ms, close] points for the last ``days`` days at
+        market_chart resolution, or None when local history does not
+        cover the whole range, has a gap inside it, or is stale."""
+        bucket = resolution_for(days)
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(days=float(days))
+
+        timestamps, prices = await self.get_range(coin_id, start - timedelta(seconds=bucket))
+        if len(timestamps) == 0:
+            return None
+
+        covers_start = timestamps[0] <= (start + timedelta(seconds=bucket)).timestamp() * 1000
+        fresh = timestamps[-1] >= (now - timedelta(seconds=2 * config.HISTORY_SAMPLE_SECONDS)).timestamp() * 1000
+        if not (covers_start and fresh):
+            return None
+        # A hole (e.g. an outage of the poller) longer than two buckets means the range is incomplete
+        max_gap = 2 * max(bucket, config.HISTORY_SAMPLE_SECONDS) * 1000
+        if len(timestamps) > 1 and np.diff(timestamps).max() > max_gap:
+            return None
+
+        bucket_ts, _, _, _, close = resample_ohlc(timestamps, prices, bucket)
+        keep = bucket_ts >= (start.timestamp() * 1000) - bucket * 1000
+        # Report the newest sample at its own timestamp, like market_chart does
+        bucket_ts = bucket_ts[keep]
+        bucket_ts[-1:] = timestamps[-1]
+        return np.column_stack((bucket_ts, close[keep])).tolist()
@@ -0,0 +1,52 @@
+import gzip
+
+from starlette.responses import JSONResponse, Response
+
+from fastjson import dumps
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+# Browsers may keep admin responses but must revalidate them with the ETag
+CACHE_CONTROL = 'private, no-cache'
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def weak_etag(names, versions, *extra):
+    """Weak validator built from collection versions (and e.g. a time bucket)"""
+    parts = [f"{name}-{version}" for name, version in zip(names, versions)]
+    parts.extend(str(value) for value in extra)
+    return 'W/"' + '.'.join(parts) + '"'
+
+
+def not_modified(request, etag):
+    """Whether the request's If-None-Match already matches etag (weak comparison)"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate == '*' or candidate.removeprefix('W/') == opaque
+        for candidate in (value.strip() for value in header.split(','))
+    )
+
+
+def not_modified_response(etag):
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+
+def json_response(request, content, etag=None):
+    """orjson-encoded response with cache headers, gzipped when large and accepted"""
+    body = dumps(content)
+    headers = {'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+    if etag:
+        headers['ETag'] = etag
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.headers.get('accept-encoding', ''):
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, media_type='application/json', headers=headers)
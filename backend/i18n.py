@@ -0,0 +1,45 @@
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = Path(__file__).parent / 'locales'
+# Catalog languages; the first one is the source language for translations
+SUPPORTED_LANGUAGES = ('en', 'uk')
+SOURCE_LANGUAGE = SUPPORTED_LANGUAGES[0]
+# English names, used in LLM translation prompts
+LANGUAGE_NAMES = {'en': 'English', 'uk': 'Ukrainian'}
+
+
+@lru_cache(maxsize=None)
+def catalog(language):
+    """Message catalog for a language, read from disk once per process"""
+    with open(LOCALES_DIR / f"{language}.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def t(language, key, **params):
+    """Catalog message for key, falling back to the source language"""
+    text = catalog(language).get(key)
+    if text is None:
+        if language != SOURCE_LANGUAGE:
+            logger.warning(f"Missing {language} message {key!r}")
+        text = catalog(SOURCE_LANGUAGE)[key]
+    return text.format(**params) if params else text
+
+
+def normalize(code):
+    """Supported catalog language for an IETF code such as 'uk-UA', else None"""
+    if not code:
+        return None
+    code = code.split('-')[0].split('_')[0].lower()
+    return code if code in SUPPORTED_LANGUAGES else None
+
+
+def resolve_language(chosen=None, client=None):
+    """The user's /language choice, else their Telegram client language, else the default"""
+    return normalize(chosen) or normalize(client) or normalize(config.DEFAULT_LANGUAGE) or SOURCE_LANGUAGE
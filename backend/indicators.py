@@ -0,0 +1,180 @@
+"""
+Vectorized technical indicators.
+
+Every function takes 2-D arrays shaped (coins, periods) and works on all
+coins at once; a single series can be passed as ``prices[None, :]``.
+Leading periods without enough history are NaN.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from history_store import resample_ohlc
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[None, :] if values.ndim == 1 else values
+
+
+def sma(values, n):
+    values = _as_2d(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= n:
+        cumsum = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+        out[:, n - 1:] = (cumsum[:, n:] - cumsum[:, :-n]) / n
+    return out
+
+
+def ema(values, n=None, alpha=None):
+    """Exponential moving average seeded with the SMA of the first n periods"""
+    values = _as_2d(values)
+    alpha = alpha if alpha is not None else 2 / (n + 1)
+    n = n if n is not None else int(round(1 / alpha))
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < n:
+        return out
+    current = values[:, :n].mean(axis=1)
+    out[:, n - 1] = current
+    for t in range(n, values.shape[1]):
+        current = current + alpha * (values[:, t] - current)
+        out[:, t] = current
+    return out
+
+
+def rsi(values, n=14):
+    """Wilder's relative strength index"""
+    values = _as_2d(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] <= n:
+        return out
+    delta = np.diff(values, axis=1)
+    avg_gain = ema(np.clip(delta, 0, None), n, alpha=1 / n)
+    avg_loss = ema(np.clip(-delta, 0, None), n, alpha=1 / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        out[:, 1:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + rs))
+    return out
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """Return (macd line, signal line, histogram)"""
+    values = _as_2d(values)
+    line = ema(values, fast) - ema(values, slow)
+    signal_line = np.full(values.shape, np.nan)
+    valid = slow - 1
+    if values.shape[1] > valid:
+        signal_line[:, valid:] = ema(line[:, valid:], signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(values, n=20, k=2.0):
+    """Return (lower band, middle band, upper band)"""
+    values = _as_2d(values)
+    middle = sma(values, n)
+    std = np.full(values.shape, np.nan)
+    if values.shape[1] >= n:
+        std[:, n - 1:] = sliding_window_view(values, n, axis=1).std(axis=2)
+    return middle - k * std, middle, middle + k * std
+
+
+def atr(high, low, close, n=14):
+    """Wilder's average true range"""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.concatenate((close[:, :1], close[:, :-1]), axis=1)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return ema(true_range, n, alpha=1 / n)
+
+
+def pivot_levels(values, window=12, count=2):
+    """Nearest swing-low supports and swing-high resistances per coin.
+
+    A swing point is the extreme of a centred ``2 * window + 1`` window.
+    Returns a list of (supports, resistances) tuples, nearest level first.
+    """
+    values = _as_2d(values)
+    size = 2 * window + 1
+    levels = []
+    if values.shape[1] < size:
+        return [([], []) for _ in range(values.shape[0])]
+
+    windows = sliding_window_view(values, size, axis=1)
+    centre = values[:, window:-window]
+    is_high = centre == windows.max(axis=2)
+    is_low = centre == windows.min(axis=2)
+    last = values[:, -1]
+
+    for i in range(values.shape[0]):
+        highs = np.unique(centre[i][is_high[i]])
+        lows = np.unique(centre[i][is_low[i]])
+        supports = np.sort(lows[lows < last[i]])[::-1][:count]
+        resistances = np.sort(highs[highs > last[i]])[:count]
+        levels.append((supports.tolist(), resistances.tolist()))
+    return levels
+
+
+def _last(values):
+    return [None if np.isnan(v) else float(v) for v in values[:, -1]]
+
+
+def technical_summary(prices, daily_ohlc=None):
+    """Latest indicator values for a batch of equal-length price series.
+
+    ``prices`` is (coins, periods), typically hourly closes. ``daily_ohlc``
+    is an optional (high, low, close) tuple of (coins, days) arrays used
+    for ATR and classic floor pivots. Returns one dict per coin.
+    """
+    prices = _as_2d(prices)
+    macd_line, signal_line, histogram = macd(prices)
+    lower, middle, upper = bollinger(prices)
+
+    columns = {
+        'price': _last(prices),
+        'sma_20': _last(sma(prices, 20)),
+        'sma_50': _last(sma(prices, 50)),
+        'ema_20': _last(ema(prices, 20)),
+        'rsi_14': _last(rsi(prices, 14)),
+        'macd': _last(macd_line),
+        'macd_signal': _last(signal_line),
+        'macd_hist': _last(histogram),
+        'bb_lower': _last(lower),
+        'bb_middle': _last(middle),
+        'bb_upper': _last(upper),
+    }
+
+    if daily_ohlc is not None:
+        high, low, close = (_as_2d(a) for a in daily_ohlc)
+        columns['atr_14d'] = _last(atr(high, low, close, 14))
+        if high.shape[1] >= 2:
+            # Classic floor pivots from the last completed day
+            prev_high, prev_low, prev_close = high[:, -2], low[:, -2], close[:, -2]
+            pivot = (prev_high + prev_low + prev_close) / 3
+            columns['pivot'] = pivot.tolist()
+            columns['pivot_r1'] = (2 * pivot - prev_low).tolist()
+            columns['pivot_s1'] = (2 * pivot - prev_high).tolist()
+
+    levels = pivot_levels(prices)
+    summaries = []
+    for i in range(prices.shape[0]):
+        summary = {name: values[i] for name, values in columns.items()}
+        summary['supports'], summary['resistances'] = levels[i]
+        summaries.append(summary)
+    return summaries
+
+
+def summarize_series(series_list):
+    """technical_summary() for a batch of [timestamp_ms, price] series.
+
+    Series are right-aligned to a common length so all coins are computed
+    in the same vectorized pass; daily OHLC bars are resampled locally.
+    """
+    series = [np.asarray(points, dtype=np.float64).reshape(-1, 2) for points in series_list]
+    length = min(len(s) for s in series)
+    prices = np.stack([s[len(s) - length:, 1] for s in series])
+
+    daily = [resample_ohlc(s[:, 0].astype(np.int64), s[:, 1], 86400) for s in series]
+    days = min(len(bars[0]) for bars in daily)
+    daily_ohlc = tuple(
+        np.stack([bars[column][len(bars[column]) - days:] for bars in daily])
+        for column in (2, 3, 4)
+    )
+    return technical_summary(prices, daily_ohlc if days else None)
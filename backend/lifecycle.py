@@ -0,0 +1,66 @@
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shutdown phases: STOP runs while the bot can still send (post_stop), SHUTDOWN after it closed (post_shutdown)
+STOP, SHUTDOWN = 'stop', 'shutdown'
+
+
+class Lifecycle:
+    """Ordered startup and deadline-bounded shutdown of background components.
+
+    Components start in registration order and stop in reverse, so queues
+    drain before the stores and connections they write to are closed. All
+    stop steps share one deadline: ``remaining()`` tells a step how long it
+    may wait, and a step that overruns or fails is logged and skipped so
+    the rest still close. Steps registered for the ``STOP`` phase run in
+    the first ``shutdown(STOP)`` call, before the bot's HTTP client is
+    closed; the rest run in ``shutdown()``.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._components = []
+        self._deadline = None
+
+    def add(self, name, start=None, stop=None, phase=SHUTDOWN):
+        """Register a component; start/stop are plain or async callables without arguments"""
+        self._components.append((name, start, stop, phase))
+
+    def remaining(self):
+        """Seconds left before the shutdown deadline (the full timeout before shutdown starts)"""
+        if self._deadline is None:
+            return self.timeout
+        return max(self._deadline - asyncio.get_running_loop().time(), 0.0)
+
+    async def startup(self):
+        for name, start, _, _ in self._components:
+            if start is None:
+                continue
+            result = start()
+            if inspect.isawaitable(result):
+                await result
+            logger.debug(f"Started {name}")
+
+    async def shutdown(self, phase=SHUTDOWN):
+        """Stop the components of one phase in reverse order; the deadline starts with the first call"""
+        loop = asyncio.get_running_loop()
+        if self._deadline is None:
+            self._deadline = loop.time() + self.timeout
+        for name, _, stop, component_phase in reversed(self._components):
+            if stop is None or component_phase != phase:
+                continue
+            try:
+                result = stop()
+                if inspect.isawaitable(result):
+                    # A small grace over the deadline lets steps that honour remaining() finish cleanly
+                    await asyncio.wait_for(result, self.remaining() + 1)
+                logger.info(f"Stopped {name}")
+            except asyncio.TimeoutError:
+                logger.warning(f"Stopping {name} exceeded the shutdown deadline")
+            except Exception as e:
+                logger.error(f"Error stopping {name}: {e}")
+        if phase == SHUTDOWN:
+            logger.info(f"Shutdown finished in {self.timeout - self.remaining():.2f}s")
@@ -0,0 +1,190 @@
+"""
+Prometheus metrics shared by the bot and API processes.
+
+Metric updates are in-process counter/histogram increments (no I/O), so
+instrumenting hot paths costs on the order of a microsecond per call.
+"""
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from profiling import profiler
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+HANDLER_LATENCY = Histogram(
+    'bot_handler_seconds', 'Telegram handler latency', ['handler'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HANDLER_ERRORS = Counter('bot_handler_errors_total', 'Unhandled Telegram handler errors', ['handler'])
+
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_seconds', 'Upstream API call latency', ['source'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+UPSTREAM_ERRORS = Counter('upstream_errors_total', 'Failed upstream API calls', ['source'])
+UPSTREAM_BYTES = Counter('upstream_response_bytes_total', 'Upstream response body bytes', ['source'])
+JSON_PARSE_SECONDS = Histogram(
+    'upstream_json_parse_seconds', 'Upstream JSON decode time', ['source'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+CIRCUIT_STATE = Gauge('upstream_circuit_state', 'Upstream circuit state (0 closed, 1 open, 2 half-open)', ['source'])
+STALE_RESPONSES = Counter('upstream_stale_responses_total', 'Cached responses served for a failing upstream', ['source'])
+BUDGET_REMAINING = Gauge('upstream_budget_remaining', 'Requests left in the rate-limit window', ['source'])
+BUDGET_WAITS = Counter('upstream_budget_waits_total', 'Requests queued for rate-limit budget', ['source', 'priority'])
+
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups', ['cache', 'result'])
+
+MONGO_LATENCY = Histogram(
+    'mongo_command_seconds', 'MongoDB command latency', ['command'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+MONGO_ERRORS = Counter('mongo_command_errors_total', 'Failed MongoDB commands', ['command'])
+
+BROADCAST_MESSAGES = Counter('broadcast_messages_total', 'Digest broadcast deliveries', ['outcome'])
+NOTIFICATIONS = Counter('notifications_total', 'Queued notification deliveries', ['outcome'])
+NOTIFICATION_QUEUE_DEPTH = Gauge('notification_queue_depth', 'Messages waiting in the notification queue')
+
+WRITE_BUFFER_OPS = Counter('write_buffer_ops_total', 'Buffered Mongo writes flushed', ['collection', 'outcome'])
+WRITE_BUFFER_DEPTH = Gauge('write_buffer_pending', 'Mongo writes waiting in the write-behind buffer')
+
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM tokens per feature', ['feature', 'kind'])
+FAQ_SIMILARITY = Histogram(
+    'faq_cache_similarity', 'Best cached-question similarity per chat lookup',
+    buckets=(0.3, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0),
+)
+FAQ_SAVED_SECONDS = Counter('faq_cache_saved_seconds_total', 'Estimated LLM time saved by cached chat answers')
+DIGEST_SUMMARIES = Counter('digest_summaries_total', 'Digest AI summary attempts', ['outcome'])
+
+EVENT_LOOP_LAG = Gauge('event_loop_lag_seconds', 'Smoothed extra delay of a short asyncio sleep')
+UPSTREAM_IN_FLIGHT = Gauge('upstream_in_flight', 'Upstream HTTP and LLM calls in progress', ['source'])
+OVERLOAD_MODE = Gauge('overload_mode', 'Overload controller mode (0 normal, 1 degraded, 2 shedding)')
+OVERLOAD_TRANSITIONS = Counter('overload_transitions_total', 'Overload mode changes', ['from_mode', 'to_mode'])
+OVERLOAD_DEGRADED = Counter('overload_degraded_requests_total', 'Requests served in a degraded form', ['feature'])
+
+API_LATENCY = Histogram('api_request_seconds', 'Admin API request latency', ['method', 'route'])
+STARTUP_SECONDS = Gauge('process_startup_seconds', 'Seconds from process start until ready to serve', ['process'])
+
+UPSTREAM_HOSTS = {
+    'api.coingecko.com': 'coingecko',
+    'pro-api.coingecko.com': 'coingecko',
+    'cryptopanic.com': 'cryptopanic',
+    'newsapi.org': 'newsapi',
+    'bank.gov.ua': 'nbu',
+    'www.ecb.europa.eu': 'ecb',
+}
+
+
+def cache_hit(cache, count=1):
+    CACHE_REQUESTS.labels(cache, 'hit').inc(count)
+
+
+def cache_miss(cache, count=1):
+    CACHE_REQUESTS.labels(cache, 'miss').inc(count)
+
+
+def timed_handler(name, callback):
+    """Wrap a python-telegram-bot callback with latency and error metrics"""
+    latency = HANDLER_LATENCY.labels(name)
+    errors = HANDLER_ERRORS.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            with profiler.handler_span(name):
+                return await callback(update, context)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+# Calls in progress per upstream source, read by the overload controller
+_in_flight = defaultdict(int)
+
+
+def in_flight(source=None):
+    """Upstream calls in progress for one source, or for all sources"""
+    return _in_flight[source] if source else sum(_in_flight.values())
+
+
+def _track_in_flight(source, delta):
+    _in_flight[source] += delta
+    UPSTREAM_IN_FLIGHT.labels(source).inc(delta)
+
+
+@contextmanager
+def upstream_timer(source):
+    """Time a non-HTTP upstream call such as an LLM request"""
+    start = time.perf_counter()
+    _track_in_flight(source, 1)
+    span = profiler.begin(source, 'upstream')
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(source).inc()
+        raise
+    finally:
+        profiler.end(span)
+        _track_in_flight(source, -1)
+        UPSTREAM_LATENCY.labels(source).observe(time.perf_counter() - start)
+
+
+def _source(url):
+    host = urlsplit(str(url)).hostname or 'unknown'
+    return UPSTREAM_HOSTS.get(host, host)
+
+
+async def _on_request_start(session, context, params):
+    context.start = time.perf_counter()
+    source = _source(params.url)
+    _track_in_flight(source, 1)
+    context.span = profiler.begin(f"{source} {params.method} {params.url.path}", 'upstream')
+
+
+async def _on_request_end(session, context, params):
+    source = _source(params.url)
+    _track_in_flight(source, -1)
+    profiler.end(context.span, status=params.response.status)
+    UPSTREAM_LATENCY.labels(source).observe(time.perf_counter() - context.start)
+    if params.response.status >= 400:
+        UPSTREAM_ERRORS.labels(source).inc()
+
+
+async def _on_request_exception(session, context, params):
+    source = _source(params.url)
+    _track_in_flight(source, -1)
+    profiler.end(context.span, error=type(params.exception).__name__)
+    UPSTREAM_LATENCY.labels(source).observe(time.perf_counter() - context.start)
+    UPSTREAM_ERRORS.labels(source).inc()
+
+
+def aiohttp_trace_config():
+    """aiohttp TraceConfig recording latency and errors per upstream host"""
+    import aiohttp  # only the bot process makes upstream calls; keep it out of the API's imports
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_LATENCY; pass via event_listeners"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_ERRORS.labels(event.command_name).inc()
@@ -0,0 +1,182 @@
+"""
+Compact domain models decoded once at the I/O boundary.
+
+Slotted dataclasses keep only the fields the bot uses, instead of the
+nested upstream dicts they are built from.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def parse_datetime(value):
+    """Parse a stored ISO string or naive UTC datetime into an aware datetime"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass(slots=True)
+class User:
+    """Bot user as stored in the users collection"""
+    telegram_id: int
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    subscription_tier: str = 'free'
+    created_at: Optional[datetime] = None
+    # Chosen with /language; language_code is the Telegram client's
+    language: Optional[str] = None
+    language_code: Optional[str] = None
+    # ISO code chosen with /currency
+    currency: Optional[str] = None
+
+    @classmethod
+    def from_doc(cls, doc):
+        return cls(
+            telegram_id=doc['telegram_id'],
+            username=doc.get('username'),
+            first_name=doc.get('first_name'),
+            subscription_tier=doc.get('subscription_tier', 'free'),
+            created_at=parse_datetime(doc.get('created_at')),
+            language=doc.get('language'),
+            language_code=doc.get('language_code'),
+            currency=doc.get('currency'),
+        )
+
+
+@dataclass(slots=True)
+class Subscription:
+    """Premium subscription with expires_at parsed once"""
+    telegram_id: int
+    tier: str = 'premium'
+    expires_at: Optional[datetime] = None
+
+    @classmethod
+    def from_doc(cls, doc):
+        return cls(
+            telegram_id=doc['telegram_id'],
+            tier=doc.get('tier', 'premium'),
+            expires_at=parse_datetime(doc.get('expires_at')),
+        )
+
+    def is_active(self, now=None):
+        if self.expires_at is None:
+            return False
+        return self.expires_at > (now or datetime.now(timezone.utc))
+
+
+# Fields needed to build a Subscription; pass as the find() projection
+SUBSCRIPTION_FIELDS = {'_id': 0, 'telegram_id': 1, 'tier': 1, 'expires_at': 1}
+
+
+@dataclass(slots=True)
+class Coin:
+    """Market snapshot coin, or a bare search result when price is None"""
+    id: str
+    symbol: str
+    name: str
+    price: Optional[float] = None
+    change_24h: float = 0.0
+    change_7d: float = 0.0
+    market_cap: Optional[float] = None
+    volume_24h: Optional[float] = None
+
+    @classmethod
+    def from_market_row(cls, row):
+        """Build from a /coins/markets row"""
+        return cls(
+            id=row['id'],
+            symbol=row['symbol'].upper(),
+            name=row['name'],
+            price=row.get('current_price'),
+            change_24h=row.get('price_change_percentage_24h') or 0.0,
+            change_7d=row.get('price_change_percentage_7d_in_currency') or 0.0,
+            market_cap=row.get('market_cap'),
+            volume_24h=row.get('total_volume'),
+        )
+
+    @classmethod
+    def from_search_result(cls, row):
+        """Build from a /search coins entry"""
+        return cls(id=row['id'], symbol=row['symbol'].upper(), name=row['name'])
+
+
+@dataclass(slots=True)
+class NewsItem:
+    """Headline from CryptoPanic or NewsAPI"""
+    title: str
+    url: str
+    source: str
+    published: str
+
+    @classmethod
+    def from_cryptopanic(cls, post):
+        return cls(
+            title=post.get('title') or 'No title',
+            url=post.get('url', ''),
+            source=(post.get('source') or {}).get('title', 'CryptoPanic'),
+            published=(post.get('published_at') or '')[:10],
+        )
+
+    @classmethod
+    def from_newsapi(cls, article):
+        return cls(
+            title=article.get('title') or 'No title',
+            url=article.get('url', ''),
+            source=(article.get('source') or {}).get('name', 'NewsAPI'),
+            published=(article.get('publishedAt') or '')[:10],
+        )
+
+
+@dataclass(slots=True)
+class DigestSnapshot:
+    """Content of one digest broadcast, built once and shared by every recipient"""
+    # Market overview text per currency
+    market_summaries: dict
+    news: list
+    summary: Optional[str] = None
+
+
+@dataclass(slots=True)
+class CoinDetail:
+    """Market data used by AI asset analysis"""
+    id: str
+    name: str
+    symbol: str
+    price: float
+    market_cap: float
+    volume_24h: float
+    price_change_24h: float
+    price_change_7d: float
+    price_change_30d: float
+    ath: float
+    ath_change: float
+    atl: float
+    circulating_supply: float
+    max_supply: Optional[float]
+    technicals: Optional[dict] = None
+
+    @classmethod
+    def from_market_row(cls, row, technicals=None):
+        """Build from a /coins/markets row requested with price_change_percentage=24h,7d,30d"""
+        return cls(
+            id=row['id'],
+            name=row['name'],
+            symbol=row['symbol'].upper(),
+            price=row['current_price'],
+            market_cap=row.get('market_cap') or 0,
+            volume_24h=row.get('total_volume') or 0,
+            price_change_24h=row.get('price_change_percentage_24h') or 0,
+            price_change_7d=row.get('price_change_percentage_7d_in_currency') or 0,
+            price_change_30d=row.get('price_change_percentage_30d_in_currency') or 0,
+            ath=row.get('ath') or 0,
+            ath_change=row.get('ath_change_percentage') or 0,
+            atl=row.get('atl') or 0,
+            circulating_supply=row.get('circulating_supply') or 0,
+            max_supply=row.get('max_supply'),
+            technicals=technicals,
+        )
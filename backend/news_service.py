@@ -1,36 +1,62 @@
 import aiohttp
+import asyncio
 import os
 import logging
 from datetime import datetime, timezone
 
+from telegram.helpers import escape_markdown
+
+from config import config
+from fastjson import read_json
+from i18n import SOURCE_LANGUAGE, t
+from metrics import aiohttp_trace_config
+from models import NewsItem
+from resilience import stale_notice, upstream_cache, upstream_timeout
+
 logger = logging.getLogger(__name__)
 
 
 class NewsService:
     """Service for crypto and financial news aggregation"""
     
-    def __init__(self):
+    def __init__(self, translations=None):
+        self.translations = translations
         self.cryptopanic_key = os.environ.get('CRYPTOPANIC_API_KEY', '')
         self.newsapi_key = os.environ.get('NEWSAPI_KEY', '')
         self.session = None
+        self.cryptopanic = upstream_cache('cryptopanic')
+        self.newsapi = upstream_cache('newsapi')
     
     async def get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = aiohttp.ClientSession(timeout=upstream_timeout(), trace_configs=[aiohttp_trace_config()])
         return self.session
     
     async def close(self):
         if self.session and not self.session.closed:
             await self.session.close()
     
+    async def _get_json(self, responses, url, params, parse):
+        """GET a news API through its circuit breaker and response cache; returns (parsed, age)"""
+        async def fetch():
+            session = await self.get_session()
+            async with session.get(url, params=params) as response:
+                response.raise_for_status()
+                data = await read_json(response, responses.breaker.name)
+            return parse(data)
+        
+        return await responses.get((url, tuple(sorted(params.items()))), fetch, config.NEWS_CACHE_TTL)
+    
     async def get_cryptopanic_news(self, limit=5):
-        """Get news from CryptoPanic"""
+        """Get NewsItems from CryptoPanic"""
+        return (await self._cryptopanic_news(limit))[0]
+    
+    async def _cryptopanic_news(self, limit):
         if not self.cryptopanic_key:
-            return []
+            return [], 0.0
         
         try:
-            session = await self.get_session()
-            url = "https://cryptopanic.com/api/v1/posts/"
+            url = f"{config.CRYPTOPANIC_API_BASE}/posts/"
             params = {
                 'auth_token': self.cryptopanic_key,
                 'public': 'true',
@@ -38,22 +64,26 @@ class NewsService:
                 'filter': 'important'
             }
             
-            async with session.get(url, params=params) as response:
-                data = await response.json()
-                return data.get('results', [])[:limit]
+            items, age = await self._get_json(
+                self.cryptopanic, url, params,
+                lambda data: [NewsItem.from_cryptopanic(post) for post in data.get('results', [])]
+            )
+            return items[:limit], age
         
         except Exception as e:
             logger.error(f"Error fetching CryptoPanic news: {e}")
-            return []
+            return [], 0.0
     
     async def get_newsapi_articles(self, limit=5):
-        """Get crypto news from NewsAPI"""
+        """Get crypto NewsItems from NewsAPI"""
+        return (await self._newsapi_articles(limit))[0]
+    
+    async def _newsapi_articles(self, limit):
         if not self.newsapi_key:
-            return []
+            return [], 0.0
         
         try:
-            session = await self.get_session()
-            url = "https://newsapi.org/v2/everything"
+            url = f"{config.NEWSAPI_BASE}/everything"
             params = {
                 'apiKey': self.newsapi_key,
                 'q': 'cryptocurrency OR bitcoin OR ethereum',
@@ -62,79 +92,101 @@ class NewsService:
                 'pageSize': limit
             }
             
-            async with session.get(url, params=params) as response:
-                data = await response.json()
-                return data.get('articles', [])[:limit]
+            items, age = await self._get_json(
+                self.newsapi, url, params,
+                lambda data: [NewsItem.from_newsapi(article) for article in data.get('articles', [])]
+            )
+            return items[:limit], age
         
         except Exception as e:
             logger.error(f"Error fetching NewsAPI articles: {e}")
-            return []
+            return [], 0.0
+    
+    async def _translate(self, texts, language):
+        """Texts in language (the originals without a translation cache)"""
+        if self.translations is None:
+            return list(texts)
+        return await self.translations.translate(texts, language)
     
-    async def get_latest_news(self):
+    async def _translate_summary(self, summary, language, timeout):
+        if not summary:
+            return None
+        # Shielded, so a slow translation still finishes into the cache for later editions
+        translation = asyncio.ensure_future(self._translate([summary], language))
+        try:
+            return (await asyncio.wait_for(asyncio.shield(translation), timeout))[0]
+        except asyncio.TimeoutError:
+            logger.warning(f"Digest summary translation to {language} timed out after {timeout}s, sending headlines only")
+            return None
+    
+    async def get_latest_news(self, language=SOURCE_LANGUAGE):
         """Get latest crypto news from multiple sources"""
-        cryptopanic_news = await self.get_cryptopanic_news(3)
-        newsapi_articles = await self.get_newsapi_articles(3)
+        cryptopanic_news, cryptopanic_age = await self._cryptopanic_news(3)
+        newsapi_articles, newsapi_age = await self._newsapi_articles(3)
+        titles = await self._translate([news.title for news in cryptopanic_news + newsapi_articles], language)
         
-        result = "📰 **Latest Crypto News**\n\n"
+        result = t(language, 'news.latest_header') + "\n\n"
         
         if cryptopanic_news:
-            result += "**🔥 Top Stories (CryptoPanic)**\n\n"
-            for i, news in enumerate(cryptopanic_news, 1):
-                title = news.get('title', 'No title')
-                url = news.get('url', '')
-                source = news.get('source', {}).get('title', 'Unknown')
-                published = news.get('published_at', '')
-                
+            result += t(language, 'news.top_stories') + "\n\n"
+            for i, (news, title) in enumerate(zip(cryptopanic_news, titles), 1):
                 result += f"{i}. **{title}**\n"
-                result += f"   📅 {published[:10]} | 📰 {source}\n"
-                result += f"   🔗 {url}\n\n"
+                result += f"   📅 {news.published} | 📰 {news.source}\n"
+                result += f"   🔗 {news.url}\n\n"
         
         if newsapi_articles:
-            result += "\n**📈 Financial News (NewsAPI)**\n\n"
-            for i, article in enumerate(newsapi_articles, 1):
-                title = article.get('title', 'No title')
-                url = article.get('url', '')
-                source = article.get('source', {}).get('name', 'Unknown')
-                published = article.get('publishedAt', '')[:10]
-                
+            result += "\n" + t(language, 'news.financial') + "\n\n"
+            for i, (article, title) in enumerate(zip(newsapi_articles, titles[len(cryptopanic_news):]), 1):
                 result += f"{i}. **{title}**\n"
-                result += f"   📅 {published} | 📰 {source}\n"
-                result += f"   🔗 {url}\n\n"
+                result += f"   📅 {article.published} | 📰 {article.source}\n"
+                result += f"   🔗 {article.url}\n\n"
         
         if not cryptopanic_news and not newsapi_articles:
-            result += "📡 No news available at the moment. Please check back later.\n"
-            result += "\n💡 Tip: Make sure API keys are configured for news sources."
+            result += t(language, 'news.empty') + "\n"
+            result += "\n" + t(language, 'news.empty_tip')
         
+        result += (stale_notice('CryptoPanic', cryptopanic_age, language)
+                   + stale_notice('NewsAPI', newsapi_age, language))
         return result
     
-    async def get_daily_digest(self):
-        """Get news digest for daily broadcast"""
+    async def get_digest_news(self, limit=8):
+        """Digest headlines from all sources, without stories both sources carry"""
         cryptopanic_news = await self.get_cryptopanic_news(5)
         newsapi_articles = await self.get_newsapi_articles(5)
         
-        result = "📰 **Top News Today**\n\n"
-        
-        all_news = []
-        
-        for news in cryptopanic_news:
-            all_news.append({
-                'title': news.get('title', ''),
-                'url': news.get('url', ''),
-                'source': news.get('source', {}).get('title', 'CryptoPanic')
-            })
-        
-        for article in newsapi_articles:
-            all_news.append({
-                'title': article.get('title', ''),
-                'url': article.get('url', ''),
-                'source': article.get('source', {}).get('name', 'NewsAPI')
-            })
-        
-        for i, news in enumerate(all_news[:8], 1):
-            result += f"{i}. {news['title']}\n"
-            result += f"   📰 {news['source']} | 🔗 {news['url']}\n\n"
-        
-        if not all_news:
-            result += "No news available for today's digest.\n"
+        seen = set()
+        items = []
+        for news in cryptopanic_news + newsapi_articles:
+            key = " ".join(news.title.casefold().split())
+            if key not in seen:
+                seen.add(key)
+                items.append(news)
+        return items[:limit]
+    
+    async def get_daily_digest(self, language=SOURCE_LANGUAGE, items=None, summary=None, summary_timeout=None):
+        """Get news digest for daily broadcast, led by the AI summary when there is one.
+        
+        The summary is escaped for Markdown, and its translation waits at most
+        ``summary_timeout`` seconds; past that the digest goes out without it.
+        """
+        if items is None:
+            items = await self.get_digest_news()
+        
+        texts, summary = await asyncio.gather(
+            self._translate([news.title for news in items], language),
+            self._translate_summary(summary, language, summary_timeout)
+        )
+        result = ""
+        if summary:
+            result += t(language, 'digest.summary') + "\n" + escape_markdown(summary) + "\n\n"
+        
+        result += t(language, 'news.digest_header') + "\n\n"
+        
+        for i, (news, title) in enumerate(zip(items, texts), 1):
+            result += f"{i}. {title}\n"
+            result += f"   📰 {news.source} | 🔗 {news.url}\n\n"
+        
+        if not items:
+            result += t(language, 'news.digest_empty') + "\n"
         
         return result
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from telegram.error import Forbidden, RetryAfter
+
+from metrics import NOTIFICATIONS, NOTIFICATION_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """Rate-limited queue for outbound Telegram messages"""
+
+    def __init__(self, rate_per_sec=25, maxsize=100000):
+        self.interval = 1.0 / rate_per_sec
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.bot = None
+        self._worker = None
+        self._unsent = []
+        NOTIFICATION_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    def start(self, bot):
+        """Start the delivery worker on the running event loop"""
+        self.bot = bot
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=None):
+        """Wait for queued messages to drain, then stop the worker.
+        
+        Returns the (chat_id, text, kwargs) messages still undelivered at the timeout.
+        """
+        if self._worker is None:
+            return []
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.queue.qsize()} notifications left undelivered at shutdown")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        undelivered, self._unsent = self._unsent, []
+        while not self.queue.empty():
+            undelivered.append(self.queue.get_nowait())
+            self.queue.task_done()
+        return undelivered
+
+    def enqueue(self, chat_id, text, **kwargs):
+        """Queue a message; returns False when the queue is full"""
+        try:
+            self.queue.put_nowait((chat_id, text, kwargs))
+            return True
+        except asyncio.QueueFull:
+            NOTIFICATIONS.labels('dropped').inc()
+            logger.warning(f"Notification queue full, dropping message to {chat_id}")
+            return False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        while True:
+            chat_id, text, kwargs = await self.queue.get()
+            try:
+                delay = next_send - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.sleep(delay)
+                    except asyncio.CancelledError:
+                        # Stopped before sending: hand the message back with the rest of the backlog
+                        self._unsent.append((chat_id, text, kwargs))
+                        raise
+                await self._send(chat_id, text, kwargs)
+            except Exception as e:
+                NOTIFICATIONS.labels('failed').inc()
+                logger.error(f"Error sending notification to {chat_id}: {e}")
+            finally:
+                next_send = max(next_send, loop.time()) + self.interval
+                self.queue.task_done()
+
+    async def _send(self, chat_id, text, kwargs):
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except RetryAfter as e:
+            logger.warning(f"Telegram flood limit hit, retrying in {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except Forbidden:
+            NOTIFICATIONS.labels('blocked').inc()
+            logger.info(f"User {chat_id} blocked the bot, skipping notification")
+            return
+        NOTIFICATIONS.labels('sent').inc()
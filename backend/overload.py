@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from config import config
+from metrics import (
+    EVENT_LOOP_LAG, OVERLOAD_DEGRADED, OVERLOAD_MODE, OVERLOAD_TRANSITIONS, in_flight
+)
+
+logger = logging.getLogger(__name__)
+
+NORMAL, DEGRADED, SHEDDING = 'normal', 'degraded', 'shedding'
+MODES = (NORMAL, DEGRADED, SHEDDING)
+# Pressure must fall below this share of a level's threshold before recovery starts
+RECOVERY_RATIO = 0.7
+LAG_SMOOTHING = 0.3
+
+
+class OverloadController:
+    """Switches features to cheaper modes while the bot is overloaded.
+
+    A sampling task measures event-loop lag (how late a short sleep wakes
+    up) and reads the in-flight upstream HTTP and LLM call counts kept by
+    ``metrics``. Pressure is the largest ratio of a signal to its threshold:
+    at 1 the bot is DEGRADED (cached-only market data, short analyses), at
+    2 it is SHEDDING (new chat from users without a paid subscription is
+    declined as well). Modes rise immediately and step down one level at a
+    time once pressure has stayed below ``RECOVERY_RATIO`` of the current
+    level for ``recovery_seconds``.
+    """
+
+    def __init__(self, lag_threshold=None, upstream_threshold=None, llm_threshold=None,
+                 recovery_seconds=None, interval=None):
+        self.lag_threshold = lag_threshold or config.OVERLOAD_LOOP_LAG
+        self.upstream_threshold = upstream_threshold or config.OVERLOAD_UPSTREAM_IN_FLIGHT
+        self.llm_threshold = llm_threshold or config.OVERLOAD_LLM_IN_FLIGHT
+        self.recovery_seconds = recovery_seconds or config.OVERLOAD_RECOVERY_SECONDS
+        self.interval = interval or config.OVERLOAD_SAMPLE_INTERVAL
+        self.level = 0
+        self.lag = 0.0
+        self.pressure = 0.0
+        self._calm_since = None
+        self._task = None
+        OVERLOAD_MODE.set(0)
+
+    @property
+    def mode(self):
+        return MODES[self.level]
+
+    @property
+    def degraded(self):
+        return self.level >= 1
+
+    @property
+    def shedding(self):
+        return self.level >= 2
+
+    def start(self):
+        if config.OVERLOAD_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def degrade(self, feature):
+        """Count one request served in a degraded form"""
+        OVERLOAD_DEGRADED.labels(feature).inc()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.lag = LAG_SMOOTHING * lag + (1 - LAG_SMOOTHING) * self.lag
+            EVENT_LOOP_LAG.set(self.lag)
+            self.update(loop.time())
+
+    def update(self, now):
+        """Re-evaluate the mode from the current signals"""
+        llm = in_flight('llm')
+        self.pressure = max(
+            self.lag / self.lag_threshold,
+            (in_flight() - llm) / self.upstream_threshold,
+            llm / self.llm_threshold,
+        )
+        target = min(int(self.pressure), len(MODES) - 1)
+        if target > self.level:
+            self._calm_since = None
+            self._switch(target)
+        elif self.level and self.pressure < RECOVERY_RATIO * self.level:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recovery_seconds:
+                # Restart the timer so each further step down needs its own calm period
+                self._calm_since = now
+                self._switch(self.level - 1)
+        else:
+            self._calm_since = None
+
+    def _switch(self, level):
+        previous = self.mode
+        self.level = level
+        OVERLOAD_MODE.set(level)
+        OVERLOAD_TRANSITIONS.labels(previous, self.mode).inc()
+        log = logger.info if level < MODES.index(previous) else logger.warning
+        log(f"Overload mode {previous} -> {self.mode} (pressure {self.pressure:.2f}, "
+            f"loop lag {self.lag * 1000:.0f}ms, upstream {in_flight()} in flight)")
@@ -1,15 +1,33 @@
+import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 
+from models import SUBSCRIPTION_FIELDS, Subscription
+
 logger = logging.getLogger(__name__)
 
+# Subscriptions change only on payment (in this process) or expiry, so short caching is safe
+SUBSCRIPTION_CACHE_TTL = 60
+SUBSCRIPTION_CACHE_SIZE = 10000
+
 
 class PaymentService:
     """Service for handling Telegram Stars payments and subscriptions"""
     
-    def __init__(self, db):
+    def __init__(self, db, versions=None):
         self.db = db
+        self.versions = versions
+        self._subscriptions = OrderedDict()
+    
+    async def ensure_indexes(self):
+        """Unique telegram_id, so concurrent activations upsert one document per user"""
+        try:
+            await self.db.subscriptions.create_index("telegram_id", unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create unique subscriptions index (duplicate subscriptions?): {e}")
     
     def _is_premium_test_user(self, telegram_id):
         """Check if user should get free premium for testing"""
@@ -26,6 +44,31 @@ class PaymentService:
         
         return False
     
+    async def get_subscription(self, telegram_id):
+        """Load a user's Subscription, or None; cached for SUBSCRIPTION_CACHE_TTL seconds"""
+        cached = self._subscriptions.get(telegram_id)
+        if cached and time.monotonic() - cached[1] < SUBSCRIPTION_CACHE_TTL:
+            return cached[0]
+        doc = await self.db.subscriptions.find_one({"telegram_id": telegram_id}, SUBSCRIPTION_FIELDS)
+        subscription = Subscription.from_doc(doc) if doc else None
+        self._subscriptions[telegram_id] = (subscription, time.monotonic())
+        self._subscriptions.move_to_end(telegram_id)
+        while len(self._subscriptions) > SUBSCRIPTION_CACHE_SIZE:
+            self._subscriptions.popitem(last=False)
+        return subscription
+    
+    async def get_tier(self, telegram_id):
+        """'premium' or 'free' for analytics; test users count as premium"""
+        if self._is_premium_test_user(telegram_id):
+            return 'premium'
+        subscription = await self.get_subscription(telegram_id)
+        return 'premium' if subscription is not None and subscription.is_active() else 'free'
+    
+    async def has_paid_subscription(self, telegram_id):
+        """Whether the user pays for premium, not counting free test access"""
+        subscription = await self.get_subscription(telegram_id)
+        return subscription is not None and subscription.is_active()
+    
     async def check_subscription(self, telegram_id):
         """Check if user has active premium subscription"""
         try:
@@ -34,21 +77,8 @@ class PaymentService:
                 logger.info(f"User {telegram_id} has free premium (testing mode)")
                 return True
             
-            subscription = await self.db.subscriptions.find_one({"telegram_id": telegram_id})
-            
-            if not subscription:
-                return False
-            
-            expires_at = subscription.get('expires_at')
-            if not expires_at:
-                return False
-            
-            # Parse datetime if string
-            if isinstance(expires_at, str):
-                expires_at = datetime.fromisoformat(expires_at)
-            
-            # Check if subscription is still valid
-            return expires_at > datetime.now(timezone.utc)
+            subscription = await self.get_subscription(telegram_id)
+            return subscription is not None and subscription.is_active()
             
         except Exception as e:
             logger.error(f"Error checking subscription: {e}")
@@ -57,48 +87,37 @@ class PaymentService:
     async def activate_subscription(self, telegram_id, payment_info):
         """Activate premium subscription after successful payment"""
         try:
+            now = datetime.now(timezone.utc)
             # Calculate expiration (30 days from now)
-            expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+            expires_at = now + timedelta(days=30)
             
-            # Check if subscription exists
-            existing_sub = await self.db.subscriptions.find_one({"telegram_id": telegram_id})
-            
-            if existing_sub:
-                # Update existing subscription
-                await self.db.subscriptions.update_one(
+            # Create or renew the subscription and update the user tier concurrently
+            await asyncio.gather(
+                self.db.subscriptions.update_one(
                     {"telegram_id": telegram_id},
                     {
                         "$set": {
+                            "tier": "premium",
                             "expires_at": expires_at.isoformat(),
-                            "updated_at": datetime.now(timezone.utc).isoformat(),
+                            "updated_at": now.isoformat(),
                             "payment_info": {
                                 "currency": payment_info.currency,
                                 "total_amount": payment_info.total_amount,
                                 "telegram_payment_charge_id": payment_info.telegram_payment_charge_id,
                             }
-                        }
-                    }
+                        },
+                        "$setOnInsert": {"created_at": now.isoformat()}
+                    },
+                    upsert=True
+                ),
+                self.db.users.update_one(
+                    {"telegram_id": telegram_id},
+                    {"$set": {"subscription_tier": "premium"}}
                 )
-            else:
-                # Create new subscription
-                await self.db.subscriptions.insert_one({
-                    "telegram_id": telegram_id,
-                    "tier": "premium",
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "expires_at": expires_at.isoformat(),
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "payment_info": {
-                        "currency": payment_info.currency,
-                        "total_amount": payment_info.total_amount,
-                        "telegram_payment_charge_id": payment_info.telegram_payment_charge_id,
-                    }
-                })
-            
-            # Update user tier
-            await self.db.users.update_one(
-                {"telegram_id": telegram_id},
-                {"$set": {"subscription_tier": "premium"}}
             )
+            self._subscriptions.pop(telegram_id, None)
+            if self.versions is not None:
+                await self.versions.bump('subscriptions', 'users')
             
             logger.info(f"Activated premium subscription for user {telegram_id}")
             return True
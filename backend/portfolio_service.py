@@ -0,0 +1,187 @@
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_LIMIT = 30
+
+
+def value_positions(owners, amounts, prices, changes_24h, n_owners):
+    """Vectorized valuation of flattened positions.
+
+    ``owners`` maps each position to its portfolio index. Returns the
+    per-position values and per-portfolio totals, previous-day totals
+    and 24h change percentages.
+    """
+    owners = np.asarray(owners, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    changes_24h = np.asarray(changes_24h, dtype=np.float64)
+
+    values = amounts * prices
+    previous = values / (1 + changes_24h / 100)
+
+    totals = np.bincount(owners, weights=values, minlength=n_owners)
+    previous_totals = np.bincount(owners, weights=previous, minlength=n_owners)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(previous_totals > 0, (totals / previous_totals - 1) * 100, 0.0)
+
+    return values, totals, previous_totals, change_pct
+
+
+class PortfolioService:
+    """Service for user watchlists and portfolio valuation"""
+
+    def __init__(self, db, crypto_service):
+        self.db = db
+        self.crypto_service = crypto_service
+
+    async def ensure_indexes(self):
+        await self.db.watchlists.create_index("telegram_id", unique=True)
+        await self.db.portfolios.create_index("telegram_id", unique=True)
+
+    # Watchlists
+
+    async def get_watchlist(self, telegram_id):
+        doc = await self.db.watchlists.find_one({"telegram_id": telegram_id}, {"_id": 0})
+        return doc.get('coins', []) if doc else []
+
+    async def add_to_watchlist(self, telegram_id, coin):
+        """Add a coin with one conditional update, so concurrent /watch calls
+        cannot add duplicates or go over WATCHLIST_LIMIT"""
+        query = {
+            "telegram_id": telegram_id,
+            "coins.id": {"$ne": coin.id},
+            f"coins.{WATCHLIST_LIMIT - 1}": {"$exists": False},
+        }
+        update = {
+            "$push": {"coins": {"id": coin.id, "symbol": coin.symbol}},
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+        }
+        try:
+            result = await self.db.watchlists.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # The watchlist exists but failed the filter, or a concurrent first /watch just created it
+            result = await self.db.watchlists.update_one(query, update)
+        if result.modified_count or result.upserted_id is not None:
+            return True
+
+        coins = await self.get_watchlist(telegram_id)
+        if any(c['id'] == coin.id for c in coins):
+            return False
+        raise ValueError(f"Watchlist is limited to {WATCHLIST_LIMIT} coins")
+
+    async def remove_from_watchlist(self, telegram_id, symbol):
+        result = await self.db.watchlists.update_one(
+            {"telegram_id": telegram_id},
+            {"$pull": {"coins": {"symbol": symbol.upper()}}}
+        )
+        return result.modified_count > 0
+
+    async def get_watchlist_text(self, telegram_id):
+        coins = await self.get_watchlist(telegram_id)
+        if not coins:
+            return "👀 Your watchlist is empty. Add coins with /watch add BTC ETH"
+
+        prices = await self.crypto_service.get_prices([c['id'] for c in coins])
+
+        result = "👀 **Your Watchlist**\n\n"
+        for coin in coins:
+            quote = prices.get(coin['id'])
+            if not quote or quote['price'] is None:
+                result += f"• **{coin['symbol']}** - price unavailable\n"
+                continue
+            change_icon = "🟢" if quote['change_24h'] > 0 else "🔴"
+            result += f"• **{coin['symbol']}** ${quote['price']:,.8g} | {change_icon} {quote['change_24h']:+.2f}%\n"
+        return result
+
+    # Portfolios
+
+    async def get_holdings(self, telegram_id):
+        doc = await self.db.portfolios.find_one({"telegram_id": telegram_id}, {"_id": 0})
+        return doc.get('holdings', {}) if doc else {}
+
+    async def set_holding(self, telegram_id, coin, amount):
+        if amount < 0:
+            raise ValueError("Amount must not be negative")
+
+        await self.db.portfolios.update_one(
+            {"telegram_id": telegram_id},
+            {"$set": {
+                f"holdings.{coin.id}": {"symbol": coin.symbol, "amount": amount},
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }},
+            upsert=True
+        )
+
+    async def remove_holding(self, telegram_id, symbol):
+        holdings = await self.get_holdings(telegram_id)
+        coin_id = next((cid for cid, h in holdings.items() if h['symbol'] == symbol.upper()), None)
+        if coin_id is None:
+            return False
+
+        await self.db.portfolios.update_one(
+            {"telegram_id": telegram_id},
+            {"$unset": {f"holdings.{coin_id}": ""}}
+        )
+        return True
+
+    async def value_portfolios(self, telegram_ids):
+        """Value many users' portfolios with one batched price lookup.
+
+        Returns {telegram_id: {'total', 'change_24h', 'positions'}} where
+        positions are (symbol, amount, price, value) sorted by value.
+        """
+        docs = await self.db.portfolios.find(
+            {"telegram_id": {"$in": list(telegram_ids)}}, {"_id": 0}
+        ).to_list(None)
+
+        owners, coin_ids, symbols, amounts = [], [], [], []
+        for index, doc in enumerate(docs):
+            for coin_id, holding in doc.get('holdings', {}).items():
+                owners.append(index)
+                coin_ids.append(coin_id)
+                symbols.append(holding['symbol'])
+                amounts.append(holding['amount'])
+
+        prices = await self.crypto_service.get_prices(sorted(set(coin_ids))) if coin_ids else {}
+        unit_prices = [prices.get(cid, {}).get('price') or 0.0 for cid in coin_ids]
+        changes = [prices.get(cid, {}).get('change_24h') or 0.0 for cid in coin_ids]
+
+        values, totals, _, change_pct = value_positions(owners, amounts, unit_prices, changes, len(docs))
+
+        result = {}
+        for index, doc in enumerate(docs):
+            result[doc['telegram_id']] = {
+                'total': float(totals[index]),
+                'change_24h': float(change_pct[index]),
+                'positions': [],
+            }
+        for i, owner in enumerate(owners):
+            result[docs[owner]['telegram_id']]['positions'].append(
+                (symbols[i], amounts[i], unit_prices[i], float(values[i]))
+            )
+        for valuation in result.values():
+            valuation['positions'].sort(key=lambda position: position[3], reverse=True)
+        return result
+
+    async def get_portfolio_text(self, telegram_id):
+        valuation = (await self.value_portfolios([telegram_id])).get(telegram_id)
+        if not valuation or not valuation['positions']:
+            return "💼 Your portfolio is empty. Add holdings with /portfolio add BTC 0.5"
+
+        total = valuation['total']
+        change_icon = "🟢" if valuation['change_24h'] > 0 else "🔴"
+        result = f"""💼 **Your Portfolio**
+
+💰 Total Value: ${total:,.2f}
+{change_icon} 24h Change: {valuation['change_24h']:+.2f}%
+
+"""
+        for symbol, amount, price, value in valuation['positions']:
+            share = value / total * 100 if total else 0
+            result += f"• **{symbol}** {amount:,.8g} × ${price:,.8g} = ${value:,.2f} ({share:.1f}%)\n"
+        return result
@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Trace row of the handler the current task runs in; 0 is the event loop row
+_track = ContextVar('profile_track', default=0)
+LOOP_TRACK = 0
+BACKEND_DIR = str(Path(__file__).parent)
+MAX_STACK_DEPTH = 40
+IDLE = "idle (waiting for I/O)"
+
+
+class Span:
+    __slots__ = ('name', 'cat', 'track', 'start', 'args', 'samples')
+
+    def __init__(self, name, cat, track, args=None):
+        self.name = name
+        self.cat = cat
+        self.track = track
+        self.start = time.perf_counter()
+        self.args = args or {}
+        self.samples = None
+
+
+def _frame_label(frame):
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+
+class Profiler:
+    """Opt-in tracing of handlers, upstream calls and event-loop stalls.
+
+    Off unless ``PROFILING_ENABLED`` is set, in which case every handler
+    gets a span on its own trace row, upstream HTTP and LLM calls made
+    inside it nest under it, and a monitor task records event-loop lag as
+    a counter plus a span for each stall. While any handler has run longer
+    than ``PROFILE_SLOW_HANDLER_MS`` a sampler thread records the loop
+    thread's stack every ``PROFILE_SAMPLE_INTERVAL_MS``; the hottest
+    backend frames are attached to the slow span and logged. Events are
+    kept in a bounded buffer and written as Chrome Trace Event JSON
+    (open in https://ui.perfetto.dev or chrome://tracing).
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = config.PROFILING_ENABLED if enabled is None else enabled
+        self.slow_handler = config.PROFILE_SLOW_HANDLER_MS / 1000
+        self.sample_interval = config.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        self.lag_interval = config.PROFILE_LAG_INTERVAL_MS / 1000
+        self.lag_threshold = config.PROFILE_LAG_THRESHOLD_MS / 1000
+        self.events = deque(maxlen=config.PROFILE_MAX_EVENTS)
+        # Process and row names, kept apart so the bounded buffer never drops them
+        self.metadata = []
+        self.path = None
+        self._epoch = time.perf_counter()
+        self._pid = os.getpid()
+        self._tracks = itertools.count(LOOP_TRACK + 1)
+        self._free_tracks = []
+        self._active = {}
+        # Guards _active and events against the sampler thread
+        self._lock = threading.Lock()
+        self._loop_thread = None
+        self._stopping = threading.Event()
+        self._sampler = None
+        self._tasks = []
+
+    def _ts(self, moment):
+        return round((moment - self._epoch) * 1e6, 1)
+
+    def _emit(self, event):
+        event['pid'] = self._pid
+        with self._lock:
+            self.events.append(event)
+
+    def _name_track(self, track, name):
+        self.metadata.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": track,
+                              "args": {"name": name}})
+
+    def start(self, process):
+        """Begin tracing in the running event loop; a no-op unless profiling is enabled"""
+        if not self.enabled or self._tasks:
+            return
+        self.path = Path(config.PROFILE_DIR) / f"{process}-{self._pid}.trace.json"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.metadata.append({"name": "process_name", "ph": "M", "pid": self._pid, "tid": LOOP_TRACK,
+                              "args": {"name": process}})
+        self._name_track(LOOP_TRACK, "event loop")
+        self._loop_thread = threading.get_ident()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._monitor_lag()), loop.create_task(self._flush_periodically())]
+        self._stopping.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        logger.info(f"Profiling enabled, writing traces to {self.path}")
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self._sampler.join, 1.0)
+        await self.write()
+        logger.info(f"Trace written to {self.path}")
+
+    def begin(self, name, cat, **args):
+        """Open a span on the current handler's row; returns None when profiling is off"""
+        if not self.enabled:
+            return None
+        return Span(name, cat, _track.get(), args)
+
+    def end(self, span, **args):
+        if span is None:
+            return
+        now = time.perf_counter()
+        span.args.update(args)
+        self._emit({
+            "name": span.name, "cat": span.cat, "ph": "X", "tid": span.track,
+            "ts": self._ts(span.start), "dur": round((now - span.start) * 1e6, 1), "args": span.args,
+        })
+
+    @contextmanager
+    def span(self, name, cat='compute', **args):
+        """Time a block of code on the current handler's row"""
+        span = self.begin(name, cat, **args)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    @contextmanager
+    def handler_span(self, name):
+        """Span for one handler call, on a row of its own while it runs"""
+        if not self.enabled:
+            yield None
+            return
+        if self._free_tracks:
+            track = heapq.heappop(self._free_tracks)
+        else:
+            track = next(self._tracks)
+            self._name_track(track, f"handlers {track}")
+        token = _track.set(track)
+        span = Span(name, 'handler', track)
+        with self._lock:
+            self._active[track] = span
+        try:
+            yield span
+        finally:
+            with self._lock:
+                del self._active[track]
+            _track.reset(token)
+            heapq.heappush(self._free_tracks, track)
+            if span.samples:
+                span.args['hot_frames'] = [f"{frame} x{count}" for frame, count in span.samples.most_common(5)]
+                elapsed = time.perf_counter() - span.start
+                logger.warning(f"Slow handler {name}: {elapsed * 1000:.0f}ms, hottest frame "
+                               f"{span.samples.most_common(1)[0][0]}")
+            self.end(span)
+
+    async def _monitor_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            now = time.perf_counter()
+            lag = max(now - start - self.lag_interval, 0.0)
+            self._emit({"name": "loop lag", "ph": "C", "tid": LOOP_TRACK, "ts": self._ts(now),
+                        "args": {"ms": round(lag * 1000, 2)}})
+            if lag >= self.lag_threshold:
+                self._emit({"name": "loop stall", "cat": "loop", "ph": "X", "tid": LOOP_TRACK,
+                            "ts": self._ts(now - lag), "dur": round(lag * 1e6, 1)})
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(config.PROFILE_FLUSH_SECONDS)
+            await self.write()
+
+    def _sample(self):
+        """Sampler thread: record the loop thread's stack while a handler is running slow"""
+        while not self._stopping.wait(self.sample_interval):
+            now = time.perf_counter()
+            with self._lock:
+                slow = [span for span in self._active.values() if now - span.start >= self.slow_handler]
+            if not slow:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-MAX_STACK_DEPTH:]
+            innermost = stack[-1]
+            if innermost.name in ('select', 'poll') and innermost.filename.endswith('selectors.py'):
+                hot = IDLE
+            else:
+                # Blame the innermost frame in our own code, not the library it called into
+                own = [entry for entry in stack if entry.filename.startswith(BACKEND_DIR)]
+                hot = _frame_label(own[-1] if own else innermost)
+            for span in slow:
+                if span.samples is None:
+                    span.samples = Counter()
+                span.samples[hot] += 1
+            self._emit({"name": hot, "cat": "sample", "ph": "i", "s": "t", "tid": LOOP_TRACK,
+                        "ts": self._ts(now), "args": {"stack": [_frame_label(entry) for entry in stack]}})
+
+    async def write(self):
+        """Write the buffered events to the trace file, replacing the previous copy"""
+        from fastjson import dumps  # fastjson imports metrics, which imports this module
+
+        if self.path is None:
+            return
+        with self._lock:
+            events = self.metadata + list(self.events)
+        data = dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        await asyncio.to_thread(self._write_file, data)
+
+    def _write_file(self, data):
+        partial = self.path.with_suffix('.tmp')
+        partial.write_bytes(data)
+        os.replace(partial, self.path)
+
+
+profiler = Profiler()
@@ -0,0 +1,161 @@
+import logging
+import re
+
+from config import config
+from metrics import LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - falls back to the estimate below
+    tiktoken = None
+
+# Identical leading text for every feature, keeping the feature prompts
+# consistent. It is far below the 1024 tokens OpenAI's automatic prompt
+# caching needs, and budgets cap whole prompts below that, so the savings
+# come from the budgets and compact tables, not from caching.
+SHARED_PREFIX = """You are an expert cryptocurrency analyst and assistant for a Telegram bot.
+You know blockchain technology, market dynamics and technical analysis.
+Numbers you are given are authoritative and current; never invent prices or levels.
+Replies are shown in Telegram Markdown: short paragraphs, bullet lists, no tables.
+"""
+
+FEATURE_INSTRUCTIONS = {
+    'analysis': "Task: data-driven asset analysis from the tables provided. Under 400 words, actionable.",
+    'analysis_brief': ("Task: brief asset analysis from the tables provided: trend, key levels, main risk. "
+                       "3 bullet points, under 100 words."),
+    'chat': "Task: conversational help on crypto markets, concepts and strategies. Under 300 words.",
+    'summary': ("Task: summarize today's crypto market for a daily digest from the headlines and movers "
+                "provided. 3-5 bullet points, under 120 words, no advice."),
+    'translation': ("Task: translate the JSON array of strings you are given. Reply with only a JSON array "
+                    "of the translations, same length and order. Keep tickers, numbers, URLs and Markdown as is."),
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+        return None
+
+
+class PromptBuilder:
+    """Builds token-budgeted prompts and records token usage per feature"""
+
+    def __init__(self, budgets=None):
+        self.budgets = budgets or {
+            'analysis': config.PROMPT_BUDGET_ANALYSIS,
+            'analysis_brief': config.PROMPT_BUDGET_ANALYSIS,
+            'chat': config.PROMPT_BUDGET_CHAT,
+            'translation': config.PROMPT_BUDGET_TRANSLATION,
+            'summary': config.PROMPT_BUDGET_SUMMARY,
+        }
+        self._encoding = _encoding()
+        self.usage = {}
+
+    def count_tokens(self, text):
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # Roughly one token per word or punctuation mark, long words split further
+        return sum(1 + len(token) // 8 for token in _TOKEN_PATTERN.findall(text))
+
+    def truncate(self, text, max_tokens):
+        """Cut text to at most max_tokens, marking the cut"""
+        if max_tokens <= 0:
+            return ""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)
+            return self._encoding.decode(tokens[:max_tokens - 1]) + "…"
+        # Binary search on characters for the estimate-based counter
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.count_tokens(text[:mid]) < max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        return text[:lo] + "…"
+
+    def system_message(self, feature):
+        return SHARED_PREFIX + FEATURE_INSTRUCTIONS[feature]
+
+    def build(self, feature, sections):
+        """Join prompt sections within the feature's token budget.
+
+        ``sections`` are (text, required) pairs in priority order. Optional
+        sections that do not fit are dropped; a required section that
+        overflows is truncated.
+        """
+        budget = self.budgets[feature] - self.count_tokens(self.system_message(feature))
+        parts = []
+        used = 0
+        for text, required in sections:
+            if not text:
+                continue
+            tokens = self.count_tokens(text)
+            if used + tokens <= budget:
+                parts.append(text)
+                used += tokens
+            elif required:
+                parts.append(self.truncate(text, budget - used))
+                used = budget
+            else:
+                logger.debug(f"Dropped optional {feature} prompt section ({tokens} tokens)")
+        return "\n\n".join(parts)
+
+    def record(self, feature, prompt, response):
+        """Record prompt/completion token counts for one LLM request"""
+        prompt_tokens = self.count_tokens(self.system_message(feature)) + self.count_tokens(prompt)
+        completion_tokens = self.count_tokens(response or "")
+        stats = self.usage.setdefault(feature, {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+        stats['requests'] += 1
+        stats['prompt_tokens'] += prompt_tokens
+        stats['completion_tokens'] += completion_tokens
+        LLM_TOKENS.labels(feature, 'prompt').inc(prompt_tokens)
+        LLM_TOKENS.labels(feature, 'completion').inc(completion_tokens)
+        logger.info(f"LLM {feature} request: {prompt_tokens} prompt tokens, {completion_tokens} completion tokens")
+        return prompt_tokens, completion_tokens
+
+
+def fmt_number(value):
+    """Compact number: 6 significant digits with K/M/B/T suffixes"""
+    if value is None:
+        return "-"
+    magnitude = abs(value)
+    for threshold, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if magnitude >= threshold:
+            return f"{value / threshold:.6g}{suffix}"
+    return f"{value:.6g}"
+
+
+def compact_table(headers, rows):
+    """Pipe-separated table with compact numbers, cheaper than prose"""
+    lines = ["|".join(headers)]
+    for row in rows:
+        lines.append("|".join(cell if isinstance(cell, str) else fmt_number(cell) for cell in row))
+    return "\n".join(lines)
+
+
+def technicals_table(ta):
+    """Compact table of a technical_summary() dict"""
+    if not ta:
+        return ""
+    rows = [
+        ("sma20", ta['sma_20']), ("sma50", ta['sma_50']), ("ema20", ta['ema_20']),
+        ("rsi14", ta['rsi_14']), ("macd", ta['macd']), ("macd_sig", ta['macd_signal']),
+        ("bb_low", ta['bb_lower']), ("bb_up", ta['bb_upper']),
+    ]
+    for key in ('atr_14d', 'pivot', 'pivot_r1', 'pivot_s1'):
+        if ta.get(key) is not None:
+            rows.append((key, ta[key]))
+    rows.append(("support", " ".join(fmt_number(v) for v in ta['supports']) or "-"))
+    rows.append(("resistance", " ".join(fmt_number(v) for v in ta['resistances']) or "-"))
+    return "Technicals (1h bars, 30d)\n" + compact_table(("ind", "value"), rows)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import BUDGET_REMAINING, BUDGET_WAITS
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE, BACKGROUND = 'interactive', 'background'
+
+# Priority of upstream calls made by the current task; background jobs lower it
+request_priority = ContextVar('request_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Mark upstream calls made inside the block as low priority"""
+    token = request_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class RequestBudget:
+    """Sliding-window request budget for one upstream API key.
+
+    Interactive calls may use the whole ``limit`` per ``window``; background
+    calls only get the share above ``reserve`` and queue behind it, so
+    user-facing requests keep headroom. A 429 pauses the budget for the
+    upstream's Retry-After.
+    """
+
+    def __init__(self, name, limit, window=60.0, reserve=0.3):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.reserved = int(limit * reserve)
+        self._sent = deque()
+        self._paused_until = 0.0
+        BUDGET_REMAINING.labels(name).set_function(self.remaining)
+
+    def _prune(self, now):
+        while self._sent and now - self._sent[0] >= self.window:
+            self._sent.popleft()
+
+    def remaining(self):
+        self._prune(time.monotonic())
+        return self.limit - len(self._sent)
+
+    def _wait_time(self, priority, now):
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._prune(now)
+        allowed = self.limit if priority == INTERACTIVE else max(1, self.limit - self.reserved)
+        if len(self._sent) < allowed:
+            return 0.0
+        # Wait until enough of the oldest requests leave the window
+        return self._sent[len(self._sent) - allowed] + self.window - now
+
+    async def acquire(self, priority=None):
+        """Wait for a request slot; priority defaults to the task's request_priority"""
+        priority = priority or request_priority.get()
+        waited = False
+        while True:
+            now = time.monotonic()
+            delay = self._wait_time(priority, now)
+            if delay <= 0:
+                self._sent.append(now)
+                return
+            if not waited:
+                waited = True
+                BUDGET_WAITS.labels(self.name, priority).inc()
+                logger.info(f"{self.name} budget exhausted, queueing {priority} request for {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Stop issuing requests for ``seconds`` after the upstream rate-limited us"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"{self.name} rate limited, pausing requests for {seconds:.0f}s")
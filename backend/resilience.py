@@ -0,0 +1,215 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import config
+from i18n import SOURCE_LANGUAGE, t
+from metrics import CIRCUIT_STATE, STALE_RESPONSES, cache_hit, cache_miss
+from request_budget import background_priority
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+# Set while the overload controller has degraded a feature to cached responses
+_cache_only = ContextVar('cache_only', default=False)
+
+
+@contextmanager
+def cache_only(enabled=True):
+    """Serve upstream responses inside the block from cache only, never calling the upstream"""
+    token = _cache_only.set(enabled)
+    try:
+        yield
+    finally:
+        _cache_only.reset(token)
+
+
+class CircuitOpenError(Exception):
+    """Raised when an upstream circuit is open and no cached response can be served"""
+
+
+class CacheOnlyMiss(Exception):
+    """Raised in cache-only mode when nothing usable is cached"""
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker with exponential cooldown.
+
+    After ``failure_threshold`` consecutive failures the circuit opens for
+    ``base_cooldown`` seconds, doubling on every re-open up to
+    ``max_cooldown``. Once the cooldown elapses a single probe request is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=3, base_cooldown=5.0, max_cooldown=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.open_count = 0
+        self.open_until = 0.0
+        self._probing = False
+        self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+    def allow(self):
+        """Whether a request may be sent to the upstream now"""
+        if self.state == CLOSED:
+            return True
+        if self._probing or time.monotonic() < self.open_until:
+            return False
+        self._probing = True
+        self._set_state(HALF_OPEN)
+        return True
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed"""
+        return max(0.0, self.open_until - time.monotonic())
+
+    def release_probe(self):
+        """Forget an in-flight probe whose request was cancelled"""
+        if self._probing:
+            self._probing = False
+            self._set_state(OPEN)
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.failures = 0
+        self.open_count = 0
+        self._probing = False
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            cooldown = min(self.base_cooldown * 2 ** self.open_count, self.max_cooldown)
+            self.open_count += 1
+            self.open_until = time.monotonic() + cooldown
+            self._set_state(OPEN)
+            logger.warning(f"Circuit for {self.name} open for {cooldown:.0f}s after {self.failures} failures")
+
+
+class StaleWhileRevalidateCache:
+    """Response cache that falls back to the last good response when an upstream fails.
+
+    Fresh entries (younger than ``ttl``) are served directly. Otherwise the
+    upstream is called through the circuit breaker; if the call fails or the
+    circuit is open, the last good response up to ``max_stale`` seconds old
+    is served instead and a background refresh is scheduled for when the
+    circuit lets a probe through. Inside ``cache_only()`` any entry up to
+    ``max_stale`` old is served as is and a miss raises ``CacheOnlyMiss``.
+    """
+
+    def __init__(self, breaker, max_stale=3600, max_entries=2048):
+        self.breaker = breaker
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = {}
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key, fetch, ttl):
+        """Return (value, age_seconds); age is 0 unless a stale response was served"""
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[1] if entry else None
+        if entry and age < ttl:
+            cache_hit(self.breaker.name)
+            return entry[0], 0.0
+        cache_miss(self.breaker.name)
+        stale = entry if entry and age < self.max_stale else None
+
+        if _cache_only.get():
+            if stale:
+                return stale[0], age
+            raise CacheOnlyMiss(f"No cached {self.breaker.name} response")
+
+        if not self.breaker.allow():
+            if stale:
+                self._schedule_refresh(key, fetch)
+                STALE_RESPONSES.labels(self.breaker.name).inc()
+                return stale[0], age
+            raise CircuitOpenError(f"{self.breaker.name} unavailable, retrying in {self.breaker.retry_in():.0f}s")
+
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            if not stale:
+                raise
+            logger.warning(f"{self.breaker.name} request failed, serving {age:.0f}s old response: {e}")
+            STALE_RESPONSES.labels(self.breaker.name).inc()
+            return stale[0], age
+
+        self.breaker.record_success()
+        self._store(key, value)
+        return value, 0.0
+
+    def _schedule_refresh(self, key, fetch):
+        if key not in self._refreshing:
+            self._refreshing[key] = asyncio.get_running_loop().create_task(self._refresh(key, fetch))
+
+    async def _refresh(self, key, fetch):
+        try:
+            await asyncio.sleep(self.breaker.retry_in())
+            if not self.breaker.allow():
+                return
+            try:
+                with background_priority():
+                    value = await fetch()
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                logger.warning(f"Background refresh of {self.breaker.name} failed: {e}")
+                return
+            self.breaker.record_success()
+            self._store(key, value)
+        finally:
+            self._refreshing.pop(key, None)
+
+
+def upstream_cache(name):
+    """Circuit breaker and stale-while-revalidate cache for one upstream, tuned from config"""
+    breaker = CircuitBreaker(
+        name,
+        failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+        base_cooldown=config.CIRCUIT_BASE_COOLDOWN,
+        max_cooldown=config.CIRCUIT_MAX_COOLDOWN
+    )
+    return StaleWhileRevalidateCache(breaker, max_stale=config.STALE_MAX_AGE)
+
+
+def upstream_timeout():
+    """Client timeout for upstream sessions, so a hanging source fails fast into the breaker"""
+    return aiohttp.ClientTimeout(total=config.UPSTREAM_TIMEOUT, connect=config.UPSTREAM_CONNECT_TIMEOUT)
+
+
+def stale_notice(source, age, language=SOURCE_LANGUAGE):
+    """Markdown note telling the user the data is a cached copy"""
+    if not age:
+        return ""
+    minutes = int(age // 60)
+    when = t(language, 'stale.minutes_ago', minutes=minutes) if minutes else t(language, 'stale.moments_ago')
+    return "\n" + t(language, 'stale.notice', source=source, when=when) + "\n"
@@ -1,4 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+import time
+STARTED_AT = time.monotonic()  # before the imports below, which dominate startup
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -8,7 +12,18 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+import asyncio
+from datetime import datetime, timezone, timedelta
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from analytics import GRANULARITIES, summarize_buckets
+from collection_versions import CollectionVersions
+from dashboard_feed import DashboardFeed
+from fastjson import dumps
+from http_cache import FastJSONResponse, json_response, not_modified, not_modified_response, weak_etag
+from metrics import API_LATENCY, STARTUP_SECONDS, MongoCommandMetrics
+from profiling import profiler
+from models import SUBSCRIPTION_FIELDS, Subscription
 
 
 ROOT_DIR = Path(__file__).parent
@@ -16,11 +31,19 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
+dashboard_feed = DashboardFeed(db)
+collection_versions = CollectionVersions(db)
+
+# Readiness probe budget for the Mongo ping
+READY_TIMEOUT_SECONDS = 2
+
+# Comment line sent on idle live streams so proxies keep the connection open
+LIVE_KEEPALIVE_SECONDS = 15
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -37,6 +60,14 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+# Default look-back per rollup granularity for the analytics endpoints
+ANALYTICS_WINDOWS = {
+    'minute': timedelta(hours=1),
+    'hour': timedelta(days=1),
+    'day': timedelta(days=30),
+}
+ANALYTICS_MAX_BUCKETS = 1500
+
 class BotStats(BaseModel):
     total_users: int
     premium_users: int
@@ -54,6 +85,29 @@ async def root():
 async def healthz():
     return {"ok": True}
 
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once MongoDB answers, 503 otherwise"""
+    try:
+        await asyncio.wait_for(db.command("ping"), READY_TIMEOUT_SECONDS)
+    except Exception as e:
+        logging.warning(f"Readiness check failed: {e}")
+        return Response(status_code=503, content=dumps({"ready": False}), media_type="application/json")
+    return {"ready": True}
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    with profiler.handler_span(f"{request.method} {request.url.path}"):
+        response = await call_next(request)
+    route = request.scope.get("route")
+    API_LATENCY.labels(request.method, route.path if route else "unmatched").observe(time.perf_counter() - start)
+    return response
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
@@ -78,64 +132,134 @@ async def get_status_checks():
     
     return status_checks
 
+async def cached_json(request, collections, load, *extra):
+    """Serve load() with a weak ETag from collection versions, or 304 when unchanged"""
+    etag = weak_etag(collections, await collection_versions.get(*collections), *extra)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return json_response(request, await load(), etag)
+
+def current_minute():
+    # For responses that also change with time (expiring subscriptions, sliding windows)
+    return int(time.time() // 60)
+
+async def load_bot_stats():
+    # Total users
+    total_users = await db.users.count_documents({})
+    
+    # Premium users
+    now = datetime.now(timezone.utc)
+    active_premium = 0
+    total_revenue = 0
+    
+    with profiler.span('scan subscriptions'):
+        async for doc in db.subscriptions.find({}, SUBSCRIPTION_FIELDS):
+            if Subscription.from_doc(doc).is_active(now):
+                active_premium += 1
+                # Each subscription is $5
+                total_revenue += 5
+    
+    free_users = total_users - active_premium
+    
+    # Recent users
+    recent_users = await db.users.find({}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
+    
+    return {
+        "total_users": total_users,
+        "premium_users": active_premium,
+        "free_users": free_users,
+        "total_revenue": total_revenue,
+        "recent_users": recent_users
+    }
+
 @api_router.get("/bot/stats")
-async def get_bot_stats():
+async def get_bot_stats(request: Request):
     """Get bot statistics"""
     try:
-        # Total users
-        total_users = await db.users.count_documents({})
-        
-        # Premium users
-        premium_subs = await db.subscriptions.find({}).to_list(1000)
-        active_premium = 0
-        total_revenue = 0
-        
-        for sub in premium_subs:
-            expires_at = sub.get('expires_at')
-            if expires_at:
-                if isinstance(expires_at, str):
-                    expires_at = datetime.fromisoformat(expires_at)
-                if expires_at > datetime.now(timezone.utc):
-                    active_premium += 1
-                    # Each subscription is $5
-                    total_revenue += 5
-        
-        free_users = total_users - active_premium
-        
-        # Recent users
-        recent_users = await db.users.find({}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
-        
-        return {
-            "total_users": total_users,
-            "premium_users": active_premium,
-            "free_users": free_users,
-            "total_revenue": total_revenue,
-            "recent_users": recent_users
-        }
+        return await cached_json(request, ("users", "subscriptions"), load_bot_stats, current_minute())
     except Exception as e:
         logging.error(f"Error fetching bot stats: {e}")
         raise HTTPException(status_code=500, detail="Error fetching statistics")
 
 @api_router.get("/bot/users")
-async def get_bot_users():
+async def get_bot_users(request: Request):
     """Get all bot users"""
     try:
-        users = await db.users.find({}, {"_id": 0}).to_list(1000)
-        return users
+        return await cached_json(request, ("users",), lambda: db.users.find({}, {"_id": 0}).to_list(1000))
     except Exception as e:
         logging.error(f"Error fetching users: {e}")
         raise HTTPException(status_code=500, detail="Error fetching users")
 
 @api_router.get("/bot/subscriptions")
-async def get_subscriptions():
+async def get_subscriptions(request: Request):
     """Get all subscriptions"""
     try:
-        subscriptions = await db.subscriptions.find({}, {"_id": 0}).to_list(1000)
-        return subscriptions
+        return await cached_json(request, ("subscriptions",), lambda: db.subscriptions.find({}, {"_id": 0}).to_list(1000))
     except Exception as e:
         logging.error(f"Error fetching subscriptions: {e}")
         raise HTTPException(status_code=500, detail="Error fetching subscriptions")
 
+@api_router.get("/bot/live")
+async def live_updates(request: Request):
+    """Server-Sent Events stream of dashboard deltas: stats, new users, subscription changes"""
+    queue = await dashboard_feed.subscribe()
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+        finally:
+            dashboard_feed.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def check_granularity(granularity):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+async def load_rollups(granularity, since):
+    since = since or datetime.now(timezone.utc) - ANALYTICS_WINDOWS[granularity]
+    return await db.analytics_rollups.find(
+        {"granularity": granularity, "start": {"$gte": since}}, {"_id": 0}
+    ).sort("start", 1).to_list(ANALYTICS_MAX_BUCKETS)
+
+@api_router.get("/bot/analytics")
+async def get_analytics(request: Request, granularity: str = 'hour', since: Optional[datetime] = None):
+    """Usage rollup buckets (one document per minute/hour/day)"""
+    check_granularity(granularity)
+    try:
+        return await cached_json(
+            request, ("analytics_rollups",), lambda: load_rollups(granularity, since), current_minute()
+        )
+    except Exception as e:
+        logging.error(f"Error fetching analytics: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching analytics")
+
+@api_router.get("/bot/analytics/commands")
+async def get_command_analytics(request: Request, granularity: str = 'day', since: Optional[datetime] = None):
+    """Per-command and per-tier usage totals over the rollup buckets"""
+    check_granularity(granularity)
+    
+    async def load():
+        return summarize_buckets(await load_rollups(granularity, since))
+    
+    try:
+        return await cached_json(request, ("analytics_rollups",), load, current_minute())
+    except Exception as e:
+        logging.error(f"Error fetching command analytics: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching analytics")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -154,6 +278,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def record_startup_time():
+    STARTUP_SECONDS.labels('api').set(time.monotonic() - STARTED_AT)
+    profiler.start('api')
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await dashboard_feed.close()
     client.close()
+    await profiler.stop()
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from config import config
+from i18n import SOURCE_LANGUAGE
+from metrics import cache_hit, cache_miss
+
+logger = logging.getLogger(__name__)
+
+# Translations kept in process; the Mongo collection holds the rest
+TRANSLATION_MEMORY_SIZE = 4096
+
+
+def translation_key(text, language):
+    """Content address of one text in one target language"""
+    return hashlib.sha256(f"{language}\n{text}".encode()).hexdigest()
+
+
+class TranslationCache:
+    """Content-addressed cache of machine translations for dynamic text.
+
+    Headlines and summaries are keyed by the hash of (language, text), so
+    each distinct text is translated once per language however many users
+    read it. Lookups go through an in-process LRU, then the ``translations``
+    collection; the remaining misses are sent to ``translator`` in batches
+    and stored. Concurrent callers asking for the same text share one
+    request. If translation fails the source text is returned and nothing
+    is cached, so the next call retries.
+    """
+
+    def __init__(self, db, translator, batch_size=None, timeout=None):
+        self.collection = db.translations
+        self.translator = translator
+        self.batch_size = batch_size or config.TRANSLATION_BATCH_SIZE
+        self.timeout = timeout or config.TRANSLATION_TIMEOUT
+        self._memory = OrderedDict()
+        self._pending = {}
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > TRANSLATION_MEMORY_SIZE:
+            self._memory.popitem(last=False)
+
+    async def translate(self, texts, language):
+        """Translations of texts into language, in order (source text where unavailable)"""
+        texts = list(texts)
+        if language == SOURCE_LANGUAGE or not texts:
+            return texts
+        keys = [translation_key(text, language) for text in texts]
+        sources = dict(zip(keys, texts))
+
+        missing = [key for key in sources if key not in self._memory]
+        cache_hit('translation', len(sources) - len(missing))
+        if missing:
+            await self._load(missing)
+            waiting = [self._pending[key] for key in missing if key in self._pending]
+            new = [key for key in missing if key not in self._memory and key not in self._pending]
+            if new:
+                cache_miss('translation', len(new))
+                await self._translate(new, sources, language)
+            if waiting:
+                await asyncio.gather(*waiting, return_exceptions=True)
+
+        return [self._memory.get(key, text) for key, text in zip(keys, texts)]
+
+    async def _load(self, keys):
+        try:
+            async for doc in self.collection.find({"_id": {"$in": keys}}, {"text": 1}):
+                self._remember(doc["_id"], doc["text"])
+        except Exception as e:
+            logger.warning(f"Could not read cached translations: {e}")
+
+    async def _translate(self, keys, sources, language):
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            self._pending[key] = loop.create_future()
+        try:
+            for start in range(0, len(keys), self.batch_size):
+                batch = keys[start:start + self.batch_size]
+                try:
+                    translated = await asyncio.wait_for(
+                        self.translator([sources[key] for key in batch], language), self.timeout
+                    )
+                except Exception as e:
+                    logger.warning(f"Translation of {len(batch)} texts to {language} failed: {e}")
+                    continue
+                for key, text in zip(batch, translated):
+                    self._remember(key, text)
+                await self._store(batch, sources, language)
+        finally:
+            for key in keys:
+                future = self._pending.pop(key)
+                if not future.done():
+                    future.set_result(None)
+
+    async def _store(self, keys, sources, language):
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                {"$setOnInsert": {
+                    "language": language,
+                    "source": sources[key],
+                    "text": self._memory[key],
+                    "created_at": now,
+                }},
+                upsert=True
+            )
+            for key in keys if key in self._memory
+        ]
+        if not operations:
+            return
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Could not store translations: {e}")
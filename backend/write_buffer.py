@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from metrics import WRITE_BUFFER_DEPTH, WRITE_BUFFER_OPS
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Write-behind buffer for non-critical Mongo writes.
+
+    Operations (pymongo ``UpdateOne``/``InsertOne``...) are grouped per
+    collection and sent as ``bulk_write`` calls once ``max_ops``
+    are pending or every ``flush_interval`` seconds. Operations added with
+    the same ``key`` replace each other, so repeated last-seen updates for
+    one user cost a single write per flush. Batches are unordered except
+    for the ``ordered`` collections, whose writes must apply in the order
+    they were added (chat turns). Buffered writes are lost if
+    the process dies before a flush; only use it for data that may lag.
+    Tracked collections get their ``versions`` counter bumped per flush,
+    unless every flushed operation was added with ``bump=False`` (writes
+    such as last-seen times that should not invalidate dashboard ETags).
+    """
+
+    def __init__(self, db, max_ops=500, flush_interval=2.0, versions=None, ordered=()):
+        self.db = db
+        self.versions = versions
+        self.ordered = frozenset(ordered)
+        self.max_ops = max_ops
+        self.flush_interval = flush_interval
+        self._ops = {}
+        self._bump = set()
+        self._pending = 0
+        self._worker = None
+        self._flushing = None
+        self._stopping = asyncio.Event()
+        WRITE_BUFFER_DEPTH.set_function(lambda: self._pending)
+
+    def start(self):
+        """Start the periodic flusher on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._stopping.clear()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered.
+
+        The worker is signalled rather than cancelled, so a flush in
+        progress finishes writing the batches it has already taken.
+        """
+        self._stopping.set()
+        if self._worker is not None:
+            await self._worker
+            self._worker = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        await self.flush()
+
+    def add(self, collection, operation, key=None, bump=True):
+        """Queue a write; a keyed operation supersedes the pending one with the same key"""
+        ops = self._ops.setdefault(collection, {})
+        if bump:
+            self._bump.add(collection)
+        if key is None:
+            key = object()
+        if key not in ops:
+            self._pending += 1
+        ops[key] = operation
+        if self._pending >= self.max_ops and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Send all buffered operations, one bulk_write per collection"""
+        batches, self._ops, self._pending = self._ops, {}, 0
+        bump, self._bump = self._bump, set()
+        for collection, ops in batches.items():
+            if not ops:
+                continue
+            try:
+                await self.db[collection].bulk_write(list(ops.values()), ordered=collection in self.ordered)
+                WRITE_BUFFER_OPS.labels(collection, 'written').inc(len(ops))
+                if self.versions is not None and collection in bump:
+                    await self.versions.bump(collection)
+            except Exception as e:
+                WRITE_BUFFER_OPS.labels(collection, 'failed').inc(len(ops))
+                logger.error(f"Error flushing {len(ops)} buffered writes to {collection}: {e}")
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import axios from "axios";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
@@ -9,28 +9,87 @@ import { Users, TrendingUp, DollarSign, Star } from "lucide-react";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Insert or replace a row by telegram_id
+const upsertRow = (rows, row) => {
+  const index = rows.findIndex((r) => r.telegram_id === row.telegram_id);
+  if (index === -1) return [...rows, row];
+  const next = rows.slice();
+  next[index] = { ...rows[index], ...row };
+  return next;
+};
+
 export default function Dashboard() {
   const [stats, setStats] = useState(null);
   const [users, setUsers] = useState([]);
   const [subscriptions, setSubscriptions] = useState([]);
+  const [usage, setUsage] = useState(null);
   const [loading, setLoading] = useState(true);
+  // Live events received while a snapshot is loading are replayed on top of it
+  const pending = useRef([]);
+  const snapshotLoaded = useRef(false);
 
   useEffect(() => {
+    const source = new EventSource(`${API}/bot/live`);
+    const handle = (event) => {
+      const data = JSON.parse(event.data);
+      if (snapshotLoaded.current) {
+        applyEvent(data);
+      } else {
+        pending.current.push(data);
+      }
+    };
+    ["stats", "user", "subscription"].forEach((type) => source.addEventListener(type, handle));
+    source.addEventListener("resync", () => fetchData(false));
+    // Events are missed while the browser reconnects, so reload the snapshot then
+    let opened = false;
+    source.addEventListener("open", () => {
+      if (opened) fetchData(false);
+      opened = true;
+    });
     fetchData();
+    return () => source.close();
   }, []);
 
-  const fetchData = async () => {
+  const applyEvent = (event) => {
+    if (event.type === "stats") {
+      setStats((prev) => ({ ...prev, ...event.stats }));
+    } else if (event.type === "user") {
+      setUsers((prev) => upsertRow(prev, event.user));
+      setStats((prev) => prev && {
+        ...prev,
+        recent_users: [
+          event.user,
+          ...(prev.recent_users || []).filter((u) => u.telegram_id !== event.user.telegram_id)
+        ].slice(0, 10)
+      });
+    } else if (event.type === "subscription") {
+      const sub = event.subscription;
+      setSubscriptions((prev) => upsertRow(prev, sub));
+      if (new Date(sub.expires_at) > new Date()) {
+        setUsers((prev) => prev.map((u) => (
+          u.telegram_id === sub.telegram_id ? { ...u, subscription_tier: "premium" } : u
+        )));
+      }
+    }
+  };
+
+  const fetchData = async (showSpinner = true) => {
     try {
-      setLoading(true);
-      const [statsRes, usersRes, subsRes] = await Promise.all([
+      snapshotLoaded.current = false;
+      if (showSpinner) setLoading(true);
+      const [statsRes, usersRes, subsRes, usageRes] = await Promise.all([
         axios.get(`${API}/bot/stats`),
         axios.get(`${API}/bot/users`),
-        axios.get(`${API}/bot/subscriptions`)
+        axios.get(`${API}/bot/subscriptions`),
+        axios.get(`${API}/bot/analytics/commands`, { params: { granularity: "day" } })
       ]);
       
       setStats(statsRes.data);
       setUsers(usersRes.data);
       setSubscriptions(subsRes.data);
+      setUsage(usageRes.data);
+      snapshotLoaded.current = true;
+      pending.current.splice(0).forEach(applyEvent);
     } catch (error) {
       console.error("Error fetching data:", error);
       toast.error("Failed to fetch dashboard data");
@@ -126,6 +185,9 @@ export default function Dashboard() {
             <TabsTrigger data-testid="subscriptions-tab" value="subscriptions" className="data-[state=active]:bg-blue-600 data-[state=active]:text-white">
               Subscriptions
             </TabsTrigger>
+            <TabsTrigger data-testid="usage-tab" value="usage" className="data-[state=active]:bg-blue-600 data-[state=active]:text-white">
+              Usage
+            </TabsTrigger>
             <TabsTrigger data-testid="setup-tab" value="setup" className="data-[state=active]:bg-blue-600 data-[state=active]:text-white">
               Bot Setup
             </TabsTrigger>
@@ -241,6 +303,50 @@ export default function Dashboard() {
             </Card>
           </TabsContent>
 
+          <TabsContent value="usage">
+            <Card className="bg-white border-slate-200 shadow-sm">
+              <CardHeader>
+                <CardTitle>Command Usage</CardTitle>
+                <CardDescription>
+                  Last 30 days: {usage?.total.count ?? 0} requests, {usage?.total.errors ?? 0} errors
+                  {usage && Object.entries(usage.tiers).map(([tier, count]) => ` · ${tier} ${count}`).join("")}
+                </CardDescription>
+              </CardHeader>
+              <CardContent>
+                <div className="overflow-x-auto">
+                  <table className="w-full">
+                    <thead>
+                      <tr className="border-b border-slate-200">
+                        <th className="text-left py-3 px-4 text-sm font-semibold text-slate-700">Command</th>
+                        <th className="text-left py-3 px-4 text-sm font-semibold text-slate-700">Requests</th>
+                        <th className="text-left py-3 px-4 text-sm font-semibold text-slate-700">Errors</th>
+                        <th className="text-left py-3 px-4 text-sm font-semibold text-slate-700">Avg Latency</th>
+                      </tr>
+                    </thead>
+                    <tbody>
+                      {!usage || usage.commands.length === 0 ? (
+                        <tr>
+                          <td colSpan="4" className="text-center py-8 text-slate-500">
+                            No usage recorded yet
+                          </td>
+                        </tr>
+                      ) : (
+                        usage.commands.map((row) => (
+                          <tr key={row.command} className="border-b border-slate-100 hover:bg-slate-50 transition-colors">
+                            <td className="py-3 px-4 text-sm text-slate-900 font-mono">{row.command}</td>
+                            <td className="py-3 px-4 text-sm text-slate-700">{row.count}</td>
+                            <td className="py-3 px-4 text-sm text-slate-700">{row.errors}</td>
+                            <td className="py-3 px-4 text-sm text-slate-600">{row.avg_latency_ms} ms</td>
+                          </tr>
+                        ))
+                      )}
+                    </tbody>
+                  </table>
+                </div>
+              </CardContent>
+            </Card>
+          </TabsContent>
+
           <TabsContent value="setup">
             <Card className="bg-white border-slate-200 shadow-sm">
               <CardHeader>
@@ -0,0 +1,89 @@
+"""
+Benchmark: price alert evaluation against market snapshot ticks.
+
+Compares the per-coin sorted alert books in ``alert_service.AlertEngine``
+with a naive scan over every active alert.
+
+    python tests/benchmarks/bench_alert_engine.py --alerts 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from alert_service import AlertEngine  # noqa: E402
+
+
+def make_alerts(n_alerts, prices, rng):
+    coin_ids = list(prices)
+    alerts = []
+    for i in range(n_alerts):
+        coin_id = rng.choice(coin_ids)
+        price = prices[coin_id]
+        kind = rng.choice(('above', 'below', 'move'))
+        alert = {'alert_id': f'{i:08x}', 'coin_id': coin_id, 'kind': kind, 'above': None, 'below': None}
+        if kind == 'above':
+            alert['above'] = price * rng.uniform(1.001, 1.5)
+        elif kind == 'below':
+            alert['below'] = price * rng.uniform(0.5, 0.999)
+        else:
+            pct = rng.uniform(0.5, 20) / 100
+            alert['above'] = price * (1 + pct)
+            alert['below'] = price * (1 - pct)
+        alerts.append(alert)
+    return alerts
+
+
+def naive_evaluate(alerts, prices):
+    fired = []
+    for alert in alerts:
+        price = prices[alert['coin_id']]
+        if (alert['above'] is not None and price >= alert['above']) or \
+                (alert['below'] is not None and price <= alert['below']):
+            fired.append(alert)
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--alerts', type=int, default=1_000_000)
+    parser.add_argument('--coins', type=int, default=250)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    prices = {f'coin-{i}': 10 ** rng.uniform(-4, 5) for i in range(args.coins)}
+    alerts = make_alerts(args.alerts, prices, rng)
+
+    engine = AlertEngine()
+    start = time.perf_counter()
+    engine.load(alerts)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_fired = naive_evaluate(alerts, prices)
+    naive_ms = (time.perf_counter() - start) * 1000
+
+    tick_ms = []
+    total_fired = 0
+    for _ in range(args.ticks):
+        prices = {coin_id: price * rng.uniform(0.99, 1.01) for coin_id, price in prices.items()}
+        start = time.perf_counter()
+        total_fired += len(engine.evaluate(prices))
+        tick_ms.append((time.perf_counter() - start) * 1000)
+
+    tick_ms.sort()
+    print(f"alerts={args.alerts:,} coins={args.coins} ticks={args.ticks}")
+    print(f"load:           {load_s:.2f}s")
+    print(f"naive scan:     {naive_ms:.1f} ms/tick ({len(naive_fired)} fired)")
+    print(f"engine p50:     {tick_ms[len(tick_ms) // 2]:.3f} ms/tick")
+    print(f"engine max:     {tick_ms[-1]:.3f} ms/tick")
+    print(f"fired total:    {total_fired:,} (remaining active {len(engine):,})")
+
+
+if __name__ == '__main__':
+    main()
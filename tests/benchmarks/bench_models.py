@@ -0,0 +1,132 @@
+"""
+Benchmark: slotted domain models vs raw Mongo dicts for a digest broadcast.
+
+Builds ``--users`` user documents (every tenth with a subscription) shaped
+like the stored ones, then compares per-object memory and the CPU time of
+one broadcast pass that picks each recipient and checks premium status:
+
+- dict: full documents, ``expires_at`` parsed from its ISO string on every check
+- model: projected documents turned into ``User``/``Subscription`` once
+
+    python tests/benchmarks/bench_models.py --users 100000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+from models import Subscription, User  # noqa: E402
+
+
+def make_docs(n_users):
+    now = datetime.now(timezone.utc)
+    users = [
+        {'_id': ObjectId(), 'telegram_id': 10 ** 8 + uid, 'username': f'user{uid}', 'first_name': 'Test',
+         'subscription_tier': 'premium' if uid % 10 == 0 else 'free',
+         'created_at': (now - timedelta(minutes=uid)).isoformat()}
+        for uid in range(n_users)
+    ]
+    subscriptions = [
+        {'_id': ObjectId(), 'telegram_id': 10 ** 8 + uid, 'tier': 'premium',
+         'created_at': now.isoformat(), 'updated_at': now.isoformat(),
+         'expires_at': (now + timedelta(days=uid % 60 - 30)).isoformat(),
+         'payment_info': {'currency': 'XTR', 'total_amount': 50, 'telegram_payment_charge_id': f'charge-{uid}'}}
+        for uid in range(0, n_users, 10)
+    ]
+    return users, subscriptions
+
+
+def measure(build):
+    """Return (result, traced bytes, build seconds); timed without tracemalloc"""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def broadcast_dicts(users, subscriptions):
+    now = datetime.now(timezone.utc)
+    recipients = []
+    for user in users:
+        sub = subscriptions.get(user['telegram_id'])
+        premium = False
+        if sub and sub.get('expires_at'):
+            expires_at = sub['expires_at']
+            if isinstance(expires_at, str):
+                expires_at = datetime.fromisoformat(expires_at)
+            premium = expires_at > now
+        recipients.append((user['telegram_id'], premium))
+    return recipients
+
+
+def broadcast_models(users, subscriptions):
+    now = datetime.now(timezone.utc)
+    recipients = []
+    for user in users:
+        sub = subscriptions.get(user.telegram_id)
+        recipients.append((user.telegram_id, sub is not None and sub.is_active(now)))
+    return recipients
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare slotted models with raw dicts')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    user_docs, sub_docs = make_docs(args.users)
+    # Wire format round trip so measured objects are freshly allocated
+    import bson
+    user_raw = [bson.encode(doc) for doc in user_docs]
+    sub_raw = [bson.encode(doc) for doc in sub_docs]
+    del user_docs, sub_docs
+
+    def build_dicts():
+        users = [bson.decode(raw) for raw in user_raw]
+        subs = {doc['telegram_id']: doc for doc in (bson.decode(raw) for raw in sub_raw)}
+        return users, subs
+
+    def build_models():
+        users = [User.from_doc(bson.decode(raw)) for raw in user_raw]
+        subs = {}
+        for raw in sub_raw:
+            sub = Subscription.from_doc(bson.decode(raw))
+            subs[sub.telegram_id] = sub
+        return users, subs
+
+    (dict_users, dict_subs), dict_bytes, dict_build = measure(build_dicts)
+    (model_users, model_subs), model_bytes, model_build = measure(build_models)
+    assert broadcast_dicts(dict_users, dict_subs) == broadcast_models(model_users, model_subs)
+
+    def best(fn, *fn_args):
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            fn(*fn_args)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    dict_pass = best(broadcast_dicts, dict_users, dict_subs)
+    model_pass = best(broadcast_models, model_users, model_subs)
+    n_objects = len(dict_users) + len(dict_subs)
+
+    print(f"{args.users:,} users, {len(dict_subs):,} subscriptions")
+    print(f"{'':<8}{'bytes/object':>14}{'total MB':>11}{'build ms':>11}{'broadcast ms':>15}")
+    print(f"{'dict':<8}{dict_bytes / n_objects:>14.0f}{dict_bytes / 1024 ** 2:>11.1f}"
+          f"{dict_build * 1000:>11.1f}{dict_pass * 1000:>15.1f}")
+    print(f"{'model':<8}{model_bytes / n_objects:>14.0f}{model_bytes / 1024 ** 2:>11.1f}"
+          f"{model_build * 1000:>11.1f}{model_pass * 1000:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: bytes transferred and decode time for AI analysis market data.
+
+Compares the full ``/coins/{id}`` document (community and developer data
+included) decoded with ``json`` into nested dicts against the lean
+``/coins/markets?ids=`` row decoded with orjson into ``models.CoinDetail``.
+The 30d chart that feeds the technicals is measured with both decoders.
+Responses come from the benchmark stub server (recorded fixtures when
+present).
+
+    python -m tests.benchmarks.bench_payloads --coins bitcoin ethereum --repeat 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+from .stubs import StubServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+
+import fastjson  # noqa: E402
+from models import CoinDetail  # noqa: E402
+
+
+def time_decode(body, decode, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(body)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+async def fetch(session, url, params):
+    async with session.get(url, params=params) as response:
+        response.raise_for_status()
+        return await response.read()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Compare full and lean CoinGecko payloads')
+    parser.add_argument('--coins', nargs='*', default=['bitcoin', 'ethereum'])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    stub = await StubServer(latency={'coingecko': 0}).start()
+    base = stub.environ()['COINGECKO_API_BASE']
+    try:
+        async with aiohttp.ClientSession() as session:
+            for coin_id in args.coins:
+                full = await fetch(session, f'{base}/coins/{coin_id}', {
+                    'localization': 'false', 'tickers': 'false', 'community_data': 'true',
+                    'developer_data': 'true', 'sparkline': 'false',
+                })
+                lean = await fetch(session, f'{base}/coins/markets', {
+                    'vs_currency': 'usd', 'ids': coin_id, 'sparkline': 'false',
+                    'price_change_percentage': '24h,7d,30d',
+                })
+                chart = await fetch(session, f'{base}/coins/{coin_id}/market_chart', {
+                    'vs_currency': 'usd', 'days': '30',
+                })
+
+                full_us = time_decode(full, json.loads, args.repeat)
+                lean_us = time_decode(
+                    lean, lambda body: CoinDetail.from_market_row(fastjson.loads(body)[0]), args.repeat
+                )
+                chart_json_us = time_decode(chart, json.loads, max(1, args.repeat // 20))
+                chart_orjson_us = time_decode(chart, fastjson.loads, max(1, args.repeat // 20))
+
+                print(f"{coin_id}")
+                print(f"  detail  full {len(full):>9,} B {full_us:>9.1f} us (json -> dict)")
+                print(f"          lean {len(lean):>9,} B {lean_us:>9.1f} us (orjson -> CoinDetail)"
+                      f"  x{len(full) / len(lean):.1f} smaller")
+                print(f"  chart30 {len(chart):>14,} B {chart_json_us:>9.1f} us json"
+                      f" | {chart_orjson_us:.1f} us orjson")
+    finally:
+        await stub.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Import-time profile of the bot and API processes.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+per round (cold imports, warm disk cache). It reports the wall time and the
+top-level packages by import time: the self time of every module in the
+entry point's import tree, summed per package, from the slowest round.
+The LLM SDK is imported on first use, so it isn't part of either tree.
+
+    python tests/benchmarks/bench_startup.py --module bot_service server --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+BACKEND = ROOT / 'backend'
+
+def environ():
+    env = dict(os.environ)
+    env.update({
+        'MONGO_URL': 'mongodb://127.0.0.1:1',
+        'DB_NAME': 'startup_bench',
+        'TELEGRAM_BOT_TOKEN': '123456:bench',
+        'METRICS_PORT': '0',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def import_once(module):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BACKEND, env=environ(), capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def summarize(stderr, module):
+    """Self import time in microseconds per top-level package, for module's own import tree"""
+    block = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        block.append((name.strip(), int(self_us)))
+        # -X importtime prints children before their parent; an unindented line closes a tree
+        if not name.startswith('  '):
+            if name.strip() == module:
+                break
+            block = []
+    packages = defaultdict(int)
+    for name, self_us in block:
+        packages[name.split('.')[0]] += self_us
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time profile of the backend entry points')
+    parser.add_argument('--module', nargs='*', default=['bot_service', 'server'])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    for module in args.module:
+        runs = [import_once(module) for _ in range(args.rounds)]
+        wall = [elapsed for elapsed, _ in runs]
+        packages = summarize(max(runs)[1], module)
+        total = sum(packages.values())
+        print(f"{module}: wall p50 {statistics.median(wall) * 1000:.0f} ms, "
+              f"min {min(wall) * 1000:.0f} ms over {args.rounds} runs; imports {total / 1000:.0f} ms")
+        for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<28} {micros / 1000:>8.1f} ms  {micros / total:>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Fake ``emergentintegrations.llm.chat`` module with configurable latency.
+
+``install()`` registers it in ``sys.modules`` so ai_service imports it in
+place of the real client; no network calls or API keys are involved.
+"""
+import asyncio
+import sys
+import types
+
+LATENCY = {'seconds': 1.5}
+CALLS = {'count': 0}
+
+ANSWER = """**Sentiment:** neutral to slightly bullish, price holding above the 50-period average.
+
+**Outlook:** consolidation between the listed support and resistance levels over the next week.
+
+**Risks:** macro headlines, funding-rate spikes and exchange outflows."""
+
+
+class UserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+class LlmChat:
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        CALLS['count'] += 1
+        await asyncio.sleep(LATENCY['seconds'])
+        return ANSWER
+
+
+def install(latency=None):
+    if latency is not None:
+        LATENCY['seconds'] = latency
+    package = types.ModuleType('emergentintegrations')
+    llm = types.ModuleType('emergentintegrations.llm')
+    chat = types.ModuleType('emergentintegrations.llm.chat')
+    chat.LlmChat = LlmChat
+    chat.UserMessage = UserMessage
+    package.llm = llm
+    llm.chat = chat
+    sys.modules.update({
+        'emergentintegrations': package,
+        'emergentintegrations.llm': llm,
+        'emergentintegrations.llm.chat': chat,
+    })
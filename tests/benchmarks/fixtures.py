@@ -0,0 +1,216 @@
+"""
+Upstream response fixtures for the benchmark stubs.
+
+Responses recorded from the real APIs can be dropped into ``fixtures/``
+as ``<name>.json`` (see ``record_fixtures.py``); anything missing is
+generated deterministically in the same shape.
+"""
+import functools
+import json
+import math
+import random
+import time
+from pathlib import Path
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures'
+N_COINS = 250
+
+_BASE_COINS = [
+    ('bitcoin', 'btc', 'Bitcoin', 67000.0),
+    ('ethereum', 'eth', 'Ethereum', 3500.0),
+    ('tether', 'usdt', 'Tether', 1.0),
+    ('binancecoin', 'bnb', 'BNB', 580.0),
+    ('solana', 'sol', 'Solana', 150.0),
+    ('ripple', 'xrp', 'XRP', 0.52),
+    ('cardano', 'ada', 'Cardano', 0.45),
+    ('dogecoin', 'doge', 'Dogecoin', 0.15),
+]
+
+
+def _recorded(name):
+    path = FIXTURE_DIR / f'{name}.json'
+    if path.exists():
+        return json.loads(path.read_text())
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def coins():
+    """Top coins as returned by /coins/markets"""
+    recorded = _recorded('coins_markets')
+    if recorded:
+        return recorded
+
+    rng = random.Random(7)
+    result = []
+    for rank in range(1, N_COINS + 1):
+        if rank <= len(_BASE_COINS):
+            coin_id, symbol, name, price = _BASE_COINS[rank - 1]
+        else:
+            coin_id, symbol, name = f'coin-{rank}', f'c{rank}', f'Coin {rank}'
+            price = 10 ** rng.uniform(-4, 2)
+        supply = 1e9 / math.sqrt(rank) / max(price, 1e-4) * 100
+        result.append({
+            'id': coin_id,
+            'symbol': symbol,
+            'name': name,
+            'current_price': price,
+            'market_cap': price * supply,
+            'market_cap_rank': rank,
+            'total_volume': price * supply * 0.05,
+            'price_change_percentage_24h': rng.uniform(-8, 8),
+            'price_change_percentage_7d_in_currency': rng.uniform(-20, 20),
+            'price_change_percentage_30d_in_currency': rng.uniform(-40, 40),
+            'circulating_supply': supply,
+            'max_supply': None,
+            'ath': price * 1.6,
+            'ath_change_percentage': (1 / 1.6 - 1) * 100,
+            'atl': price * 0.05,
+        })
+    return result
+
+
+def global_data():
+    recorded = _recorded('global')
+    if recorded:
+        return recorded
+    total = sum(c['market_cap'] for c in coins())
+    return {'data': {
+        'total_market_cap': {'usd': total},
+        'total_volume': {'usd': total * 0.04},
+        'market_cap_percentage': {'btc': coins()[0]['market_cap'] / total * 100},
+    }}
+
+
+def search(query):
+    query = query.lower()
+    matches = [c for c in coins() if c['symbol'] == query or c['id'] == query or c['name'].lower() == query]
+    return {'coins': [
+        {'id': c['id'], 'symbol': c['symbol'].upper(), 'name': c['name'], 'market_cap_rank': c['market_cap_rank']}
+        for c in matches
+    ]}
+
+
+def simple_price(ids):
+    by_id = {c['id']: c for c in coins()}
+    return {
+        coin_id: {
+            'usd': by_id[coin_id]['current_price'],
+            'usd_24h_change': by_id[coin_id]['price_change_percentage_24h'],
+            'usd_market_cap': by_id[coin_id]['market_cap'],
+            'usd_24h_vol': by_id[coin_id]['total_volume'],
+        }
+        for coin_id in ids if coin_id in by_id
+    }
+
+
+def coin_detail(coin_id):
+    recorded = _recorded(f'coin_{coin_id}')
+    if recorded:
+        return recorded
+    coin = next((c for c in coins() if c['id'] == coin_id), None)
+    if coin is None:
+        return None
+    price = coin['current_price']
+    return {
+        'id': coin['id'],
+        'symbol': coin['symbol'],
+        'name': coin['name'],
+        'description': {'en': f"{coin['name']} is a cryptocurrency. " * 40},
+        'market_data': {
+            'current_price': {'usd': price},
+            'market_cap': {'usd': coin['market_cap']},
+            'total_volume': {'usd': coin['total_volume']},
+            'price_change_percentage_24h': coin['price_change_percentage_24h'],
+            'price_change_percentage_7d': coin['price_change_percentage_7d_in_currency'],
+            'price_change_percentage_30d': coin['price_change_percentage_7d_in_currency'] * 2,
+            'ath': {'usd': coin['ath']},
+            'ath_change_percentage': {'usd': (price / coin['ath'] - 1) * 100},
+            'atl': {'usd': coin['atl']},
+            'circulating_supply': coin['circulating_supply'],
+            'max_supply': None,
+        },
+        # The real endpoint returns sizeable community/developer blobs
+        'community_data': {'twitter_followers': 1000000, 'reddit_subscribers': 500000},
+        'developer_data': {'forks': 30000, 'stars': 70000, 'commit_count_4_weeks': 300,
+                           'code_additions_deletions_4_weeks': {'additions': 1000, 'deletions': -800}},
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def market_chart(coin_id, days):
+    recorded = _recorded(f'market_chart_{coin_id}_{days}')
+    if recorded:
+        return recorded
+    coin = next((c for c in coins() if c['id'] == coin_id), None)
+    if coin is None:
+        return None
+    days = float(days)
+    step = 300 if days <= 1 else 3600 if days <= 90 else 86400
+    now = int(time.time())
+    n = int(days * 86400 // step)
+    rng = random.Random(coin_id)
+    price = coin['current_price']
+    prices = []
+    for i in range(n, -1, -1):
+        prices.append([(now - i * step) * 1000, price])
+        price *= math.exp(rng.gauss(0, 0.004))
+    scale = coin['current_price'] / prices[-1][1]
+    prices = [[ts, p * scale] for ts, p in prices]
+    return {
+        'prices': prices,
+        'market_caps': [[ts, p * coin['circulating_supply']] for ts, p in prices],
+        'total_volumes': [[ts, coin['total_volume']] for ts, _ in prices],
+    }
+
+
+def cryptopanic_posts():
+    recorded = _recorded('cryptopanic_posts')
+    if recorded:
+        return recorded
+    return {'results': [
+        {
+            'title': f'Crypto market headline number {i}',
+            'url': f'https://example.com/cryptopanic/{i}',
+            'source': {'title': 'Example News'},
+            'published_at': '2026-10-19T08:00:00Z',
+        }
+        for i in range(20)
+    ]}
+
+
+def newsapi_articles():
+    recorded = _recorded('newsapi_everything')
+    if recorded:
+        return recorded
+    return {'status': 'ok', 'articles': [
+        {
+            'title': f'Financial markets story number {i}',
+            'url': f'https://example.com/newsapi/{i}',
+            'source': {'name': 'Example Wire'},
+            'publishedAt': '2026-10-19T07:30:00Z',
+        }
+        for i in range(20)
+    ]}
+
+
+# Exchange rates: UAH per unit (NBU) and units per EUR (ECB)
+FX_UAH = {'USD': 41.5, 'EUR': 44.9, 'GBP': 53.4, 'PLN': 10.4, 'JPY': 0.28}
+FX_EUR = {'USD': 1.08, 'GBP': 0.84, 'PLN': 4.3, 'JPY': 161.5, 'CHF': 0.94}
+
+
+def nbu_exchange():
+    return [
+        {'r030': i, 'txt': code, 'rate': rate, 'cc': code, 'exchangedate': '19.10.2026'}
+        for i, (code, rate) in enumerate(FX_UAH.items())
+    ]
+
+
+def ecb_daily():
+    cubes = ''.join(f"<Cube currency='{code}' rate='{rate}'/>" for code, rate in FX_EUR.items())
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01" '
+        'xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">'
+        f"<Cube><Cube time='2026-10-19'>{cubes}</Cube></Cube></gesmes:Envelope>"
+    )
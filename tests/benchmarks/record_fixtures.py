@@ -0,0 +1,68 @@
+"""
+Record live upstream responses into ``fixtures/`` for the benchmark stubs.
+
+    python -m tests.benchmarks.record_fixtures --coins bitcoin ethereum
+
+Keys are read from the environment (CRYPTOPANIC_API_KEY, NEWSAPI_KEY);
+sources without a key are skipped.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+import aiohttp
+
+from .fixtures import FIXTURE_DIR
+
+COINGECKO = 'https://api.coingecko.com/api/v3'
+
+
+async def fetch(session, url, params=None):
+    async with session.get(url, params=params) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+def save(name, data):
+    FIXTURE_DIR.mkdir(exist_ok=True)
+    (FIXTURE_DIR / f'{name}.json').write_text(json.dumps(data))
+    print(f"recorded {name}.json")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Record upstream fixtures')
+    parser.add_argument('--coins', nargs='*', default=['bitcoin', 'ethereum'])
+    parser.add_argument('--days', nargs='*', default=['1', '7', '30'])
+    args = parser.parse_args()
+
+    async with aiohttp.ClientSession() as session:
+        save('global', await fetch(session, f'{COINGECKO}/global'))
+        save('coins_markets', await fetch(session, f'{COINGECKO}/coins/markets', {
+            'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 250, 'page': 1,
+            'sparkline': 'false', 'price_change_percentage': '24h,7d,30d',
+        }))
+        for coin_id in args.coins:
+            save(f'coin_{coin_id}', await fetch(session, f'{COINGECKO}/coins/{coin_id}', {
+                'localization': 'false', 'tickers': 'false', 'community_data': 'true',
+                'developer_data': 'true', 'sparkline': 'false',
+            }))
+            for days in args.days:
+                save(f'market_chart_{coin_id}_{days}', await fetch(
+                    session, f'{COINGECKO}/coins/{coin_id}/market_chart', {'vs_currency': 'usd', 'days': days}
+                ))
+                await asyncio.sleep(2)  # stay inside the public rate limit
+
+        if os.environ.get('CRYPTOPANIC_API_KEY'):
+            save('cryptopanic_posts', await fetch(session, 'https://cryptopanic.com/api/v1/posts/', {
+                'auth_token': os.environ['CRYPTOPANIC_API_KEY'], 'public': 'true', 'kind': 'news',
+            }))
+        if os.environ.get('NEWSAPI_KEY'):
+            save('newsapi_everything', await fetch(session, 'https://newsapi.org/v2/everything', {
+                'apiKey': os.environ['NEWSAPI_KEY'], 'q': 'cryptocurrency OR bitcoin OR ethereum',
+                'sortBy': 'publishedAt', 'language': 'en', 'pageSize': 20,
+            }))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
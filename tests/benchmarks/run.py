@@ -0,0 +1,370 @@
+"""
+End-to-end benchmark harness for the bot and the admin API.
+
+Starts local upstream stubs, swaps in a fake LLM and an in-memory Mongo
+(mongomock) unless ``--mongo-url`` points at a real mongod, then drives
+TelegramBot handlers through ``Application.process_update`` and the
+FastAPI endpoints through an in-process ASGI client at a fixed
+concurrency. Reports p50/p99 latency, throughput, upstream calls and
+memory per scenario and writes everything to JSON.
+
+    python -m tests.benchmarks.run --concurrency 20 --requests 200
+    python -m tests.benchmarks.run --baseline old.json --max-regression 0.2
+    python -m tests.benchmarks.run --fail coingecko --scenarios market price
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import fake_llm
+from .stubs import StubServer
+
+ROOT = Path(__file__).resolve().parents[2]
+BACKEND = ROOT / 'backend'
+
+BOT_SCENARIOS = {
+    'start': '/start',
+    'help': '/help',
+    'status': '/status',
+    'market': '/market',
+    'price': '/price BTC',
+    'news': '/news',
+    'ta': '/ta BTC ETH',
+    'chart': '/chart BTC 30d',
+    'watch': '/watch',
+    'portfolio': '/portfolio',
+    'analyze': '/analyze BTC',
+    'chat': 'What is bitcoin halving?',
+    # Switches the users to EUR; the scenarios above stay in USD
+    'currency': '/currency EUR',
+    'inline': None,
+}
+API_SCENARIOS = {
+    'api_stats': '/api/bot/stats',
+    'api_users': '/api/bot/users',
+    'api_subscriptions': '/api/bot/subscriptions',
+    # Dashboard reload with a warm browser cache: If-None-Match -> 304
+    'api_users_304': '/api/bot/users',
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def configure_environment(stub, args):
+    os.environ.update(stub.environ())
+    os.environ.update({
+        'MONGO_URL': args.mongo_url or 'mongodb://mongomock',
+        'DB_NAME': 'crypto_bot_bench',
+        'TELEGRAM_BOT_TOKEN': '123456:bench',
+        'EMERGENT_LLM_KEY': 'bench',
+        'PREMIUM_TESTING_MODE': 'true',
+        'METRICS_PORT': '0',
+    })
+    fake_llm.install(latency=args.llm_latency)
+
+    if not args.mongo_url:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        shared = AsyncMongoMockClient()
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **kw: shared
+
+    sys.path.insert(0, str(BACKEND))
+
+
+class Harness:
+    def __init__(self, args, stub):
+        self.args = args
+        self.stub = stub
+        self.ids = itertools.count(1)
+        self.etags = {}
+
+    async def setup(self):
+        import bot_service
+        import server
+        import httpx
+
+        self.bot_service = bot_service
+        self.bot = bot_service.TelegramBot()
+        self.app = self.bot.build_application()
+        await self.app.initialize()
+
+        self.api = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url='http://bench')
+
+        db = bot_service.db
+        await db.users.delete_many({})
+        await db.subscriptions.delete_many({})
+        now = datetime.now(timezone.utc)
+        await db.users.insert_many([
+            {'telegram_id': uid, 'username': f'user{uid}', 'first_name': 'Bench',
+             'subscription_tier': 'free', 'created_at': now.isoformat()}
+            for uid in range(1, self.args.users + 1)
+        ])
+        await db.subscriptions.insert_many([
+            {'telegram_id': uid, 'tier': 'premium', 'created_at': now.isoformat(),
+             'expires_at': now.replace(year=now.year + 1).isoformat()}
+            for uid in range(1, self.args.users + 1, 10)
+        ])
+        for uid in range(1, min(self.args.users, 200) + 1):
+            await bot_service.portfolio_service.db.portfolios.update_one(
+                {'telegram_id': uid},
+                {'$set': {'holdings': {'bitcoin': {'symbol': 'BTC', 'amount': 0.1},
+                                       'ethereum': {'symbol': 'ETH', 'amount': 2}}}},
+                upsert=True
+            )
+            await bot_service.portfolio_service.db.watchlists.update_one(
+                {'telegram_id': uid},
+                {'$set': {'coins': [{'id': 'solana', 'symbol': 'SOL'}, {'id': 'coin-40', 'symbol': 'C40'}]}},
+                upsert=True
+            )
+
+        # Background workers post_init would start under run_polling
+        bot_service.write_buffer.start()
+        bot_service.chart_service.start()
+
+        # Warm the market snapshot the poller would normally keep fresh
+        await bot_service.crypto_service.get_market_snapshot()
+
+        if self.args.fail:
+            # Prime the response caches once, then take the upstreams down
+            for name in ('market', 'price', 'news'):
+                await self.bot_operation(BOT_SCENARIOS[name])
+            self.stub.failing.update(self.args.fail)
+            bot_service.config.COINGECKO_CACHE_TTL = 0
+            bot_service.config.NEWS_CACHE_TTL = 0
+
+    async def teardown(self):
+        await self.bot_service.write_buffer.stop()
+        await self.api.aclose()
+        await self.app.shutdown()
+        await self.bot_service.crypto_service.close()
+        await self.bot_service.news_service.close()
+        await self.bot_service.fx_service.close()
+        self.bot_service.chart_service.close()
+
+    def _user(self):
+        uid = (next(self.ids) % self.args.users) + 1
+        return {'id': uid, 'is_bot': False, 'first_name': 'Bench', 'username': f'user{uid}'}
+
+    def make_update(self, text):
+        from telegram import Update
+
+        update_id = next(self.ids)
+        user = self._user()
+        if text is None:
+            data = {'update_id': update_id, 'inline_query': {
+                'id': str(update_id), 'from': user, 'query': 'bi', 'offset': ''}}
+        else:
+            message = {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user['id'], 'type': 'private'},
+                'from': user,
+                'text': text,
+            }
+            if text.startswith('/'):
+                command = text.split()[0]
+                message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+            data = {'update_id': update_id, 'message': message}
+        return Update.de_json(data, self.app.bot)
+
+    async def bot_operation(self, text):
+        await self.app.process_update(self.make_update(text))
+
+    async def api_operation(self, path, revalidate=False):
+        headers = {}
+        if revalidate:
+            etag = self.etags.get(path)
+            if etag is None:
+                etag = self.etags[path] = (await self.api.get(path)).headers.get('etag')
+            headers['If-None-Match'] = etag
+        response = await self.api.get(path, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+
+    async def run_scenario(self, name, operation):
+        requests = self.args.requests
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await operation()
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        upstream_before = dict(self.stub.requests)
+        error_replies_before = self.stub.error_replies
+        llm_before = fake_llm.CALLS['count']
+        if self.args.tracemalloc:
+            tracemalloc.start()
+        rss_before = rss_mb()
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        wall = time.perf_counter() - wall_start
+
+        peak_mb = None
+        if self.args.tracemalloc:
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+
+        latencies.sort()
+        ms = [v * 1000 for v in latencies]
+        return {
+            'requests': requests,
+            'concurrency': self.args.concurrency,
+            'errors': errors,
+            'error_replies': self.stub.error_replies - error_replies_before,
+            'wall_s': round(wall, 3),
+            'throughput_rps': round(requests / wall, 2),
+            'latency_ms': {
+                'p50': round(percentile(ms, 50), 2),
+                'p90': round(percentile(ms, 90), 2),
+                'p99': round(percentile(ms, 99), 2),
+                'mean': round(statistics.fmean(ms), 2),
+                'max': round(ms[-1], 2),
+            },
+            'upstream_calls': {k: self.stub.requests[k] - upstream_before[k] for k in self.stub.requests},
+            'llm_calls': fake_llm.CALLS['count'] - llm_before,
+            'memory': {
+                'max_rss_mb': round(rss_mb(), 1),
+                'max_rss_growth_mb': round(rss_mb() - rss_before, 1),
+                'traced_peak_mb': round(peak_mb, 2) if peak_mb is not None else None,
+            },
+        }
+
+    async def run(self, scenarios):
+        results = {}
+        for name in scenarios:
+            if name in BOT_SCENARIOS:
+                text = BOT_SCENARIOS[name]
+                operation = lambda text=text: self.bot_operation(text)
+            else:
+                path = API_SCENARIOS[name]
+                revalidate = name.endswith('_304')
+                operation = lambda path=path, revalidate=revalidate: self.api_operation(path, revalidate)
+            results[name] = await self.run_scenario(name, operation)
+            latency = results[name]['latency_ms']
+            print(f"{name:<18} p50 {latency['p50']:>9.2f} ms  p99 {latency['p99']:>9.2f} ms  "
+                  f"{results[name]['throughput_rps']:>8.1f} req/s  errors {results[name]['errors']}"
+                  f"+{results[name]['error_replies']}")
+        return results
+
+
+def compare(results, baseline_path, max_regression):
+    """Return scenarios whose p99 or throughput regressed beyond max_regression"""
+    baseline = json.loads(Path(baseline_path).read_text())['scenarios']
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        p99_ratio = current['latency_ms']['p99'] / max(previous['latency_ms']['p99'], 1e-9)
+        rps_ratio = current['throughput_rps'] / max(previous['throughput_rps'], 1e-9)
+        if p99_ratio > 1 + max_regression or rps_ratio < 1 - max_regression:
+            regressions.append((name, p99_ratio, rps_ratio))
+    return regressions
+
+
+def parse_latency(values):
+    latency = {}
+    for value in values or []:
+        upstream, _, seconds = value.partition('=')
+        latency[upstream] = float(seconds)
+    return latency
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Benchmark bot handlers and API endpoints against local stubs')
+    parser.add_argument('--scenarios', nargs='*', default=list(BOT_SCENARIOS) + list(API_SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario')
+    parser.add_argument('--users', type=int, default=1000, help='seeded users')
+    parser.add_argument('--latency', nargs='*', metavar='UPSTREAM=SECONDS',
+                        help='stub latency overrides, e.g. coingecko=0.2 telegram=0')
+    parser.add_argument('--fail', nargs='*', metavar='UPSTREAM', default=[],
+                        help='upstreams answering 429 after warm-up, e.g. coingecko newsapi')
+    parser.add_argument('--llm-latency', type=float, default=1.5)
+    parser.add_argument('--mongo-url', help='use a real mongod instead of mongomock')
+    parser.add_argument('--tracemalloc', action='store_true', help='record Python heap peaks (slower)')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='previous results JSON to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(BOT_SCENARIOS) - set(API_SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    stub = await StubServer(latency=parse_latency(args.latency)).start()
+    configure_environment(stub, args)
+
+    harness = Harness(args, stub)
+    await harness.setup()
+    try:
+        results = await harness.run(args.scenarios)
+    finally:
+        await harness.teardown()
+        await stub.stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'users': args.users,
+            'stub_latency_s': stub.latency,
+            'llm_latency_s': args.llm_latency,
+            'failing_upstreams': args.fail,
+            'mongo': 'mongod' if args.mongo_url else 'mongomock',
+        },
+        'scenarios': results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_regression)
+        for name, p99_ratio, rps_ratio in regressions:
+            print(f"REGRESSION {name}: p99 x{p99_ratio:.2f}, throughput x{rps_ratio:.2f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+"""
+Local stub server for every upstream the bot talks to.
+
+One aiohttp app serves CoinGecko under ``/coingecko/api/v3``, CryptoPanic
+under ``/cryptopanic/api/v1``, NewsAPI under ``/newsapi/v2``, NBU and
+ECB exchange rates under ``/nbu`` and ``/ecb``, and the Telegram Bot API under ``/telegram/bot<token>/<method>``, each with its
+own configurable latency. Upstreams named in ``failing`` answer 429 to
+exercise circuit breakers and stale-response fallbacks.
+"""
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+
+from . import fixtures
+
+DEFAULT_LATENCY = {
+    'coingecko': 0.08,
+    'cryptopanic': 0.12,
+    'newsapi': 0.12,
+    'nbu': 0.05,
+    'ecb': 0.05,
+    'telegram': 0.03,
+}
+
+
+class StubServer:
+    """Serves recorded/generated upstream fixtures with per-upstream latency"""
+
+    def __init__(self, latency=None, host='127.0.0.1', port=0):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.host = host
+        self.port = port
+        self.requests = {name: 0 for name in self.latency}
+        # Replies starting with ❌ are handler-level failures the bot swallowed
+        self.error_replies = 0
+        self.failing = set()
+        self.runner = None
+        self._message_ids = itertools.count(1)
+
+    @property
+    def base_url(self):
+        return f'http://{self.host}:{self.port}'
+
+    async def _delay(self, upstream):
+        self.requests[upstream] += 1
+        if self.latency[upstream]:
+            await asyncio.sleep(self.latency[upstream])
+
+    # CoinGecko
+
+    async def cg_global(self, request):
+        await self._delay('coingecko')
+        return web.json_response(fixtures.global_data())
+
+    async def cg_markets(self, request):
+        await self._delay('coingecko')
+        per_page = int(request.query.get('per_page', 100))
+        coins = fixtures.coins()
+        if request.query.get('ids'):
+            ids = set(request.query['ids'].split(','))
+            coins = [coin for coin in coins if coin['id'] in ids]
+        return web.json_response(coins[:per_page])
+
+    async def cg_search(self, request):
+        await self._delay('coingecko')
+        return web.json_response(fixtures.search(request.query.get('query', '')))
+
+    async def cg_simple_price(self, request):
+        await self._delay('coingecko')
+        ids = [i for i in request.query.get('ids', '').split(',') if i]
+        return web.json_response(fixtures.simple_price(ids))
+
+    async def cg_coin(self, request):
+        await self._delay('coingecko')
+        data = fixtures.coin_detail(request.match_info['coin_id'])
+        if data is None:
+            return web.json_response({'error': 'coin not found'}, status=404)
+        return web.json_response(data)
+
+    async def cg_market_chart(self, request):
+        await self._delay('coingecko')
+        data = fixtures.market_chart(request.match_info['coin_id'], request.query.get('days', '1'))
+        if data is None:
+            return web.json_response({'error': 'coin not found'}, status=404)
+        return web.json_response(data)
+
+    # News
+
+    async def cryptopanic(self, request):
+        await self._delay('cryptopanic')
+        return web.json_response(fixtures.cryptopanic_posts())
+
+    async def newsapi(self, request):
+        await self._delay('newsapi')
+        return web.json_response(fixtures.newsapi_articles())
+
+    # Exchange rates
+
+    async def nbu(self, request):
+        await self._delay('nbu')
+        return web.json_response(fixtures.nbu_exchange())
+
+    async def ecb(self, request):
+        await self._delay('ecb')
+        return web.Response(text=fixtures.ecb_daily(), content_type='text/xml')
+
+    # Telegram Bot API
+
+    async def telegram(self, request):
+        await self._delay('telegram')
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot',
+                      'can_join_groups': False, 'can_read_all_group_messages': False,
+                      'supports_inline_queries': True}
+        elif method in ('sendMessage', 'sendPhoto', 'editMessageText'):
+            if str(payload.get('text', '')).startswith('❌'):
+                self.error_replies += 1
+            result = {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+                'text': payload.get('text', ''),
+            }
+            if method == 'sendPhoto':
+                file_id = f'photo-{result["message_id"]}'
+                result['photo'] = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 800, 'height': 400}]
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    @web.middleware
+    async def fail_injection(self, request, handler):
+        upstream = request.path.split('/', 2)[1]
+        if upstream in self.failing:
+            self.requests[upstream] += 1
+            return web.json_response({'error': 'rate limited'}, status=429)
+        return await handler(request)
+
+    def make_app(self):
+        app = web.Application(client_max_size=16 * 1024 ** 2, middlewares=[self.fail_injection])
+        app.add_routes([
+            web.get('/coingecko/api/v3/global', self.cg_global),
+            web.get('/coingecko/api/v3/coins/markets', self.cg_markets),
+            web.get('/coingecko/api/v3/search', self.cg_search),
+            web.get('/coingecko/api/v3/simple/price', self.cg_simple_price),
+            web.get('/coingecko/api/v3/coins/{coin_id}', self.cg_coin),
+            web.get('/coingecko/api/v3/coins/{coin_id}/market_chart', self.cg_market_chart),
+            web.get('/cryptopanic/api/v1/posts/', self.cryptopanic),
+            web.get('/newsapi/v2/everything', self.newsapi),
+            web.get('/nbu/NBUStatService/v1/statdirectory/exchange', self.nbu),
+            web.get('/ecb/stats/eurofxref/eurofxref-daily.xml', self.ecb),
+            web.post('/telegram/bot{token}/{method}', self.telegram),
+        ])
+        return app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    def environ(self):
+        """Environment variables pointing the backend at this server"""
+        return {
+            'COINGECKO_API_BASE': f'{self.base_url}/coingecko/api/v3',
+            'CRYPTOPANIC_API_BASE': f'{self.base_url}/cryptopanic/api/v1',
+            'NEWSAPI_BASE': f'{self.base_url}/newsapi/v2',
+            'NBU_API_BASE': f'{self.base_url}/nbu/NBUStatService/v1/',
+            'ECB_RATES_URL': f'{self.base_url}/ecb/stats/eurofxref/eurofxref-daily.xml',
+            'TELEGRAM_API_BASE': f'{self.base_url}/telegram',
+            'CRYPTOPANIC_API_KEY': 'bench',
+            'NEWSAPI_KEY': 'bench',
+            # The stub has no rate limit; keep the budgeter out of latency numbers
+            'COINGECKO_RATE_LIMIT': '1000000',
+        }